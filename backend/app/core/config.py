@@ -13,6 +13,14 @@ GITHUB_CLIENT_ID = config('GITHUB_CLIENT_ID', cast=str)
 GITHUB_CLIENT_SECRET = config('GITHUB_CLIENT_SECRET', cast=str)
 DATABASE_URL = config('DATABASE_URL', cast=str)
 
+#Connection pools (applied to both the sync and the asyncpg engine)
+DB_POOL_SIZE = config('DB_POOL_SIZE', cast=int, default=10)
+DB_MAX_OVERFLOW = config('DB_MAX_OVERFLOW', cast=int, default=20)
+DB_POOL_TIMEOUT = config('DB_POOL_TIMEOUT', cast=float, default=30.0)
+DB_POOL_RECYCLE = config('DB_POOL_RECYCLE', cast=int, default=1800)
+# asyncpg prepared statement cache; set 0 behind pgbouncer in transaction mode.
+DB_STATEMENT_CACHE_SIZE = config('DB_STATEMENT_CACHE_SIZE', cast=int, default=512)
+
 # Pinecone
 PINECONE_API_KEY = config('PINECONE_API_KEY', cast=str)
 PINECONE_INDEX = config('PINECONE_INDEX', cast=str, default="gitrag-code")
@@ -24,7 +32,30 @@ LLM_MODEL = config('LLM_MODEL', cast=str, default="gpt-4o-mini")
 GEMINI_EMBED_MODEL = config('GEMINI_EMBED_MODEL', cast=str, default="gemini-1.5-flash")
 GEMINI_LLM_MODEL = config('GEMINI_LLM_MODEL', cast=str, default="models/text-embedding-004")
 
+# In-process "local" embedding provider. With LOCAL_EMBED_MODEL unset chunks
+# are embedded by feature hashing; once set, the model must load (it needs
+# sentence-transformers) or local embedding fails.
+LOCAL_EMBED_MODEL = config('LOCAL_EMBED_MODEL', cast=str, default="")
+LOCAL_EMBED_DIM = config('LOCAL_EMBED_DIM', cast=int, default=768)
+LOCAL_EMBED_BATCH_SIZE = config('LOCAL_EMBED_BATCH_SIZE', cast=int, default=32)
+# "local" only embeds; answers come from this provider's LLM and API key.
+LOCAL_LLM_PROVIDER = config('LOCAL_LLM_PROVIDER', cast=str, default="openai")
+
+# "ollama" provider: embeddings use EMBED_MODEL, answers OLLAMA_LLM_MODEL.
+# Concurrency limits are per process (ingest threads and chat coroutines
+# share them) so one Ollama box isn't oversubscribed.
+OLLAMA_LLM_MODEL = config('OLLAMA_LLM_MODEL', cast=str, default="llama3.1")
+OLLAMA_EMBED_DIM = config('OLLAMA_EMBED_DIM', cast=int, default=768)
+OLLAMA_EMBED_BATCH_SIZE = config('OLLAMA_EMBED_BATCH_SIZE', cast=int, default=64)
+OLLAMA_EMBED_CONCURRENCY = config('OLLAMA_EMBED_CONCURRENCY', cast=int, default=2)
+OLLAMA_GENERATE_CONCURRENCY = config('OLLAMA_GENERATE_CONCURRENCY', cast=int, default=2)
+OLLAMA_NUM_CTX = config('OLLAMA_NUM_CTX', cast=int, default=8192)
+OLLAMA_KEEP_ALIVE = config('OLLAMA_KEEP_ALIVE', cast=str, default="30m")
+OLLAMA_TIMEOUT = config('OLLAMA_TIMEOUT', cast=float, default=300.0)
+
 #Ingestion bounds
+# Overridable so benchmarks can point ingest at a local GitHub stand-in.
+GITHUB_API_URL = config('GITHUB_API_URL', cast=str, default="https://api.github.com").rstrip("/")
 GITHUB_DENY_DIRS="node_modules,dist,build,.git,__pycache__,.venv,venv,target,.next,.vercel,out"
 GITHUB_STREAMING_THRESHOLD_BYTES=256_000
 GITHUB_MAX_BYTES_PER_FILE=2_000_000
@@ -36,4 +67,88 @@ GITHUB_MAX_INGEST_SECONDS=600
 CHUNK_TOKENS = 800
 CHUNK_OVERLAP_TOKENS = 120
 MAX_CHUNKS_PER_FILE = 2000
-REPO_WIDE_CHUNK_BUDGET = 50000
\ No newline at end of file
+REPO_WIDE_CHUNK_BUDGET = 50000
+
+#Retrieval reranking
+RETRIEVAL_CANDIDATE_K = config('RETRIEVAL_CANDIDATE_K', cast=int, default=24)
+RETRIEVAL_FINAL_K = config('RETRIEVAL_FINAL_K', cast=int, default=6)
+RETRIEVAL_LEXICAL_WEIGHT = config('RETRIEVAL_LEXICAL_WEIGHT', cast=float, default=0.3)
+RETRIEVAL_MMR_LAMBDA = config('RETRIEVAL_MMR_LAMBDA', cast=float, default=0.7)
+RETRIEVAL_DEPENDENCY_K = config('RETRIEVAL_DEPENDENCY_K', cast=int, default=2)
+# Scoped results whose best score is below this are topped up from an unfiltered query.
+RETRIEVAL_SCOPE_MIN_SCORE = config('RETRIEVAL_SCOPE_MIN_SCORE', cast=float, default=0.2)
+
+#Context packing (prompt tokens reserved for retrieved code, per LLM model)
+CONTEXT_TOKEN_BUDGET = config('CONTEXT_TOKEN_BUDGET', cast=int, default=0)
+DEFAULT_CONTEXT_TOKEN_BUDGET = 6000
+MODEL_CONTEXT_TOKEN_BUDGETS = {
+    "gpt-4o-mini": 12000,
+    "gpt-4o": 12000,
+    "gpt-4.1-mini": 16000,
+    "gpt-4.1": 16000,
+    "gpt-3.5-turbo": 6000,
+    "gemini-1.5-flash": 24000,
+    "gemini-1.5-pro": 24000,
+    "gemini-2.0-flash": 24000,
+}
+
+#Chat history pagination
+CHAT_HISTORY_PAGE_SIZE = 50
+CHAT_HISTORY_MAX_PAGE_SIZE = 200
+
+#Lazy file tree pagination
+TREE_PAGE_SIZE = 200
+TREE_MAX_PAGE_SIZE = 1000
+
+#Large JSON responses (path lists, trees): gzip bodies at least this big
+#when the client accepts it
+RESPONSE_GZIP_MIN_BYTES = config('RESPONSE_GZIP_MIN_BYTES', cast=int, default=4096)
+RESPONSE_GZIP_LEVEL = config('RESPONSE_GZIP_LEVEL', cast=int, default=5)
+
+#Write-behind chat log
+CHAT_LOG_BATCH_SIZE = config('CHAT_LOG_BATCH_SIZE', cast=int, default=64)
+CHAT_LOG_FLUSH_INTERVAL_MS = config('CHAT_LOG_FLUSH_INTERVAL_MS', cast=int, default=200)
+# Failed attempts at a batch before it is written row by row and bad rows dropped.
+CHAT_LOG_MAX_RETRIES = config('CHAT_LOG_MAX_RETRIES', cast=int, default=3)
+
+#Thread pool for blocking work (DB, Pinecone) called from async routes
+BLOCKING_POOL_SIZE = config('BLOCKING_POOL_SIZE', cast=int, default=32)
+
+#Query embedding micro-batching
+EMBED_BATCH_MAX_WAIT_MS = config('EMBED_BATCH_MAX_WAIT_MS', cast=float, default=5.0)
+EMBED_BATCH_MAX_SIZE = config('EMBED_BATCH_MAX_SIZE', cast=int, default=64)
+
+#Per-process lookup caches
+ACTIVE_REPO_CACHE_TTL_SECONDS = config('ACTIVE_REPO_CACHE_TTL_SECONDS', cast=float, default=30.0)
+API_KEY_CACHE_TTL_SECONDS = config('API_KEY_CACHE_TTL_SECONDS', cast=float, default=60.0)
+INDEXED_REPO_CACHE_TTL_SECONDS = config('INDEXED_REPO_CACHE_TTL_SECONDS', cast=float, default=30.0)
+SYMBOL_INDEX_CACHE_TTL_SECONDS = config('SYMBOL_INDEX_CACHE_TTL_SECONDS', cast=float, default=300.0)
+DEPENDENCY_GRAPH_CACHE_TTL_SECONDS = config('DEPENDENCY_GRAPH_CACHE_TTL_SECONDS', cast=float, default=300.0)
+# Postgres LISTEN/NOTIFY channel for cross-worker invalidation; empty disables it.
+CACHE_INVALIDATION_CHANNEL = config('CACHE_INVALIDATION_CHANNEL', cast=str, default="")
+
+#Warm repo indexes: each user keeps several ingested repos; the least recently
+#used are evicted (vectors + symbol index) once a budget is exceeded. 0 = no limit.
+INDEXED_REPOS_PER_USER = config('INDEXED_REPOS_PER_USER', cast=int, default=5)
+INDEXED_REPO_VECTORS_PER_USER = config('INDEXED_REPO_VECTORS_PER_USER', cast=int, default=200_000)
+INDEXED_REPO_VECTORS_TOTAL = config('INDEXED_REPO_VECTORS_TOTAL', cast=int, default=0)
+# last_used_at is written at most this often per repo from the chat path.
+INDEXED_REPO_TOUCH_INTERVAL_SECONDS = config('INDEXED_REPO_TOUCH_INTERVAL_SECONDS', cast=float, default=300.0)
+
+#Prometheus scrape endpoint (GET /api/metrics): requires
+#"Authorization: Bearer <METRICS_TOKEN>". Disabled while the token is empty.
+METRICS_TOKEN = config('METRICS_TOKEN', cast=str, default="")
+
+#GitHub push webhook (POST /api/webhooks/github): re-indexes the files a push
+#touched. Each user gets a secret per indexed repo (POST /api/webhooks/github/secret)
+#and a delivery only updates the namespaces of users whose secret signed it.
+#Pushes to one repo are coalesced until none arrived for the debounce window,
+#or at most the max delay.
+GITHUB_WEBHOOKS_ENABLED = config('GITHUB_WEBHOOKS_ENABLED', cast=bool, default=True)
+WEBHOOK_DEBOUNCE_SECONDS = config('WEBHOOK_DEBOUNCE_SECONDS', cast=float, default=10.0)
+WEBHOOK_MAX_DELAY_SECONDS = config('WEBHOOK_MAX_DELAY_SECONDS', cast=float, default=60.0)
+WEBHOOK_FETCH_CONCURRENCY = config('WEBHOOK_FETCH_CONCURRENCY', cast=int, default=8)
+
+#Startup: schema creation runs in the lifespan hook, not at import time
+INIT_DB_ON_STARTUP = config('INIT_DB_ON_STARTUP', cast=bool, default=True)
+WARMUP_ON_STARTUP = config('WARMUP_ON_STARTUP', cast=bool, default=False)
@@ -1,6 +1,20 @@
 # app/crud/active_repo.py
+from typing import NamedTuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from app.core.config import ACTIVE_REPO_CACHE_TTL_SECONDS
 from app.models.active_repo import ActiveRepo
+from app.utils.ttl_cache import TTLCache, MISSING
+from app.utils.cache_invalidation import invalidate_cached
+
+# Detached snapshot of an ActiveRepo row, safe to share across sessions.
+class ActiveRepoInfo(NamedTuple):
+    user_id: str
+    repo_url: str
+    provider: str
+
+active_repo_cache = TTLCache("active_repo", ttl=ACTIVE_REPO_CACHE_TTL_SECONDS)
 
 def set_active_repo(db: Session, user_id: str, repo_url: str, provider: str):
     obj = db.query(ActiveRepo).filter(ActiveRepo.user_id==user_id).one_or_none()
@@ -11,16 +25,32 @@ def set_active_repo(db: Session, user_id: str, repo_url: str, provider: str):
         obj = ActiveRepo(user_id=user_id, repo_url=repo_url, provider=provider)
         db.add(obj)
     db.commit()
+    invalidate_cached(active_repo_cache, user_id)
     return obj
 
 def get_active_repo(db: Session, user_id: str):
+    cached = active_repo_cache.get(user_id)
+    if cached is not MISSING:
+        return cached
     obj = db.query(ActiveRepo).filter_by(user_id=user_id).one_or_none()
-    return obj
+    info = ActiveRepoInfo(obj.user_id, obj.repo_url, obj.provider) if obj else None
+    active_repo_cache.set(user_id, info)
+    return info
+
+async def aget_active_repo(db: AsyncSession, user_id: str):
+    cached = active_repo_cache.get(user_id)
+    if cached is not MISSING:
+        return cached
+    obj = (await db.execute(select(ActiveRepo).filter_by(user_id=user_id))).scalar_one_or_none()
+    info = ActiveRepoInfo(obj.user_id, obj.repo_url, obj.provider) if obj else None
+    active_repo_cache.set(user_id, info)
+    return info
 
 def delete_active_repo(db: Session, user_id: str):
     obj = db.query(ActiveRepo).filter_by(user_id=user_id).one_or_none()
     if obj:
         db.delete(obj)
         db.commit()
+        invalidate_cached(active_repo_cache, user_id)
         return True
     return False
@@ -1,8 +1,15 @@
 # app/crud/api_key.py
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.models.api_key import APIKey
 from app.services.encryption_service import encrypt_key, decrypt_key
+from app.core.config import API_KEY_CACHE_TTL_SECONDS
+from app.utils.ttl_cache import TTLCache, MISSING
+from app.utils.cache_invalidation import invalidate_cached
 
+# (user_id, provider) -> decrypted key, so the hot path skips the query and Fernet.
+api_key_cache = TTLCache("api_key", ttl=API_KEY_CACHE_TTL_SECONDS)
 
 def upsert_api_key(db: Session, user_id: str, provider: str, key: str):
     encrypted_api_key = encrypt_key(key)
@@ -19,6 +26,7 @@ def upsert_api_key(db: Session, user_id: str, provider: str, key: str):
         db.add(obj)
 
     db.commit()
+    invalidate_cached(api_key_cache, (user_id, provider))
     return obj
 
 
@@ -31,14 +39,31 @@ def delete_api_key(db: Session, user_id: str, provider: str):
     if obj:
         db.delete(obj)
         db.commit()
+        invalidate_cached(api_key_cache, (user_id, provider))
         return True
     return False
 
 def get_api_key_by_provider(db: Session, user_id: str, provider: str):
+    cached = api_key_cache.get((user_id, provider))
+    if cached is not MISSING:
+        return cached
     row = (
         db.query(APIKey)
         .filter(APIKey.user_id == user_id, APIKey.provider == provider)
         .one_or_none()
     )
     
-    return decrypt_key(row.key) if row and row.key else None
\ No newline at end of file
+    key = decrypt_key(row.key) if row and row.key else None
+    api_key_cache.set((user_id, provider), key)
+    return key
+
+async def aget_api_key_by_provider(db: AsyncSession, user_id: str, provider: str):
+    cached = api_key_cache.get((user_id, provider))
+    if cached is not MISSING:
+        return cached
+    encrypted = (await db.execute(
+        select(APIKey.key).where(APIKey.user_id == user_id, APIKey.provider == provider)
+    )).scalar_one_or_none()
+    key = decrypt_key(encrypted) if encrypted else None
+    api_key_cache.set((user_id, provider), key)
+    return key
@@ -1,4 +1,9 @@
 # app/crud/chat.py
+import base64
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import delete, func, insert, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.models import ChatMessage
 
@@ -14,13 +19,83 @@ def log_chat(db: Session, namespace: str, role: str, content: str, user_id: str)
     db.refresh(msg)
     return msg
 
+def bulk_log_chat(db: Session, rows: list[dict]) -> list[int]:
+    # One multi-row INSERT ... RETURNING id, ids in the order of `rows`.
+    ids = db.scalars(
+        insert(ChatMessage).returning(ChatMessage.id, sort_by_parameter_order=True),
+        rows,
+    ).all()
+    db.commit()
+    return list(ids)
+
 def delete_chat_namespace(db: Session, namespace: str):
     db.query(ChatMessage).filter_by(namespace=namespace).delete()
     db.commit()
 
 
-def get_chat_messages_for_namespace(db: Session, namespace: str):
-    return db.query(ChatMessage).filter_by(namespace=namespace).order_by(ChatMessage.created_at.asc()).all()
+def encode_chat_cursor(created_at: datetime, msg_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{msg_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def decode_chat_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        created_at, msg_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(msg_id)
+    except Exception:
+        raise ValueError("Invalid chat history cursor.")
+
+def _chat_page_query(namespace: str, limit: int, before: Optional[str], truncate: Optional[int]):
+    # Newest-first walk of ix_chat_messages_namespace_created_at_id.
+    content = func.substr(ChatMessage.content, 1, truncate) if truncate else ChatMessage.content
+    q = select(
+        ChatMessage.id,
+        ChatMessage.role,
+        ChatMessage.created_at,
+        content.label("content"),
+        func.length(ChatMessage.content).label("content_length"),
+    ).where(ChatMessage.namespace == namespace)
+    if before:
+        created_at, msg_id = decode_chat_cursor(before)
+        q = q.where(tuple_(ChatMessage.created_at, ChatMessage.id) < tuple_(created_at, msg_id))
+    return q.order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc()).limit(limit + 1)
+
+def _chat_page(rows, limit: int, truncate: Optional[int]):
+    # The page is returned oldest-first; `next_cursor` points at older messages.
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_chat_cursor(rows[-1].created_at, rows[-1].id) if has_more else None
+    messages = [
+        {
+            "id": r.id,
+            "role": r.role,
+            "content": r.content,
+            "created_at": r.created_at,
+            "truncated": bool(truncate) and r.content_length > truncate,
+        }
+        for r in reversed(rows)
+    ]
+    return messages, next_cursor
+
+def get_chat_messages_page(
+    db: Session,
+    namespace: str,
+    limit: int,
+    before: Optional[str] = None,
+    truncate: Optional[int] = None,
+):
+    rows = db.execute(_chat_page_query(namespace, limit, before, truncate)).all()
+    return _chat_page(rows, limit, truncate)
+
+async def aget_chat_messages_page(
+    db: AsyncSession,
+    namespace: str,
+    limit: int,
+    before: Optional[str] = None,
+    truncate: Optional[int] = None,
+):
+    rows = (await db.execute(_chat_page_query(namespace, limit, before, truncate))).all()
+    return _chat_page(rows, limit, truncate)
 
 def delete_chat_message(db: Session, msg_id: int, user_id: str):
     msg = db.query(ChatMessage).filter_by(id=msg_id, user_id=user_id).first()
@@ -29,3 +104,8 @@ def delete_chat_message(db: Session, msg_id: int, user_id: str):
         db.commit()
         return True
     return False
+
+async def adelete_chat_message(db: AsyncSession, msg_id: int, user_id: str):
+    result = await db.execute(delete(ChatMessage).where(ChatMessage.id == msg_id, ChatMessage.user_id == user_id))
+    await db.commit()
+    return result.rowcount > 0
@@ -0,0 +1,198 @@
+# app/crud/indexed_repo.py
+import time
+from typing import List, NamedTuple, Optional, Tuple
+from sqlalchemy import select, update, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.core.config import INDEXED_REPO_CACHE_TTL_SECONDS, INDEXED_REPO_TOUCH_INTERVAL_SECONDS
+from app.models.indexed_repo import IndexedRepo
+from app.crud.active_repo import aget_active_repo
+from app.services.encryption_service import encrypt_key, decrypt_key
+from app.utils.ttl_cache import TTLCache, MISSING
+from app.utils.cache_invalidation import invalidate_cached
+
+class IndexedRepoInfo(NamedTuple):
+    user_id: str
+    repo_url: str
+    provider: str
+    namespace: str
+    vector_count: int
+    index_version: Optional[int] = None
+
+indexed_repo_cache = TTLCache("indexed_repo", ttl=INDEXED_REPO_CACHE_TTL_SECONDS)
+_last_touch = {}
+
+def _info(obj) -> Optional[IndexedRepoInfo]:
+    if obj is None:
+        return None
+    return IndexedRepoInfo(obj.user_id, obj.repo_url, obj.provider, obj.namespace, obj.vector_count, obj.index_version)
+
+def legacy_namespace(user_id: str, repo_url: str) -> str:
+    return f"{user_id}_{repo_url.rstrip('/').split('/')[-1]}"
+
+def namespace_for(db: Session, user_id: str, repo_url: str) -> str:
+    # Keep the historical "<user>_<repo>" name unless another indexed repo of
+    # this user already has it (same repo name under a different owner).
+    existing = get_indexed_repo(db, user_id, repo_url)
+    if existing:
+        return existing.namespace
+    namespace = legacy_namespace(user_id, repo_url)
+    taken = db.query(IndexedRepo.repo_url).filter(
+        IndexedRepo.user_id == user_id, IndexedRepo.namespace == namespace
+    ).first()
+    if taken:
+        owner = repo_url.rstrip("/").split("/")[-2]
+        namespace = f"{user_id}_{owner}_{repo_url.rstrip('/').split('/')[-1]}"
+    return namespace
+
+def get_indexed_repo(db: Session, user_id: str, repo_url: str) -> Optional[IndexedRepoInfo]:
+    key = (user_id, repo_url)
+    cached = indexed_repo_cache.get(key)
+    if cached is not MISSING:
+        return cached
+    info = _info(db.get(IndexedRepo, key))
+    indexed_repo_cache.set(key, info)
+    return info
+
+async def aget_indexed_repo(db: AsyncSession, user_id: str, repo_url: str) -> Optional[IndexedRepoInfo]:
+    key = (user_id, repo_url)
+    cached = indexed_repo_cache.get(key)
+    if cached is not MISSING:
+        return cached
+    info = _info(await db.get(IndexedRepo, key))
+    indexed_repo_cache.set(key, info)
+    return info
+
+async def alist_indexed_repos(db: AsyncSession, user_id: str) -> List[IndexedRepoInfo]:
+    rows = (await db.execute(
+        select(IndexedRepo).where(IndexedRepo.user_id == user_id).order_by(IndexedRepo.last_used_at.desc())
+    )).scalars().all()
+    return [_info(r) for r in rows]
+
+def upsert_indexed_repo(
+    db: Session, user_id: str, repo_url: str, namespace: str, provider: str, vector_count: int,
+    index_version: Optional[int] = None,
+):
+    # index_version: what a full ingest just wrote; None for rows adopted
+    # without re-indexing.
+    obj = db.get(IndexedRepo, (user_id, repo_url))
+    if obj:
+        obj.namespace = namespace
+        obj.provider = provider
+        obj.vector_count = vector_count
+        obj.index_version = index_version
+        obj.last_used_at = func.now()
+    else:
+        obj = IndexedRepo(
+            user_id=user_id, repo_url=repo_url, namespace=namespace, provider=provider, vector_count=vector_count,
+            index_version=index_version,
+        )
+        db.add(obj)
+    db.commit()
+    invalidate_cached(indexed_repo_cache, (user_id, repo_url))
+    _last_touch[(user_id, repo_url)] = time.monotonic()
+    return obj
+
+def delete_indexed_repo(db: Session, user_id: str, repo_url: str) -> bool:
+    deleted = db.query(IndexedRepo).filter(
+        IndexedRepo.user_id == user_id, IndexedRepo.repo_url == repo_url
+    ).delete(synchronize_session=False)
+    db.commit()
+    invalidate_cached(indexed_repo_cache, (user_id, repo_url))
+    _last_touch.pop((user_id, repo_url), None)
+    return bool(deleted)
+
+def _touch_due(user_id: str, repo_url: str) -> bool:
+    # LRU order only needs coarse timestamps; skip the write on most requests.
+    key = (user_id, repo_url)
+    now = time.monotonic()
+    if now - _last_touch.get(key, float("-inf")) < INDEXED_REPO_TOUCH_INTERVAL_SECONDS:
+        return False
+    _last_touch[key] = now
+    return True
+
+def _touch_stmt(user_id: str, repo_url: str):
+    return update(IndexedRepo).where(
+        IndexedRepo.user_id == user_id, IndexedRepo.repo_url == repo_url
+    ).values(last_used_at=func.now())
+
+def touch_indexed_repo(db: Session, user_id: str, repo_url: str, force: bool = False):
+    if force or _touch_due(user_id, repo_url):
+        db.execute(_touch_stmt(user_id, repo_url))
+        db.commit()
+
+async def atouch_indexed_repo(db: AsyncSession, user_id: str, repo_url: str):
+    if _touch_due(user_id, repo_url):
+        await db.execute(_touch_stmt(user_id, repo_url))
+        await db.commit()
+
+def lru_indexed_repos(db: Session, user_id: Optional[str] = None, limit: Optional[int] = None) -> List[IndexedRepoInfo]:
+    # Oldest first: eviction order for one user, or across all users.
+    q = db.query(IndexedRepo)
+    if user_id is not None:
+        q = q.filter(IndexedRepo.user_id == user_id)
+    q = q.order_by(IndexedRepo.last_used_at.asc())
+    if limit:
+        q = q.limit(limit)
+    return [_info(r) for r in q.all()]
+
+def indexed_vector_total(db: Session) -> int:
+    return db.query(func.coalesce(func.sum(IndexedRepo.vector_count), 0)).scalar()
+
+def _owner_repo(repo_url: str):
+    parts = repo_url.rstrip("/").removesuffix(".git").split("/")
+    return parts[-2].lower(), parts[-1].lower()
+
+def indexed_repos_for_repo(db: Session, owner: str, repo: str) -> List[IndexedRepoInfo]:
+    # Every namespace (any user, any provider) that indexes github.com/<owner>/<repo>.
+    rows = db.query(IndexedRepo).filter(IndexedRepo.repo_url.ilike(f"%/{owner}/{repo}%")).all()
+    return [_info(r) for r in rows if _owner_repo(r.repo_url) == (owner.lower(), repo.lower())]
+
+async def awebhook_secrets_for_repo(db: AsyncSession, owner: str, repo: str) -> List[Tuple[str, str]]:
+    # (user_id, secret) of every user with a push webhook secret for the repo.
+    rows = (await db.execute(
+        select(IndexedRepo.user_id, IndexedRepo.repo_url, IndexedRepo.webhook_secret).where(
+            IndexedRepo.repo_url.ilike(f"%/{owner}/{repo}%"), IndexedRepo.webhook_secret.is_not(None),
+        )
+    )).all()
+    return [
+        (r.user_id, decrypt_key(r.webhook_secret))
+        for r in rows if _owner_repo(r.repo_url) == (owner.lower(), repo.lower())
+    ]
+
+async def aset_webhook_secret(db: AsyncSession, user_id: str, repo_url: str, secret: str, replace: bool = True) -> bool:
+    # replace=False only fills an empty slot, so concurrent first calls can't
+    # hand out a secret that a second call then overwrites.
+    where = [IndexedRepo.user_id == user_id, IndexedRepo.repo_url == repo_url]
+    if not replace:
+        where.append(IndexedRepo.webhook_secret.is_(None))
+    result = await db.execute(update(IndexedRepo).where(*where).values(webhook_secret=encrypt_key(secret)))
+    await db.commit()
+    return result.rowcount > 0
+
+async def aget_webhook_secret(db: AsyncSession, user_id: str, repo_url: str) -> Optional[str]:
+    secret = (await db.execute(select(IndexedRepo.webhook_secret).where(
+        IndexedRepo.user_id == user_id, IndexedRepo.repo_url == repo_url
+    ))).scalar_one_or_none()
+    return decrypt_key(secret) if secret else None
+
+def add_indexed_repo_vectors(db: Session, user_id: str, repo_url: str, delta: int):
+    if not delta:
+        return
+    db.execute(update(IndexedRepo).where(
+        IndexedRepo.user_id == user_id, IndexedRepo.repo_url == repo_url
+    ).values(vector_count=func.greatest(IndexedRepo.vector_count + delta, 0)))
+    db.commit()
+    invalidate_cached(indexed_repo_cache, (user_id, repo_url))
+
+async def aresolve_repo(db: AsyncSession, user_id: str, repo_url: Optional[str] = None) -> Optional[IndexedRepoInfo]:
+    # The repo a request targets: the indexed repo it names, else the user's active one.
+    if repo_url:
+        return await aget_indexed_repo(db, user_id, repo_url)
+    active = await aget_active_repo(db, user_id)
+    if not active:
+        return None
+    indexed = await aget_indexed_repo(db, user_id, active.repo_url)
+    return indexed or IndexedRepoInfo(
+        user_id, active.repo_url, active.provider or "openai", legacy_namespace(user_id, active.repo_url), 0,
+    )
@@ -1,9 +1,88 @@
+import gzip
+import hashlib
+import json
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from app.core.config import DEPENDENCY_GRAPH_CACHE_TTL_SECONDS
 from app.models.repo_metadata import RepoMetadata
+from app.utils.ttl_cache import TTLCache, MISSING
+from app.utils.cache_invalidation import invalidate_cached
+
+dependency_graph_cache = TTLCache("dependency_graph", ttl=DEPENDENCY_GRAPH_CACHE_TTL_SECONDS, maxsize=32)
+
+def build_metadata_payload(file_tree_json: str, analytics_json: str, dependency_graph_json: str):
+    # Splice the already-serialized columns instead of loads()/dumps() round trips.
+    payload = (
+        '{"file_tree":' + file_tree_json
+        + ',"analytics":' + (analytics_json or "{}")
+        + ',"dependency_graph":' + (dependency_graph_json or "{}")
+        + "}"
+    ).encode("utf-8")
+    etag = '"' + hashlib.sha256(payload).hexdigest()[:32] + '"'
+    return gzip.compress(payload, compresslevel=6, mtime=0), etag
 
 def get_repo_metadata(db: Session, repo_url: str):
     return db.query(RepoMetadata).filter(RepoMetadata.repo_url == repo_url).first()
 
+def get_repo_metadata_etag(db: Session, repo_url: str):
+    row = db.query(RepoMetadata.payload_etag).filter(RepoMetadata.repo_url == repo_url).first()
+    return row[0] if row else None
+
+async def aget_repo_metadata_etag(db: AsyncSession, repo_url: str):
+    return (await db.execute(
+        select(RepoMetadata.payload_etag).where(RepoMetadata.repo_url == repo_url)
+    )).scalar_one_or_none()
+
+def _fill_payload(meta: RepoMetadata) -> bool:
+    if meta.payload_gz is not None and meta.payload_etag is not None:
+        return False
+    # Rows ingested before payloads were stored: build once and keep it.
+    meta.payload_gz, meta.payload_etag = build_metadata_payload(
+        meta.file_tree_json, meta.analytics_json, meta.dependency_graph_json
+    )
+    return True
+
+def get_repo_metadata_payload(db: Session, repo_url: str):
+    meta = get_repo_metadata(db, repo_url)
+    if not meta:
+        return None
+    if _fill_payload(meta):
+        db.commit()
+    return meta.payload_gz, meta.payload_etag
+
+async def aget_repo_metadata_payload(db: AsyncSession, repo_url: str):
+    meta = (await db.execute(select(RepoMetadata).where(RepoMetadata.repo_url == repo_url))).scalar_one_or_none()
+    if not meta:
+        return None
+    if _fill_payload(meta):
+        await db.commit()
+    return meta.payload_gz, meta.payload_etag
+
+def _cache_graph(repo_url: str, graph_json):
+    graph = json.loads(graph_json) if graph_json else {}
+    if "deps" not in graph:
+        # Rows from before the dependency graph was built.
+        graph = {"v": 1, "files": [], "deps": [], "edges": 0}
+    dependency_graph_cache.set(repo_url, graph)
+    return graph
+
+def get_dependency_graph(db: Session, repo_url: str):
+    graph = dependency_graph_cache.get(repo_url)
+    if graph is not MISSING:
+        return graph
+    row = db.query(RepoMetadata.dependency_graph_json).filter(RepoMetadata.repo_url == repo_url).first()
+    return _cache_graph(repo_url, row[0] if row else None)
+
+async def aget_dependency_graph(db: AsyncSession, repo_url: str):
+    graph = dependency_graph_cache.get(repo_url)
+    if graph is not MISSING:
+        return graph
+    graph_json = (await db.execute(
+        select(RepoMetadata.dependency_graph_json).where(RepoMetadata.repo_url == repo_url)
+    )).scalar_one_or_none()
+    return _cache_graph(repo_url, graph_json)
+
 def upsert_repo_metadata(
     db: Session,
     repo_url: str,
@@ -11,19 +90,25 @@ def upsert_repo_metadata(
     analytics_json: str,
     dependency_graph_json: str,
 ):
+    payload_gz, payload_etag = build_metadata_payload(file_tree_json, analytics_json, dependency_graph_json)
     meta = db.query(RepoMetadata).filter(RepoMetadata.repo_url == repo_url).first()
     if meta:
         meta.file_tree_json = file_tree_json
         meta.analytics_json = analytics_json
         meta.dependency_graph_json = dependency_graph_json
+        meta.payload_gz = payload_gz
+        meta.payload_etag = payload_etag
     else:
         meta = RepoMetadata(
             repo_url=repo_url,
             file_tree_json=file_tree_json,
             analytics_json=analytics_json,
             dependency_graph_json=dependency_graph_json,
+            payload_gz=payload_gz,
+            payload_etag=payload_etag,
         )
         db.add(meta)
     db.commit()
     db.refresh(meta)
+    invalidate_cached(dependency_graph_cache, repo_url)
     return meta
@@ -0,0 +1,77 @@
+# app/crud/repo_tree.py
+import base64
+from typing import Optional
+from sqlalchemy import insert, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.models.repo_tree import RepoTreeEntry
+
+_INSERT_BATCH = 5000
+
+def replace_repo_tree(db: Session, repo_url: str, entries: list[dict]):
+    db.query(RepoTreeEntry).filter(RepoTreeEntry.repo_url == repo_url).delete()
+    rows = [{**e, "repo_url": repo_url} for e in entries]
+    for i in range(0, len(rows), _INSERT_BATCH):
+        db.execute(insert(RepoTreeEntry), rows[i:i + _INSERT_BATCH])
+    db.commit()
+
+def encode_tree_cursor(is_file: bool, name: str) -> str:
+    raw = f"{int(is_file)}|{name}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def decode_tree_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        is_file, name = raw.split("|", 1)
+        return bool(int(is_file)), name
+    except Exception:
+        raise ValueError("Invalid tree cursor.")
+
+def _split_path(path: str):
+    parent, _, name = path.rpartition("/")
+    return parent, name
+
+def get_tree_dir(db: Session, repo_url: str, path: str) -> Optional[RepoTreeEntry]:
+    parent, name = _split_path(path)
+    return db.get(RepoTreeEntry, (repo_url, parent, False, name))
+
+async def aget_tree_dir(db: AsyncSession, repo_url: str, path: str) -> Optional[RepoTreeEntry]:
+    parent, name = _split_path(path)
+    return await db.get(RepoTreeEntry, (repo_url, parent, False, name))
+
+def _children_query(repo_url: str, path: str, limit: int, cursor: Optional[str]):
+    q = select(
+        RepoTreeEntry.is_file,
+        RepoTreeEntry.name,
+        RepoTreeEntry.size,
+        RepoTreeEntry.file_count,
+        RepoTreeEntry.dir_count,
+    ).where(RepoTreeEntry.repo_url == repo_url, RepoTreeEntry.parent == path)
+    if cursor:
+        after = decode_tree_cursor(cursor)
+        q = q.where(tuple_(RepoTreeEntry.is_file, RepoTreeEntry.name) > after)
+    return q.order_by(RepoTreeEntry.is_file, RepoTreeEntry.name).limit(limit + 1)
+
+def _children_page(rows, path: str, limit: int):
+    next_cursor = encode_tree_cursor(rows[limit - 1].is_file, rows[limit - 1].name) if len(rows) > limit else None
+    entries = []
+    for r in rows[:limit]:
+        entry = {
+            "name": r.name,
+            "path": f"{path}/{r.name}" if path else r.name,
+            "type": "file" if r.is_file else "dir",
+            "size": r.size,
+        }
+        if not r.is_file:
+            entry["files"] = r.file_count
+            entry["dirs"] = r.dir_count
+        entries.append(entry)
+    return entries, next_cursor
+
+def get_tree_children_page(db: Session, repo_url: str, path: str, limit: int, cursor: Optional[str] = None):
+    rows = db.execute(_children_query(repo_url, path, limit, cursor)).all()
+    return _children_page(rows, path, limit)
+
+async def aget_tree_children_page(db: AsyncSession, repo_url: str, path: str, limit: int, cursor: Optional[str] = None):
+    rows = (await db.execute(_children_query(repo_url, path, limit, cursor))).all()
+    return _children_page(rows, path, limit)
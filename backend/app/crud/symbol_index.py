@@ -0,0 +1,52 @@
+# app/crud/symbol_index.py
+import json
+import zlib
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.core.config import SYMBOL_INDEX_CACHE_TTL_SECONDS
+from app.models.symbol_index import SymbolIndex
+from app.utils.ttl_cache import TTLCache, MISSING
+from app.utils.cache_invalidation import invalidate_cached
+
+symbol_index_cache = TTLCache("symbol_index", ttl=SYMBOL_INDEX_CACHE_TTL_SECONDS, maxsize=32)
+
+def upsert_symbol_index(db: Session, namespace: str, index: dict):
+    data = zlib.compress(json.dumps(index, separators=(",", ":")).encode("utf-8"))
+    obj = db.query(SymbolIndex).filter(SymbolIndex.namespace == namespace).one_or_none()
+    if obj:
+        obj.data = data
+    else:
+        obj = SymbolIndex(namespace=namespace, data=data)
+        db.add(obj)
+    db.commit()
+    invalidate_cached(symbol_index_cache, namespace)
+    symbol_index_cache.set(namespace, index)
+    return obj
+
+def get_symbol_index(db: Session, namespace: str):
+    index = symbol_index_cache.get(namespace)
+    if index is not MISSING:
+        return index
+    row = db.query(SymbolIndex.data).filter(SymbolIndex.namespace == namespace).one_or_none()
+    if not row:
+        return None
+    index = json.loads(zlib.decompress(row.data))
+    symbol_index_cache.set(namespace, index)
+    return index
+
+async def aget_symbol_index(db: AsyncSession, namespace: str):
+    index = symbol_index_cache.get(namespace)
+    if index is not MISSING:
+        return index
+    data = (await db.execute(select(SymbolIndex.data).where(SymbolIndex.namespace == namespace))).scalar_one_or_none()
+    if data is None:
+        return None
+    index = json.loads(zlib.decompress(data))
+    symbol_index_cache.set(namespace, index)
+    return index
+
+def delete_symbol_index(db: Session, namespace: str):
+    db.query(SymbolIndex).filter(SymbolIndex.namespace == namespace).delete()
+    db.commit()
+    invalidate_cached(symbol_index_cache, namespace)
@@ -3,16 +3,43 @@ from app.core.oauth import init_oauth
 from app.routers.auth import router as auth_router
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
-from app.routers import ai, repo, discuss
-from app.utils.db import engine, Base
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
+from app.routers import ai, repo, discuss, metrics, webhooks
+from app.utils.db import init_db, async_engine
+from fastapi.responses import JSONResponse
+from contextlib import asynccontextmanager
+from app.services.chat_log_service import chat_log_writer
+from app.services.webhook_service import push_reindexer
+from app.utils.cache_invalidation import invalidation_listener
+from app.utils.concurrency import run_blocking
+from app.utils.metrics import MetricsMiddleware
+from app.utils.static_files import PrecompressedStaticFiles
+from app.services.warmup import warm_up
+from app.core.config import INIT_DB_ON_STARTUP, WARMUP_ON_STARTUP
+import asyncio
 import os
+import sys
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if INIT_DB_ON_STARTUP:
+        await run_blocking(init_db)
+    if WARMUP_ON_STARTUP:
+        # Off the startup path: the server accepts requests while SDKs load.
+        app.state.warmup = asyncio.create_task(run_blocking(warm_up))
+    chat_log_writer.start()
+    invalidation_listener.start()
+    yield
+    invalidation_listener.stop()
+    await push_reindexer.stop()
+    await chat_log_writer.stop()
+    await async_engine.dispose()
+    # Only imported once a request used the ollama provider.
+    if "app.services.ollama_client" in sys.modules:
+        await sys.modules["app.services.ollama_client"].aclose()
+
+app = FastAPI(lifespan=lifespan)
 
 init_oauth(app)
-Base.metadata.create_all(bind=engine)
 
 app.add_middleware(
     CORSMiddleware,
@@ -35,21 +62,26 @@ app.add_middleware(
     same_site="none"
 )
 
+# Added last so it is outermost and times the whole middleware stack.
+app.add_middleware(MetricsMiddleware)
+
 
 app.include_router(auth_router, prefix="/api")
 app.include_router(ai.router, prefix="/api")
 app.include_router(repo.router, prefix="/api")
 app.include_router(discuss.router, prefix="/api")
-app.mount("/", StaticFiles(directory="frontend/dist", html=True), name="static")
+app.include_router(metrics.router, prefix="/api")
+app.include_router(webhooks.router, prefix="/api")
+static_files = PrecompressedStaticFiles("frontend/dist")
+app.mount("/", static_files, name="static")
 
 @app.exception_handler(404)
 async def custom_404_handler(request: Request, exc):
     if request.url.path.startswith("/api"):
         return JSONResponse({"detail": "Not Found"}, status_code=404)
-    index_path = os.path.join("frontend", "dist", "index.html")
-    if os.path.exists(index_path):
-        return FileResponse(index_path)
-    return JSONResponse({"detail": "Not Found"}, status_code=404)
+    return static_files.index_response(
+        request.headers.get("if-none-match"), request.headers.get("accept-encoding", ""), request.method,
+    )
 
 if __name__ == '__main__':
     import uvicorn
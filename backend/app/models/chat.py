@@ -1,5 +1,5 @@
 # app/models/chat.py
-from sqlalchemy import Column, Integer, String, ForeignKey, Text, DateTime, func
+from sqlalchemy import Column, Integer, String, ForeignKey, Text, DateTime, Index, func
 from sqlalchemy.orm import relationship
 from app.utils.db import Base
 
@@ -12,3 +12,8 @@ class ChatMessage(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now()) 
     user_id   = Column(String, ForeignKey("users.id"))
     user      = relationship("User", back_populates="chat_messages")
+
+    __table_args__ = (
+        # Keyset pagination of a namespace's history: (created_at, id) is the cursor.
+        Index("ix_chat_messages_namespace_created_at_id", "namespace", "created_at", "id"),
+    )
@@ -0,0 +1,20 @@
+# app/models/indexed_repo.py
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, func
+from app.utils.db import Base
+
+class IndexedRepo(Base):
+    # A repo whose vectors are still in the index for this user. ActiveRepo
+    # only points at the default one; cold rows are evicted least recently used first.
+    __tablename__ = "indexed_repos"
+    user_id = Column(String, ForeignKey("users.id"), primary_key=True)
+    repo_url = Column(String, primary_key=True)
+    namespace = Column(String, nullable=False)
+    provider = Column(String, nullable=False, default="openai")
+    vector_count = Column(Integer, nullable=False, default=0)
+    # INDEX_VERSION of the last full ingest; NULL for namespaces from before
+    # it was recorded (or adopted), whose vector ids may not be vector_id()s.
+    index_version = Column(Integer, nullable=True)
+    # Encrypted HMAC secret for this user's GitHub push webhook on the repo.
+    webhook_secret = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_used_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
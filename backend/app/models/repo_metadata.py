@@ -1,6 +1,6 @@
 # app/models/repo_metadata.py
 
-from sqlalchemy import Column, String, Text, DateTime, func
+from sqlalchemy import Column, String, Text, LargeBinary, DateTime, func
 from app.utils.db import Base
 
 class RepoMetadata(Base):
@@ -9,4 +9,7 @@ class RepoMetadata(Base):
     file_tree_json = Column(Text, nullable=False)
     analytics_json = Column(Text, nullable=True)
     dependency_graph_json = Column(Text, nullable=True)
+    # The /repo/metadata response body, gzipped once at ingest.
+    payload_gz = Column(LargeBinary, nullable=True)
+    payload_etag = Column(String, nullable=True)
     last_updated = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,15 @@
+# app/models/repo_tree.py
+from sqlalchemy import Column, String, Boolean, Integer, BigInteger
+from app.utils.db import Base
+
+class RepoTreeEntry(Base):
+    # One row per file or directory. The primary key orders each directory's
+    # children dirs-first then by name, so a listing is a single range scan.
+    __tablename__ = "repo_tree_entries"
+    repo_url = Column(String, primary_key=True)
+    parent = Column(String, primary_key=True)  # "" for the repo root
+    is_file = Column(Boolean, primary_key=True)
+    name = Column(String, primary_key=True)
+    size = Column(BigInteger, nullable=False, default=0)  # bytes, recursive for dirs
+    file_count = Column(Integer, nullable=False, default=0)  # recursive, dirs only
+    dir_count = Column(Integer, nullable=False, default=0)  # recursive, dirs only
@@ -0,0 +1,9 @@
+# app/models/symbol_index.py
+from sqlalchemy import Column, String, LargeBinary, DateTime, func
+from app.utils.db import Base
+
+class SymbolIndex(Base):
+    __tablename__ = "symbol_indexes"
+    namespace = Column(String, primary_key=True)
+    data = Column(LargeBinary, nullable=False)  # zlib-compressed JSON from build_symbol_index
+    last_updated = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,22 +1,46 @@
 # app/routers/ai.py
 import os
 import re
+import json
 from typing import Optional
-from fastapi import APIRouter, HTTPException, Body, Depends, Query
+from fastapi import APIRouter, HTTPException, Body, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.services.github_service import list_repo_file_paths
-from app.services.rag_service import chat_with_rag, validate_key
-from app.utils.db import get_db
-from app.crud.api_key import upsert_api_key, delete_api_key, get_api_key_by_provider
-from app.crud.active_repo import get_active_repo
-from app.crud.chat import log_chat, get_chat_messages_for_namespace, delete_chat_message
+from app.services.rag_service import (
+    achat_with_rag,
+    stream_chat_with_rag,
+    validate_key,
+    llm_provider_for,
+    requires_api_key,
+)
+from app.utils.db import get_db, get_async_db
+from app.utils.concurrency import run_blocking
+from app.utils.singleflight import SingleFlight
+from app.crud.api_key import upsert_api_key, delete_api_key, aget_api_key_by_provider
+from app.crud.indexed_repo import aresolve_repo, atouch_indexed_repo
+from app.crud.symbol_index import aget_symbol_index
+from app.crud.repo_metadata import aget_dependency_graph
+from app.services.symbol_index import answer_structural_query
+from app.services.query_scope import (
+    QueryScope, infer_scope, merge_scopes, normalize_language, normalize_path, SCOPE_INDEX_VERSION,
+)
+from app.crud.chat import aget_chat_messages_page, adelete_chat_message
+from app.services.chat_log_service import chat_log_writer
 from app.schemas.chat import ChatRequest, ChatResponse, ChatHistoryResponse
+from app.core.config import CHAT_HISTORY_PAGE_SIZE, CHAT_HISTORY_MAX_PAGE_SIZE
 
 router = APIRouter(prefix="/ai", tags=["AI"])
 
 class GetChatHistoryRequest(BaseModel):
     user_id: str
+    repo_url: Optional[str] = None
+    limit: Optional[int] = None
+    before: Optional[str] = None
+    truncate: Optional[int] = None
 
 class GetKeyRequestOld(BaseModel):
     user_id: str
@@ -44,26 +68,35 @@ class DeleteKeyRequest(BaseModel):
 @router.post("/get_chat_history", response_model=ChatHistoryResponse)
 async def get_chat_history_endpoint(
     body: GetChatHistoryRequest = Body(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     try:
-        repo_obj = get_active_repo(db, body.user_id)
+        repo_obj = await aresolve_repo(db, body.user_id, body.repo_url)
         if not repo_obj:
             raise HTTPException(status_code=400, detail="No active repo set for this user. Please ingest a repo first.")
-        repo_url = repo_obj.repo_url
-        namespace = f"{body.user_id}_{repo_url.rstrip('/').split('/')[-1]}"
-        messages = get_chat_messages_for_namespace(db, namespace)
-        return {"messages": messages}
+        namespace = repo_obj.namespace
+        limit = min(max(1, body.limit or CHAT_HISTORY_PAGE_SIZE), CHAT_HISTORY_MAX_PAGE_SIZE)
+        await chat_log_writer.flush()
+        truncate = body.truncate if body.truncate and body.truncate > 0 else None
+        try:
+            messages, next_cursor = await aget_chat_messages_page(
+                db, namespace, limit, before=body.before, truncate=truncate
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return {"messages": messages, "next_cursor": next_cursor}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/get_api_key")
-async def get_key(body: GetKeyRequest, db: Session = Depends(get_db)):
-    key = get_api_key_by_provider(db, body.user_id, body.provider)
+async def get_key(body: GetKeyRequest, db: AsyncSession = Depends(get_async_db)):
+    key = await aget_api_key_by_provider(db, body.user_id, body.provider)
     return {"exists": bool(key), "masked_key": ("****" + key[-4:]) if key else ""}
 
 @router.post("/validate_api_key")
-async def validate_key_endpoint(body: ValidateKeyRequest, db: Session = Depends(get_db)):
+def validate_key_endpoint(body: ValidateKeyRequest, db: Session = Depends(get_db)):
     api_key = body.api_key
     if not api_key or not isinstance(api_key, str):
         return {"valid": False, "error": "api_key missing or invalid"}
@@ -73,7 +106,7 @@ async def validate_key_endpoint(body: ValidateKeyRequest, db: Session = Depends(
     return {"valid": ok}
 
 @router.delete("/delete_api_key")
-async def delete_key_endpoint(body: DeleteKeyRequest, db: Session = Depends(get_db)):
+def delete_key_endpoint(body: DeleteKeyRequest, db: Session = Depends(get_db)):
     deleted = delete_api_key(db, body.user_id, body.provider)
     if not deleted:
         raise HTTPException(404, "API key not found for this user & provider.")
@@ -99,54 +132,164 @@ def _format_tree_from_paths(paths: list[str]) -> str:
     walk(tree, "")
     return "\n".join(lines)
 
-@router.post("/chat", response_model=ChatResponse)
-async def chat_endpoint(req: ChatRequest, db: Session = Depends(get_db)):
-    repo_obj = get_active_repo(db, req.user_id)
+_LIST_FILES_RE = re.compile(r"(list|show|print|give|display).*?(files|file names|project files|repo files)", re.I)
+_SHOW_TREE_RE = re.compile(r"(show|display|list|print).*?(structure|tree|folder|directory|hierarchy)", re.I)
+
+async def _answer_intent(message: str, repo_url: str, namespace: str, db: AsyncSession) -> Optional[str]:
+    intent_msg = message.strip().lower()
+    if not (_LIST_FILES_RE.search(intent_msg) or _SHOW_TREE_RE.search(intent_msg)):
+        symbol_index = await aget_symbol_index(db, namespace)
+        return answer_structural_query(symbol_index, message) if symbol_index else None
+    parts = repo_url.rstrip("/").split("/")
+    owner, repo = parts[-2], parts[-1]
+    github_token = os.getenv("GITHUB_TOKEN")
+    try:
+        paths = await run_blocking(list_repo_file_paths, owner, repo, github_token=github_token)
+    except Exception as e:
+        raise HTTPException(500, f"Failed to list repo files: {e}")
+    if _SHOW_TREE_RE.search(intent_msg):
+        return _format_tree_from_paths(paths)
+    return "\n".join(sorted(paths))
+
+async def _resolve_chat(req: ChatRequest, db: AsyncSession):
+    repo_obj = await aresolve_repo(db, req.user_id, req.repo_url)
     if not repo_obj:
+        if req.repo_url:
+            raise HTTPException(404, "That repo is not indexed for this user. Please ingest it first.")
         raise HTTPException(400, "No active repo set. Please ingest a repo first.")
-    repo_url = repo_obj.repo_url
-    provider = getattr(req, "provider", None)
-    saved_provider = repo_obj.provider if repo_obj.provider else "openai"
-    provider = provider or saved_provider
+    await atouch_indexed_repo(db, req.user_id, repo_obj.repo_url)
+    provider = getattr(req, "provider", None) or repo_obj.provider
+    return repo_obj.repo_url, provider, repo_obj.namespace, repo_obj.index_version
 
-    intent_msg = req.message.strip().lower()
-    list_files_re = re.compile(r"(list|show|print|give|display).*?(files|file names|project files|repo files)", re.I)
-    show_tree_re = re.compile(r"(show|display|list|print).*?(structure|tree|folder|directory|hierarchy)", re.I)
+async def _chat_api_key(db: AsyncSession, user_id: str, provider: str) -> str:
+    # The key belongs to whichever provider answers; "local" embeds in-process.
+    llm_provider = llm_provider_for(provider)
+    if not requires_api_key(llm_provider):
+        return ""
+    api_key = await aget_api_key_by_provider(db, user_id, llm_provider)
+    if not api_key:
+        raise HTTPException(401, f"No {llm_provider} API key set for this user.")
+    return api_key
 
+async def _chat_scope(req: ChatRequest, namespace: str, db: AsyncSession) -> QueryScope:
+    explicit = None
+    if req.scope:
+        # Same spellings chunk metadata uses: "ts" -> "TypeScript", "./src/" -> "src".
+        languages = []
+        for name in req.scope.languages or ():
+            lang = normalize_language(name)
+            if not lang:
+                raise HTTPException(400, f"Unknown language in scope: {name!r}.")
+            languages.append(lang)
+        explicit = QueryScope(
+            tuple(filter(None, map(normalize_path, req.scope.dirs or ()))),
+            tuple(filter(None, map(normalize_path, req.scope.files or ()))),
+            tuple(dict.fromkeys(languages)), req.scope.tests,
+        )
+    if not req.infer_scope:
+        return explicit or QueryScope()
+    # The symbol index (cached) has the repo's file list to check phrases against.
+    symbol_index = await aget_symbol_index(db, namespace)
+    inferred = infer_scope(req.message, symbol_index["files"] if symbol_index else None)
+    return merge_scopes(explicit, inferred)
 
-    if list_files_re.search(intent_msg) or show_tree_re.search(intent_msg):
-        parts = repo_url.rstrip("/").split("/")
-        owner, repo = parts[-2], parts[-1]
-        github_token = os.getenv("GITHUB_TOKEN")
-        try:
-            paths = list_repo_file_paths(owner, repo, github_token=github_token)
-        except Exception as e:
-            raise HTTPException(500, f"Failed to list repo files: {e}")
-        if show_tree_re.search(intent_msg):
-            result_text = _format_tree_from_paths(paths)
-        else:
-            result_text = "\n".join(sorted(paths))
-        namespace = f"{req.user_id}_{repo_url.rstrip('/').split('/')[-1]}"
-        log_chat(db, namespace, role="user", content=req.message, user_id=req.user_id)
-        log_chat(db, namespace, role="assistant", content=result_text, user_id=req.user_id)
+def _scope_prefilter(index_version: Optional[int]) -> bool:
+    # Metadata filters only see every file once a full ingest added scope metadata.
+    return (index_version or 0) >= SCOPE_INDEX_VERSION
+
+_chat_flight = SingleFlight("chat")
+
+def _normalize_query(message: str) -> str:
+    return " ".join(message.lower().split()).rstrip("?!. ")
+
+@router.post("/chat", response_model=ChatResponse)
+async def chat_endpoint(req: ChatRequest, db: AsyncSession = Depends(get_async_db)):
+    repo_url, provider, namespace, index_version = await _resolve_chat(req, db)
+
+    result_text = await _answer_intent(req.message, repo_url, namespace, db)
+    if result_text is not None:
+        chat_log_writer.enqueue(namespace, role="user", content=req.message, user_id=req.user_id)
+        chat_log_writer.enqueue(namespace, role="assistant", content=result_text, user_id=req.user_id)
         return {"result": result_text}
 
-    api_key = get_api_key_by_provider(db, req.user_id, provider)
-    if not api_key:
-        raise HTTPException(401, f"No {provider} API key set for this user.")
-    namespace = f"{req.user_id}_{repo_url.rstrip('/').split('/')[-1]}"
-    log_chat(db, namespace, role="user", content=req.message, user_id=req.user_id)
-    result = chat_with_rag(req.message, namespace, provider, api_key)
-    log_chat(db, namespace, role="assistant", content=result, user_id=req.user_id)
+    api_key = await _chat_api_key(db, req.user_id, provider)
+    graph = await aget_dependency_graph(db, repo_url)
+    scope = await _chat_scope(req, namespace, db)
+    chat_log_writer.enqueue(namespace, role="user", content=req.message, user_id=req.user_id)
+    result = await _chat_flight.do(
+        (namespace, _normalize_query(req.message), provider, scope),
+        lambda: achat_with_rag(req.message, namespace, provider, api_key, graph, scope, _scope_prefilter(index_version)),
+    )
+    chat_log_writer.enqueue(namespace, role="assistant", content=result, user_id=req.user_id)
     return {"result": result}
 
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def _single_answer(text: str):
+    yield "sources", []
+    yield "token", text
+
+@router.post("/chat/stream")
+async def chat_stream_endpoint(req: ChatRequest, request: Request, db: AsyncSession = Depends(get_async_db)):
+    repo_url, provider, namespace, index_version = await _resolve_chat(req, db)
+
+    result_text = await _answer_intent(req.message, repo_url, namespace, db)
+    api_key = graph = scope = None
+    if result_text is None:
+        api_key = await _chat_api_key(db, req.user_id, provider)
+        graph = await aget_dependency_graph(db, repo_url)
+        scope = await _chat_scope(req, namespace, db)
+    chat_log_writer.enqueue(namespace, role="user", content=req.message, user_id=req.user_id)
+
+    async def event_stream():
+        if result_text is not None:
+            events = _single_answer(result_text)
+        else:
+            events = stream_chat_with_rag(
+                req.message, namespace, provider, api_key, graph, scope, _scope_prefilter(index_version),
+            )
+        parts = []
+        try:
+            async for event, data in events:
+                if await request.is_disconnected():
+                    return
+                if event == "token":
+                    parts.append(data)
+                yield _sse(event, data)
+        except Exception as e:
+            print(f"ERROR: /ai/chat/stream failed: {e}")
+            yield _sse("error", {"detail": str(e)})
+            return
+        finally:
+            await events.aclose()
+
+        saved = chat_log_writer.enqueue(namespace, role="assistant", content="".join(parts), user_id=req.user_id)
+        msg_id = None
+        if saved:
+            try:
+                msg_id = await saved
+            except Exception as e:
+                print(f"ERROR: chat message not saved: {e}")
+        yield _sse("done", {"id": msg_id})
+
+    # Closing the body after the response also closes the provider stream
+    # (and frees its Ollama slot) if the client left mid-answer.
+    body = event_stream()
+    return StreamingResponse(
+        body,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(body.aclose),
+    )
+
 @router.delete("/delete_message")
 async def delete_message_endpoint(
     msg_id: int = Query(...),
     user_id: str = Query(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    ok = delete_chat_message(db, msg_id, user_id)
+    ok = await adelete_chat_message(db, msg_id, user_id)
     if not ok:
         raise HTTPException(status_code=404, detail="Message not found or unauthorized.")
     return {"deleted": True}
@@ -1,27 +1,56 @@
 # app/routers/repo.py
-from fastapi import APIRouter, HTTPException, Body, Depends, Query
+from fastapi import APIRouter, HTTPException, Body, Depends, Query, Request, Response
 from typing import Optional
+import gzip
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 import json
 import requests
 import os
 from dotenv import load_dotenv
+from app.core.config import TREE_PAGE_SIZE, TREE_MAX_PAGE_SIZE, GITHUB_API_URL
 
 from app.services.github_service import list_and_get_files, get_file_content_from_github, list_repo_file_paths
-from app.services.chunking_service import chunk_files_mem
-from app.services.rag_service import upsert_chunks_to_pinecone, delete_pinecone_namespace
-from app.utils.db import get_db
+from app.services.chunking_service import chunk_files_with_symbols, INDEX_VERSION
+from app.services.rag_service import upsert_chunks_to_pinecone, delete_pinecone_namespace, requires_api_key
+from app.utils.db import get_db, get_async_db
+from app.utils.concurrency import run_blocking
+from app.utils.json_response import accepts_gzip, fast_json_response
+from app.utils.static_files import etag_matches
 
 from app.crud.api_key import get_api_key_by_provider
-from app.crud.repo_metadata import get_repo_metadata, upsert_repo_metadata
+from app.crud.repo_metadata import (
+    aget_repo_metadata_etag,
+    aget_repo_metadata_payload,
+    upsert_repo_metadata,
+)
 from app.crud.active_repo import (
-    get_active_repo,
+    aget_active_repo,
     set_active_repo,
     delete_active_repo,
 )
-from app.crud.chat import delete_chat_namespace
-from app.services.repo_analysis import build_file_tree, build_file_tree_from_paths,analyze_repo 
+from app.crud.indexed_repo import (
+    get_indexed_repo,
+    alist_indexed_repos,
+    aresolve_repo,
+    upsert_indexed_repo,
+    touch_indexed_repo,
+    namespace_for,
+)
+from app.crud.repo_tree import replace_repo_tree, aget_tree_dir, aget_tree_children_page
+from app.crud.symbol_index import upsert_symbol_index, delete_symbol_index
+from app.services.repo_analysis import (
+    build_file_tree,
+    build_file_tree_from_paths,
+    build_tree_entries,
+    front_code_paths,
+    flatten_file_tree,
+    RepoAnalytics,
+)
+from app.services.symbol_index import build_symbol_index
+from app.services.dependency_graph import build_dependency_graph
+from app.services.repo_index_service import adopt_active_repo, evict_cold_repos
 
 load_dotenv()
 
@@ -30,6 +59,7 @@ class GetActiveRepoRequest(BaseModel):
 
 class SwitchRepoRequest(BaseModel):
     user_id: str
+    repo_url: Optional[str] = None
 
 class GetFileContentRequest(BaseModel):
     user_id: str
@@ -37,62 +67,116 @@ class GetFileContentRequest(BaseModel):
 
 router = APIRouter(prefix="/repo", tags=["Repo"])
 
+async def _metadata_response(request: Request, user_id: str, db: AsyncSession, repo_url: Optional[str] = None) -> Response:
+    repo_obj = await aresolve_repo(db, user_id, repo_url)
+    if not repo_obj:
+        raise HTTPException(status_code=400, detail="No active repo for user.")
+
+    repo_url = repo_obj.repo_url
+    headers = {"Cache-Control": "private, no-cache", "Vary": "Accept-Encoding"}
+
+    # Cheap path: compare against the stored hash without loading the blob.
+    etag = await aget_repo_metadata_etag(db, repo_url)
+    if etag and etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={**headers, "ETag": etag})
+
+    payload = await aget_repo_metadata_payload(db, repo_url)
+    if not payload:
+        raise HTTPException(status_code=404, detail="No metadata found for this repo. Please re-ingest.")
+    body, etag = payload
+    headers["ETag"] = etag
+
+    if accepts_gzip(request):
+        headers["Content-Encoding"] = "gzip"
+    else:
+        body = gzip.decompress(body)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@router.get("/metadata")
+async def get_repo_metadata_cached(
+    request: Request,
+    user_id: str = Query(...),
+    repo_url: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await _metadata_response(request, user_id, db, repo_url)
+
 @router.post("/metadata")
 async def get_repo_metadata_endpoint(
+    request: Request,
     body: GetActiveRepoRequest = Body(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await _metadata_response(request, body.user_id, db)
+
+@router.get("/tree/children")
+async def get_tree_children(
+    user_id: str = Query(...),
+    path: str = Query(""),
+    limit: Optional[int] = Query(None),
+    cursor: Optional[str] = Query(None),
+    repo_url: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    repo_obj = get_active_repo(db, body.user_id)
+    repo_obj = await aresolve_repo(db, user_id, repo_url)
     if not repo_obj:
         raise HTTPException(status_code=400, detail="No active repo for user.")
+    repo_url = repo_obj.repo_url
+    path = path.strip("/")
+    limit = min(max(1, limit or TREE_PAGE_SIZE), TREE_MAX_PAGE_SIZE)
 
-    repo_url = repo_obj.repo_url 
-    meta = get_repo_metadata(db, repo_url)
-    if not meta:
-        raise HTTPException(status_code=404, detail="No metadata found for this repo. Please re-ingest.")
+    directory = None
+    if path:
+        directory = await aget_tree_dir(db, repo_url, path)
+        if not directory:
+            raise HTTPException(status_code=404, detail="Directory not found.")
+    try:
+        entries, next_cursor = await aget_tree_children_page(db, repo_url, path, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not path and not entries and not cursor:
+        raise HTTPException(status_code=404, detail="No file tree found for this repo. Please re-ingest.")
 
-    return {
-        "file_tree": json.loads(meta.file_tree_json),
-        "analytics": json.loads(meta.analytics_json) if meta.analytics_json else {},
-        "dependency_graph": json.loads(meta.dependency_graph_json) if meta.dependency_graph_json else {},
-    }
+    result = {"path": path, "entries": entries, "next_cursor": next_cursor}
+    if directory:
+        result["size"] = directory.size
+        result["files"] = directory.file_count
+        result["dirs"] = directory.dir_count
+    return result
 
 @router.post("/ingest_repo")
 async def ingest_repo(
     repo_url: str = Body(...),
     user_id: str = Body(...),
     provider: str = Body("openai"),
+    refresh: bool = Body(False),
     db: Session = Depends(get_db)
 ):
     try:
-        previous_repo_obj = get_active_repo(db, user_id)
-        if previous_repo_obj:
-            prev_repo_url = previous_repo_obj.repo_url
-            prev_provider = previous_repo_obj.provider
-            
-            prev_repo = prev_repo_url.rstrip("/").split("/")[-1]
-            prev_namespace = f"{user_id}_{prev_repo}"
-            
+        # Earlier repos stay indexed; cold ones are evicted by budget below.
+        adopt_active_repo(db, user_id)
+        indexed = get_indexed_repo(db, user_id, repo_url)
+        if indexed and indexed.provider == provider and not refresh:
+            touch_indexed_repo(db, user_id, repo_url, force=True)
+            set_active_repo(db, user_id, repo_url, provider)
+            return {"ok": True, "namespace": indexed.namespace, "cached": True}
+        if indexed:
+            # Re-ingest from scratch so vectors of deleted files don't linger.
+            delete_pinecone_namespace(indexed.namespace, indexed.provider)
+            delete_symbol_index(db, indexed.namespace)
+
+        api_key = ""
+        if requires_api_key(provider):
             try:
-                delete_pinecone_namespace(prev_namespace, prev_provider)
-            except TypeError:
-                delete_pinecone_namespace(prev_namespace)
-                
-            delete_chat_namespace(db, prev_namespace)
-            delete_active_repo(db, user_id)
-
-        api_key = None
-        try:
-            api_key = get_api_key_by_provider(db, user_id, provider)
-        except Exception as e:
-            print(f"/ingest_repo get_api_key_by_provider failed: {e}")
+                api_key = get_api_key_by_provider(db, user_id, provider)
+            except Exception as e:
+                print(f"/ingest_repo get_api_key_by_provider failed: {e}")
 
-            
-        if not api_key:
-            raise HTTPException(
-                status_code=401,
-                detail=f"No {provider} API key set for this user."
-            )
+            if not api_key:
+                raise HTTPException(
+                    status_code=401,
+                    detail=f"No {provider} API key set for this user."
+                )
 
         github_token = os.getenv("GITHUB_TOKEN")
         auth_headers = {"Authorization": f"token {github_token}"} if github_token else {}
@@ -100,15 +184,14 @@ async def ingest_repo(
         parts = repo_url.rstrip("/").split("/")
         owner, repo = parts[-2], parts[-1]
 
-        files = list_and_get_files(owner, repo, github_token=github_token)
-        chunks = chunk_files_mem(files)
-        namespace = f"{user_id}_{repo}"
-        try:
-            upsert_chunks_to_pinecone(chunks, namespace, provider, api_key)
-        except TypeError:
-            upsert_chunks_to_pinecone(chunks, namespace, api_key)
+        file_stats = RepoAnalytics()
+        files = list_and_get_files(owner, repo, github_token=github_token, analytics=file_stats)
+        chunks, symbols = chunk_files_with_symbols(files)
+        namespace = namespace_for(db, user_id, repo_url)
+        upsert_chunks_to_pinecone(chunks, namespace, provider, api_key)
+        upsert_symbol_index(db, namespace, build_symbol_index(files, symbols))
 
-        GITHUB_API = "https://api.github.com"
+        GITHUB_API = GITHUB_API_URL
 
         def github_get(url, headers=auth_headers, desc=""):
             resp = requests.get(url, headers=headers)
@@ -163,11 +246,11 @@ async def ingest_repo(
             "readme": readme[:3000] + ("..." if len(readme) > 3000 else ""),
         }
 
+        analytics.update(file_stats.result())
         file_tree = build_file_tree(files)
         analytics_json = json.dumps(analytics)
         file_tree_json = json.dumps(file_tree)
-        repo_file_analytics = analyze_repo(files)
-        dependency_graph_json = json.dumps(repo_file_analytics)
+        dependency_graph_json = json.dumps(build_dependency_graph(files, symbols), separators=(",", ":"))
 
         upsert_repo_metadata(
             db=db,
@@ -176,9 +259,12 @@ async def ingest_repo(
             analytics_json=analytics_json,
             dependency_graph_json=dependency_graph_json,
         )
+        replace_repo_tree(db, repo_url, build_tree_entries(files))
         
+        upsert_indexed_repo(db, user_id, repo_url, namespace, provider, len(chunks), INDEX_VERSION)
         set_active_repo(db, user_id, repo_url, provider)
-        return {"ok": True, "namespace": namespace}
+        evicted = evict_cold_repos(db, user_id, keep_repo_url=repo_url)
+        return {"ok": True, "namespace": namespace, "evicted": [r.repo_url for r in evicted if r.user_id == user_id]}
     except HTTPException:
         raise
     except Exception as e:
@@ -190,42 +276,49 @@ async def switch_repo(
     body: SwitchRepoRequest = Body(...),
     db: Session = Depends(get_db)
 ):
+    # Switching keeps every repo indexed. With a repo_url it makes that warm
+    # repo the active one; without, it just clears the active repo.
     user_id = body.user_id
     try:
-        repo_obj = get_active_repo(db, user_id)
-        if repo_obj:
-            repo_url = repo_obj.repo_url
-            provider = repo_obj.provider
-            
-            repo = repo_url.rstrip("/").split("/")[-1]
-            namespace = f"{user_id}_{repo}"
-            try:
-                delete_pinecone_namespace(namespace, provider)
-            except TypeError:
-                delete_pinecone_namespace(namespace)
-                
-            delete_chat_namespace(db, namespace)
-            delete_active_repo(db, user_id)
-            
+        if body.repo_url:
+            indexed = get_indexed_repo(db, user_id, body.repo_url)
+            if not indexed:
+                raise HTTPException(status_code=404, detail="That repo is not indexed for this user. Please ingest it first.")
+            touch_indexed_repo(db, user_id, indexed.repo_url, force=True)
+            set_active_repo(db, user_id, indexed.repo_url, indexed.provider)
+            return {"ok": True, "repo_url": indexed.repo_url}
+        adopt_active_repo(db, user_id)
+        delete_active_repo(db, user_id)
         return {"ok": True}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/indexed")
+async def list_indexed_repos(user_id: str = Query(...), db: AsyncSession = Depends(get_async_db)):
+    active = await aget_active_repo(db, user_id)
+    repos = await alist_indexed_repos(db, user_id)
+    return {
+        "active": active.repo_url if active else None,
+        "repos": [{"repo_url": r.repo_url, "provider": r.provider, "vectors": r.vector_count} for r in repos],
+    }
+
 @router.post("/get_active_repo")
 async def get_active_repo_endpoint(
     body: GetActiveRepoRequest = Body(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    repo_obj = get_active_repo(db, body.user_id)
+    repo_obj = await aget_active_repo(db, body.user_id)
     repo_url = repo_obj.repo_url if repo_obj else None
     return {"repo_url": repo_url}
 
 @router.post("/get_file_content")
 async def get_file_content(
     body: GetFileContentRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    repo_obj = get_active_repo(db, body.user_id)
+    repo_obj = await aget_active_repo(db, body.user_id)
     if not repo_obj:
         raise HTTPException(status_code=400, detail="No active repo for user.")
         
@@ -234,24 +327,39 @@ async def get_file_content(
     owner, repo = parts[-2], parts[-1]
     try:
         github_token = os.getenv("GITHUB_TOKEN")
-        content = get_file_content_from_github(owner, repo, body.file_path, github_token=github_token)
+        content = await run_blocking(get_file_content_from_github, owner, repo, body.file_path, github_token=github_token)
         return {"content": content}
     except Exception as e:
         raise HTTPException(status_code=500, detail="Failed to fetch file content.")
     
 @router.get("/files")
-def list_repo_files(owner: str = Query(...), repo: str = Query(...), github_token: Optional[str] = None):
+def list_repo_files(
+    request: Request,
+    owner: str = Query(...),
+    repo: str = Query(...),
+    github_token: Optional[str] = None,
+    format: str = Query("list", pattern="^(list|front)$"),
+):
     try:
         paths = list_repo_file_paths(owner, repo, github_token)
-        return {"owner": owner, "repo": repo, "count": len(paths), "files": paths}
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Failed to list files: {e}")
+    # "front": sorted and prefix-compressed, see front_code_paths.
+    files = front_code_paths(paths) if format == "front" else paths
+    return fast_json_response(request, {"owner": owner, "repo": repo, "count": len(paths), "files": files})
 
 @router.get("/tree")
-def get_repo_tree(owner: str = Query(...), repo: str = Query(...), github_token: Optional[str] = None):
+def get_repo_tree(
+    request: Request,
+    owner: str = Query(...),
+    repo: str = Query(...),
+    github_token: Optional[str] = None,
+    format: str = Query("nested", pattern="^(nested|flat)$"),
+):
     try:
         paths = list_repo_file_paths(owner, repo, github_token)
-        tree = build_file_tree_from_paths(paths)
-        return {"owner": owner, "repo": repo, "tree": tree}
+        # "flat": names plus parent indices, see flatten_file_tree.
+        tree = flatten_file_tree(paths) if format == "flat" else build_file_tree_from_paths(paths)
     except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Failed to build tree: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=f"Failed to build tree: {e}")
+    return fast_json_response(request, {"owner": owner, "repo": repo, "tree": tree})
\ No newline at end of file
@@ -0,0 +1,84 @@
+# app/routers/webhooks.py
+import json
+import secrets
+from typing import Optional
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Request
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import GITHUB_WEBHOOKS_ENABLED
+from app.crud.indexed_repo import aget_indexed_repo, aget_webhook_secret, aset_webhook_secret, awebhook_secrets_for_repo
+from app.services.webhook_service import push_changes, push_reindexer, verify_signature, WEBHOOK_PUSHES
+from app.utils.db import get_async_db
+
+router = APIRouter(prefix="/webhooks", tags=["Webhooks"])
+
+class WebhookSecretRequest(BaseModel):
+    user_id: str
+    repo_url: str
+    # Replace an existing secret (the hook on GitHub must be updated too);
+    # also how to get a usable secret again, since it is only shown once.
+    rotate: bool = False
+
+@router.post("/github/secret")
+async def github_webhook_secret(
+    request: Request,
+    body: WebhookSecretRequest = Body(...),
+    db: AsyncSession = Depends(get_async_db),
+):
+    # Settings for the repo's GitHub webhook. The secret is only returned in
+    # full when it is created or rotated; afterwards it is masked like API keys.
+    if not GITHUB_WEBHOOKS_ENABLED:
+        raise HTTPException(status_code=404, detail="Webhooks are not enabled.")
+    if not await aget_indexed_repo(db, body.user_id, body.repo_url):
+        raise HTTPException(status_code=404, detail="That repo is not indexed for this user.")
+    secret = secrets.token_hex(32)
+    created = await aset_webhook_secret(db, body.user_id, body.repo_url, secret, replace=body.rotate)
+    if not created:
+        secret = await aget_webhook_secret(db, body.user_id, body.repo_url) or ""
+    return {
+        "payload_url": str(request.url_for("github_webhook")),
+        "content_type": "application/json",
+        "secret": secret if created else None,
+        "masked_secret": "****" + secret[-4:],
+        "events": ["push"],
+    }
+
+@router.post("/github")
+async def github_webhook(
+    request: Request,
+    x_github_event: str = Header(""),
+    x_hub_signature_256: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    if not GITHUB_WEBHOOKS_ENABLED:
+        raise HTTPException(status_code=404, detail="Webhooks are not enabled.")
+    body = await request.body()
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        payload = None
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=400, detail="Invalid JSON payload.")
+
+    # The payload names the repo; its signature decides whose namespaces of
+    # that repo the delivery may touch.
+    owner, _, repo = ((payload.get("repository") or {}).get("full_name") or "").partition("/")
+    candidates = await awebhook_secrets_for_repo(db, owner, repo) if owner and repo else []
+    users = frozenset(u for u, secret in candidates if verify_signature(secret, body, x_hub_signature_256))
+    if not users:
+        WEBHOOK_PUSHES.inc(result="bad_signature")
+        raise HTTPException(status_code=401, detail="Invalid signature.")
+    if x_github_event == "ping":
+        return {"ok": True}
+    if x_github_event != "push":
+        return {"ok": True, "ignored": x_github_event}
+
+    changes = push_changes(payload)
+    if changes is None:
+        # Tags, other branches, branch deletions, pushes with no file changes.
+        WEBHOOK_PUSHES.inc(result="ignored")
+        return {"ok": True, "ignored": "push"}
+    push_reindexer.submit(changes._replace(users=users))
+    WEBHOOK_PUSHES.inc(result="queued")
+    return JSONResponse({"ok": True, "queued": len(changes.paths)}, status_code=202)
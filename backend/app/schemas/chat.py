@@ -3,23 +3,40 @@ from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
 
+# Restricts retrieval; empty fields don't restrict. dirs include subdirectories.
+class ChatScope(BaseModel):
+    dirs: Optional[List[str]] = None
+    files: Optional[List[str]] = None
+    languages: Optional[List[str]] = None
+    # True: only test files, False: no test files.
+    tests: Optional[bool] = None
+
 # Used for /ai/chat
 class ChatRequest(BaseModel):
     message: str
     user_id: str
     provider: Optional[str] = None  
+    # Any repo the user has indexed; defaults to the active one.
+    repo_url: Optional[str] = None
+    scope: Optional[ChatScope] = None
+    # Also read explicit scope phrases from the message ("in backend/app",
+    # "restrict to Python", "tests only").
+    infer_scope: bool = False
 
 class ChatResponse(BaseModel):
     result: str
 
 # Used for chat history output
 class ChatMessageOut(BaseModel):
+    id: int
     role: str
     content: str
     created_at: datetime
+    truncated: bool = False
 
     class Config:
         from_attributes = True  
 
 class ChatHistoryResponse(BaseModel):
-    messages: List[ChatMessageOut]
\ No newline at end of file
+    messages: List[ChatMessageOut]
+    next_cursor: Optional[str] = None
\ No newline at end of file
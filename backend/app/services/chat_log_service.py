@@ -0,0 +1,157 @@
+# app/services/chat_log_service.py
+import asyncio
+import atexit
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+from app.core.config import CHAT_LOG_BATCH_SIZE, CHAT_LOG_FLUSH_INTERVAL_MS, CHAT_LOG_MAX_RETRIES
+from app.crud.chat import bulk_log_chat
+from app.utils.db import SessionLocal
+from app.utils.concurrency import run_blocking
+
+def _write_batch(rows: List[dict]) -> List[int]:
+    db = SessionLocal()
+    try:
+        return bulk_log_chat(db, rows)
+    finally:
+        db.close()
+
+def _write_rows(rows: List[dict]) -> list:
+    # One insert per row: the id, or the exception for a row that can't be
+    # written (e.g. an unknown user_id) so it doesn't hold back the others.
+    db = SessionLocal()
+    results = []
+    try:
+        for row in rows:
+            try:
+                results.append(bulk_log_chat(db, [row])[0])
+            except Exception as e:
+                db.rollback()
+                results.append(e)
+        return results
+    finally:
+        db.close()
+
+# Write-behind chat log: a background task inserts queued messages once
+# batch_size are pending or flush_interval after the first one arrives.
+# Readers call flush() first to see their own writes; stop() drains on shutdown.
+# A batch that fails max_retries times in a row is written row by row; rows
+# that still fail are dropped (logged, their futures failed).
+class ChatLogWriter:
+    def __init__(
+        self,
+        batch_size: int = CHAT_LOG_BATCH_SIZE,
+        flush_interval_ms: int = CHAT_LOG_FLUSH_INTERVAL_MS,
+        max_retries: int = CHAT_LOG_MAX_RETRIES,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_retries = max_retries
+        self._failures = 0
+        self._pending: List[Tuple[dict, Optional[asyncio.Future]]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._has_items: Optional[asyncio.Event] = None
+        self._full: Optional[asyncio.Event] = None
+
+    def start(self):
+        if self._task:
+            return
+        self._lock = asyncio.Lock()
+        self._has_items = asyncio.Event()
+        self._full = asyncio.Event()
+        if self._pending:
+            self._has_items.set()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        try:
+            await self.flush()
+        except Exception as e:
+            print(f"Error flushing chat log on shutdown: {e}")
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._flush_sync()
+
+    def enqueue(self, namespace: str, role: str, content: str, user_id: str) -> Optional[asyncio.Future]:
+        row = {
+            "namespace": namespace,
+            "role": role,
+            "content": content,
+            "user_id": user_id,
+            # Stamped here, not at insert time, so batching never reorders a turn.
+            "created_at": datetime.now(timezone.utc),
+        }
+        future = asyncio.get_running_loop().create_future() if self._task else None
+        self._pending.append((row, future))
+        if self._task:
+            self._has_items.set()
+            if len(self._pending) >= self.batch_size:
+                self._full.set()
+        return future
+
+    async def flush(self):
+        if self._lock is None:
+            self._flush_sync()
+            return
+        async with self._lock:
+            while self._pending:
+                batch = self._pending[:self.batch_size * 4]
+                del self._pending[:len(batch)]
+                rows = [row for row, _ in batch]
+                try:
+                    ids = await run_blocking(_write_batch, rows)
+                except Exception:
+                    self._failures += 1
+                    if self._failures < self.max_retries:
+                        self._pending[:0] = batch
+                        raise
+                    ids = await run_blocking(_write_rows, rows)
+                self._failures = 0
+                for (row, future), msg_id in zip(batch, ids):
+                    if isinstance(msg_id, Exception):
+                        print(
+                            f"Dropping chat message ns={row['namespace']} role={row['role']} "
+                            f"user={row['user_id']}: {msg_id}"
+                        )
+                        if future and not future.done():
+                            future.set_exception(msg_id)
+                            # Already logged above; callers needn't await it.
+                            future.exception()
+                    elif future and not future.done():
+                        future.set_result(msg_id)
+
+    def _flush_sync(self):
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        try:
+            _write_batch([row for row, _ in batch])
+        except Exception as e:
+            print(f"Error flushing {len(batch)} chat messages: {e}")
+
+    async def _run(self):
+        while True:
+            await self._has_items.wait()
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._has_items.clear()
+            self._full.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Error flushing chat log, retrying: {e}")
+                self._has_items.set()
+                await asyncio.sleep(self.flush_interval)
+
+chat_log_writer = ChatLogWriter()
+
+# Last resort if the app exits without running its shutdown hook.
+atexit.register(chat_log_writer._flush_sync)
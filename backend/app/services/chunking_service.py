@@ -1,7 +1,8 @@
 # app/services/chunking_service.py
 import os
+import time
 import hashlib
-from typing import Iterable, Dict, List, Generator
+from typing import Iterable, Dict, List, Generator, Tuple
 from multiprocessing import Pool  
 from app.core.config import (
     CHUNK_TOKENS,
@@ -9,6 +10,36 @@ from app.core.config import (
     MAX_CHUNKS_PER_FILE,
     REPO_WIDE_CHUNK_BUDGET,
 )
+from app.services.repo_analysis import file_metadata
+from app.services.symbol_index import (
+    extract_symbols,
+    symbols_cache_key,
+    get_cached_symbols,
+    put_cached_symbols,
+)
+from app.utils.metrics import Counter, Histogram, STAGE_LATENCY_BUCKETS
+
+CHUNKS_PRODUCED = Counter(
+    "gitrag_ingest_chunks_total",
+    "Chunks produced by ingest chunking, after the repo-wide budget.",
+)
+CHUNK_SECONDS = Histogram(
+    "gitrag_ingest_chunk_seconds",
+    "Wall time of one chunking and symbol-extraction pass over a repository.",
+    buckets=STAGE_LATENCY_BUCKETS,
+)
+CHUNK_THROUGHPUT = Histogram(
+    "gitrag_ingest_chunks_per_second",
+    "Chunking throughput of one ingest.",
+    buckets=(10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000),
+)
+
+def _record_chunking(started: float, count: int):
+    elapsed = time.perf_counter() - started
+    CHUNKS_PRODUCED.inc(count)
+    CHUNK_SECONDS.observe(elapsed)
+    if elapsed > 0:
+        CHUNK_THROUGHPUT.observe(count / elapsed)
 
 EXCLUDE_FILENAMES = {"package-lock.json", "yarn.lock", "pnpm-lock.yaml"}
 EXCLUDE_EXTENSIONS = {}
@@ -27,16 +58,27 @@ def _try_get_tiktoken():
     except Exception:
         return None
 
-_encoding = _try_get_tiktoken()
+_encoding = None
+_encoding_loaded = False
+
+def get_encoding():
+    # Loaded on first use: tiktoken import plus BPE ranks cost noticeable startup time.
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding = _try_get_tiktoken()
+        _encoding_loaded = True
+    return _encoding
 
 def _encode(text: str) -> List[int]:
-    if _encoding:
-        return _encoding.encode(text)
+    encoding = get_encoding()
+    if encoding:
+        return encoding.encode(text)
     return text.split()
 
 def _decode(tokens: List[int]) -> str:
-    if _encoding:
-        return _encoding.decode(tokens)
+    encoding = get_encoding()
+    if encoding:
+        return encoding.decode(tokens)
     return " ".join(tokens)
 
 def _stable_chunk_id(file_path: str, start_idx: int, chunk_text: str) -> str:
@@ -46,7 +88,17 @@ def _stable_chunk_id(file_path: str, start_idx: int, chunk_text: str) -> str:
     h.update(chunk_text.encode("utf-8"))
     return h.hexdigest()
 
-def _token_stream_chunks(text: str, target: int, overlap: int) -> Generator[str, None, None]:
+# Shape of what ingest writes to a namespace; IndexedRepo.index_version
+# records it per namespace. 1: ids are vector_id(file, chunk_index).
+# 2: every chunk also carries file_metadata (scope filters).
+INDEX_VERSION = 2
+
+def vector_id(file_path: str, chunk_index: int) -> str:
+    # Deterministic Pinecone ids: "<path hash>#<n>". Re-ingesting overwrites
+    # in place, and a file's chunks can be fetched or listed by prefix.
+    return f"{hashlib.sha1(file_path.encode('utf-8')).hexdigest()[:20]}#{chunk_index}"
+
+def _token_stream_chunks(text: str, target: int, overlap: int) -> Generator[Tuple[int, int, str], None, None]:
     ids = _encode(text)
     n = len(ids)
     if n == 0:
@@ -56,7 +108,7 @@ def _token_stream_chunks(text: str, target: int, overlap: int) -> Generator[str,
     while start < n:
         end = min(start + target, n)
         piece = ids[start:end]
-        yield _decode(piece)
+        yield start, end, _decode(piece)
         if end == n:
             break
         start += step
@@ -65,23 +117,25 @@ def chunk_text_to_chunks(file_path: str, text: str) -> Generator[Dict, None, Non
     if not text or not text.strip():
         return
     produced = 0
-    start_token_idx = 0
-    step = max(1, CHUNK_TOKENS - CHUNK_OVERLAP_TOKENS)
-    for piece in _token_stream_chunks(text, CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS):
+    scope = file_metadata(file_path)
+    for start, end, piece in _token_stream_chunks(text, CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS):
         if not piece.strip():
             continue
-        cid = _stable_chunk_id(file_path, start_token_idx, piece)
+        cid = _stable_chunk_id(file_path, start, piece)
         yield {
             "text": piece,
             "metadata": {
                 "file": file_path,
-                "chunk_id": cid
+                "chunk_id": cid,
+                "chunk_index": produced,
+                "start_token": start,
+                "end_token": end,
+                **scope,
             }
         }
         produced += 1
         if produced >= MAX_CHUNKS_PER_FILE:
             break
-        start_token_idx += step
 
 def _process_file_chunks(f: Dict) -> List[Dict]:
     file_chunks = []
@@ -94,32 +148,37 @@ def _process_file_chunks(f: Dict) -> List[Dict]:
         return file_chunks
 
     produced = 0
-    start_token_idx = 0
-    step = max(1, CHUNK_TOKENS - CHUNK_OVERLAP_TOKENS)
+    scope = file_metadata(fname)
 
-    for piece in _token_stream_chunks(content, CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS):
+    for start, end, piece in _token_stream_chunks(content, CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS):
         if not piece.strip():
             continue
-        cid = _stable_chunk_id(fname, start_token_idx, piece)
+        cid = _stable_chunk_id(fname, start, piece)
         file_chunks.append({
             "text": piece,
             "metadata": {
                 "file": fname,
-                "chunk_id": cid
+                "chunk_id": cid,
+                "chunk_index": produced,
+                "start_token": start,
+                "end_token": end,
+                **scope,
             }
         })
         produced += 1
         if produced >= MAX_CHUNKS_PER_FILE:
             break
-        start_token_idx += step
     
     return file_chunks
 
 def chunk_files_mem(files: Iterable[Dict]) -> List[Dict]:
+    started = time.perf_counter()
     chunks: List[Dict] = []
     total_chunks = 0
+    # Ordered imap: when the budget runs out, the files that made it in are
+    # the same on every ingest, not whichever workers finished first.
     with Pool() as pool:
-        for file_chunks in pool.imap_unordered(_process_file_chunks, files):
+        for file_chunks in pool.imap(_process_file_chunks, files):
             
             if not file_chunks:
                 continue
@@ -133,4 +192,41 @@ def chunk_files_mem(files: Iterable[Dict]) -> List[Dict]:
             if total_chunks >= REPO_WIDE_CHUNK_BUDGET:
                 break
 
-    return chunks
\ No newline at end of file
+    _record_chunking(started, len(chunks))
+    return chunks
+
+def _process_file(task):
+    f, extract = task
+    symbols = extract_symbols(f["filename"], f["content"]) if extract else None
+    return f["filename"], _process_file_chunks(f), symbols
+
+def chunk_files_with_symbols(files: List[Dict]):
+    # One pool pass for chunking and symbol/import extraction. Extraction is
+    # skipped for files whose content hash is already cached.
+    started = time.perf_counter()
+    symbols: Dict[str, tuple] = {}
+    keys: Dict[str, tuple] = {}
+    tasks = []
+    for f in files:
+        key = symbols_cache_key(f["filename"], f["content"])
+        cached = get_cached_symbols(key) if key else None
+        if cached is not None:
+            symbols[f["filename"]] = cached
+        elif key:
+            keys[f["filename"]] = key
+        tasks.append((f, key is not None and cached is None))
+
+    chunks: List[Dict] = []
+    with Pool() as pool:
+        # Ordered for the same reason as chunk_files_mem.
+        for fname, file_chunks, file_symbols in pool.imap(_process_file, tasks):
+            if file_symbols is not None:
+                symbols[fname] = file_symbols
+                put_cached_symbols(keys[fname], file_symbols)
+            # Keep draining after the chunk budget is hit so every file's
+            # imports still reach the dependency graph.
+            room = REPO_WIDE_CHUNK_BUDGET - len(chunks)
+            if room > 0:
+                chunks.extend(file_chunks[:room])
+    _record_chunking(started, len(chunks))
+    return chunks, symbols
@@ -0,0 +1,137 @@
+# app/services/context_service.py
+from typing import Dict, List, Tuple
+from app.core.config import (
+    LLM_MODEL,
+    GEMINI_LLM_MODEL,
+    CONTEXT_TOKEN_BUDGET,
+    DEFAULT_CONTEXT_TOKEN_BUDGET,
+    MODEL_CONTEXT_TOKEN_BUDGETS,
+    OLLAMA_NUM_CTX,
+)
+from app.services.chunking_service import _encode, _decode
+
+MIN_TRUNCATED_SPAN_TOKENS = 64
+_MIN_TEXT_OVERLAP_CHARS = 32
+
+def context_budget_for(provider: str) -> int:
+    if CONTEXT_TOKEN_BUDGET > 0:
+        return CONTEXT_TOKEN_BUDGET
+    if provider == "ollama":
+        # Local models run with a fixed num_ctx; leave room for the question and answer.
+        return max(1000, min(DEFAULT_CONTEXT_TOKEN_BUDGET * 4, OLLAMA_NUM_CTX - 2048))
+    model = GEMINI_LLM_MODEL if provider == "gemini" else LLM_MODEL
+    model = model.split("/")[-1]
+    return MODEL_CONTEXT_TOKEN_BUDGETS.get(model, DEFAULT_CONTEXT_TOKEN_BUDGET)
+
+def _position(metadata: Dict, key: str):
+    value = metadata.get(key)
+    return int(value) if value is not None else None
+
+def _overlap_start(left: str, right: str, min_chars: int = 1):
+    # Windows are decoded independently, so the shared overlap shows up as a
+    # suffix of `left` that is also a prefix of `right`.
+    anchor = right[:_MIN_TEXT_OVERLAP_CHARS]
+    if len(anchor) < min_chars:
+        return None
+    pos = left.rfind(anchor)
+    while pos != -1:
+        if right.startswith(left[pos:]):
+            return pos
+        pos = left.rfind(anchor, 0, pos)
+    return None
+
+def _join_overlapping(left: str, right: str) -> str:
+    pos = _overlap_start(left, right)
+    return left[:pos] + right if pos is not None else left + right
+
+def _has_text_overlap(left: str, right: str) -> bool:
+    return _overlap_start(left, right, _MIN_TEXT_OVERLAP_CHARS) is not None
+
+def _merge_positioned(spans: List[Dict]) -> List[Dict]:
+    spans.sort(key=lambda s: s["start"])
+    merged = [spans[0]]
+    for span in spans[1:]:
+        cur = merged[-1]
+        if span["start"] <= cur["end"]:
+            if span["end"] > cur["end"]:
+                cur["text"] = _join_overlapping(cur["text"], span["text"])
+                cur["end"] = span["end"]
+            cur["score"] = max(cur["score"], span["score"])
+        else:
+            merged.append(span)
+    return merged
+
+def _merge_by_text(spans: List[Dict]) -> List[Dict]:
+    # Chunks indexed before token positions were stored: fall back to
+    # detecting the shared overlap text directly.
+    merged: List[Dict] = []
+    for span in spans:
+        for cur in merged:
+            if span["text"] in cur["text"]:
+                cur["score"] = max(cur["score"], span["score"])
+                break
+            if _has_text_overlap(cur["text"], span["text"]):
+                cur["text"] = _join_overlapping(cur["text"], span["text"])
+                cur["score"] = max(cur["score"], span["score"])
+                break
+            if _has_text_overlap(span["text"], cur["text"]):
+                cur["text"] = _join_overlapping(span["text"], cur["text"])
+                cur["score"] = max(cur["score"], span["score"])
+                break
+        else:
+            merged.append(span)
+    return merged
+
+def merge_spans(docs) -> List[Dict]:
+    by_file: Dict[str, Tuple[List[Dict], List[Dict]]] = {}
+    for doc in docs:
+        meta = doc.metadata or {}
+        span = {
+            "file": meta.get("file", ""),
+            "start": _position(meta, "start_token"),
+            "end": _position(meta, "end_token"),
+            "text": doc.page_content,
+            "score": float(meta.get("score", 0.0)),
+        }
+        positioned, legacy = by_file.setdefault(span["file"], ([], []))
+        (positioned if span["start"] is not None and span["end"] is not None else legacy).append(span)
+
+    spans: List[Dict] = []
+    for positioned, legacy in by_file.values():
+        if positioned:
+            spans.extend(_merge_positioned(positioned))
+        if legacy:
+            spans.extend(_merge_by_text(legacy))
+    spans.sort(key=lambda s: s["score"], reverse=True)
+    return spans
+
+def _format_span(span: Dict) -> str:
+    if span["start"] is not None:
+        header = f"File: {span['file']} (tokens {span['start']}-{span['end']})"
+    else:
+        header = f"File: {span['file']}"
+    return f"{header}\n{span['text']}"
+
+def pack_context(docs, budget: int) -> Tuple[str, List[Dict]]:
+    packed: List[Dict] = []
+    remaining = budget
+    for span in merge_spans(docs):
+        ids = _encode(_format_span(span))
+        if len(ids) <= remaining:
+            packed.append(span)
+            remaining -= len(ids)
+            span["tokens"] = len(ids)
+            continue
+        if remaining >= MIN_TRUNCATED_SPAN_TOKENS:
+            span["text"] = _decode(ids[:remaining])
+            span["tokens"] = remaining
+            span["truncated"] = True
+            packed.append(span)
+            remaining = 0
+        break
+
+    context = "\n\n".join(
+        span["text"] if span.get("truncated") else _format_span(span)
+        for span in packed
+    )
+    return context, packed
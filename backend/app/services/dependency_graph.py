@@ -0,0 +1,151 @@
+# app/services/dependency_graph.py
+import posixpath
+import re
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional
+from app.services.repo_analysis import language_for_path
+
+_JS_EXTENSIONS = (".ts", ".tsx", ".js", ".jsx", ".mjs", ".cjs")
+_GO_MODULE_RE = re.compile(r"^\s*module\s+(\S+)", re.M)
+
+def _suffixes(path: str):
+    parts = path.split("/")
+    for i in range(len(parts)):
+        yield "/".join(parts[i:])
+
+def _closest(importer: str, candidates: List[str]) -> Optional[str]:
+    # Several files can share a suffix (app/utils.py vs tools/app/utils.py):
+    # prefer the one nearest to the importing file.
+    if not candidates:
+        return None
+    if len(candidates) == 1:
+        return candidates[0]
+    return max(sorted(candidates), key=lambda c: len(posixpath.commonprefix([importer, c])))
+
+class _Resolver:
+    def __init__(self, paths: Iterable[str], go_modules: Dict[str, str]):
+        self.paths = set(paths)
+        self.by_suffix: Dict[str, List[str]] = {}
+        self.dirs: Dict[str, List[str]] = {}
+        for path in self.paths:
+            if path.endswith((".py", ".java")):
+                for suffix in _suffixes(path):
+                    self.by_suffix.setdefault(suffix, []).append(path)
+            if path.endswith((".go", ".java")) and not path.endswith("_test.go"):
+                directory = posixpath.dirname(path)
+                for suffix in _suffixes(directory) if directory else [""]:
+                    self.dirs.setdefault(suffix, []).append(path)
+        self.go_modules = go_modules
+
+    def python(self, importer: str, module: str, names: List[str]) -> List[str]:
+        level = len(module) - len(module.lstrip("."))
+        rel = module[level:].replace(".", "/")
+        if level:
+            base = posixpath.dirname(importer)
+            for _ in range(level - 1):
+                base = posixpath.dirname(base)
+            rel = posixpath.join(base, rel) if rel else base
+            lookup = lambda p: p if p in self.paths else None
+        else:
+            lookup = lambda p: _closest(importer, self.by_suffix.get(p, []))
+
+        found = []
+        for name in names:
+            # `from pkg import mod` names a submodule as often as a symbol.
+            sub = posixpath.join(rel, name) if rel else name
+            hit = lookup(sub + ".py") or lookup(sub + "/__init__.py")
+            if hit:
+                found.append(hit)
+        if not found and rel:
+            hit = lookup(rel + ".py") or lookup(rel + "/__init__.py")
+            if hit:
+                found.append(hit)
+        return found
+
+    def javascript(self, importer: str, spec: str) -> List[str]:
+        # Bare specifiers are packages; only relative imports point into the repo.
+        if not spec.startswith("."):
+            return []
+        base = posixpath.normpath(posixpath.join(posixpath.dirname(importer), spec))
+        candidates = [base] + [base + ext for ext in _JS_EXTENSIONS] + [base + "/index" + ext for ext in _JS_EXTENSIONS]
+        for candidate in candidates:
+            if candidate in self.paths:
+                return [candidate]
+        return []
+
+    def go(self, importer: str, spec: str) -> List[str]:
+        for module, root in self.go_modules.items():
+            if spec == module or spec.startswith(module + "/"):
+                directory = posixpath.join(root, spec[len(module) + 1:]) if spec != module else root
+                return [p for p in self.dirs.get(directory, []) if p.endswith(".go") and posixpath.dirname(p) == directory]
+        # No go.mod: match the longest multi-segment suffix of the import path.
+        parts = spec.split("/")
+        for i in range(len(parts) - 1):
+            hits = [p for p in self.dirs.get("/".join(parts[i:]), []) if p.endswith(".go")]
+            if hits:
+                return hits
+        return []
+
+    def java(self, importer: str, spec: str) -> List[str]:
+        if spec.endswith(".*"):
+            directory = spec[:-2].replace(".", "/")
+            return [p for p in self.dirs.get(directory, []) if p.endswith(".java")]
+        parts = spec.split(".")
+        # Static imports name a member: drop trailing segments until a class matches.
+        while len(parts) > 1:
+            hit = _closest(importer, self.by_suffix.get("/".join(parts) + ".java", []))
+            if hit:
+                return [hit]
+            parts = parts[:-1]
+        return []
+
+def _go_modules(files: Iterable[Dict]) -> Dict[str, str]:
+    modules = {}
+    for f in files:
+        if posixpath.basename(f["filename"]) == "go.mod":
+            m = _GO_MODULE_RE.search(f["content"] or "")
+            if m:
+                modules[m.group(1)] = posixpath.dirname(f["filename"])
+    return modules
+
+def build_dependency_graph(files: List[Dict], symbols: Dict[str, tuple]) -> Dict:
+    # Compact adjacency: "files" lists every node once and "deps"[i] holds the
+    # indices of the repo files that files[i] imports directly.
+    resolver = _Resolver((f["filename"] for f in files), _go_modules(files))
+    edges: Dict[str, set] = {}
+    for path, (_, imports) in symbols.items():
+        language = language_for_path(path)
+        targets = set()
+        for module, names, _ in imports:
+            if language == "Python":
+                targets.update(resolver.python(path, module, names))
+            elif language in ("JavaScript", "TypeScript"):
+                targets.update(resolver.javascript(path, module))
+            elif language == "Go":
+                targets.update(resolver.go(path, module))
+            elif language == "Java":
+                targets.update(resolver.java(path, module))
+        targets.discard(path)
+        if targets:
+            edges[path] = targets
+
+    nodes = sorted(set(edges) | {t for targets in edges.values() for t in targets})
+    position = {path: i for i, path in enumerate(nodes)}
+    deps = [sorted(position[t] for t in edges.get(path, ())) for path in nodes]
+    return {"v": 1, "files": nodes, "deps": deps, "edges": sum(len(d) for d in deps)}
+
+def direct_dependencies(graph: Dict, paths: Iterable[str]) -> List[str]:
+    # Files imported by any of `paths`, most shared first. "files" is sorted,
+    # so nodes are found by bisection; the graph is shared through the cache
+    # and is never modified here.
+    files, deps = graph["files"], graph["deps"]
+    sources = set(paths)
+    counts: Dict[int, int] = {}
+    for path in sources:
+        i = bisect_left(files, path)
+        if i == len(files) or files[i] != path:
+            continue
+        for j in deps[i]:
+            counts[j] = counts.get(j, 0) + 1
+    ranked = sorted(counts, key=lambda j: (-counts[j], files[j]))
+    return [files[j] for j in ranked if files[j] not in sources]
@@ -3,13 +3,32 @@ import requests
 import time
 import io
 import tarfile
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
 from app.core.config import (
     GITHUB_DENY_DIRS,
     GITHUB_MAX_BYTES_PER_FILE,
     GITHUB_REPO_INGEST_BYTE_BUDGET,
     GITHUB_MAX_FILES_PER_REPO,
-    GITHUB_MAX_INGEST_SECONDS
+    GITHUB_MAX_INGEST_SECONDS,
+    GITHUB_API_URL,
+    WEBHOOK_FETCH_CONCURRENCY,
+)
+from app.utils.metrics import Counter, Histogram, STAGE_LATENCY_BUCKETS
+
+TAR_BYTES = Counter(
+    "gitrag_ingest_tar_bytes_total",
+    "Compressed tarball bytes read from GitHub.",
+)
+TAR_SECONDS = Histogram(
+    "gitrag_ingest_tar_seconds",
+    "Wall time spent streaming one repository tarball.",
+    buckets=STAGE_LATENCY_BUCKETS,
+)
+TAR_THROUGHPUT = Histogram(
+    "gitrag_ingest_tar_bytes_per_second",
+    "Tarball read throughput of one ingest.",
+    buckets=(1e5, 2.5e5, 5e5, 1e6, 2.5e6, 5e6, 1e7, 2.5e7, 5e7, 1e8),
 )
 
 _DENY_DIRS = tuple(d.strip().rstrip("/") for d in GITHUB_DENY_DIRS.split(",") if d.strip())
@@ -56,7 +75,7 @@ def _get_default_branch(session, owner, repo, github_token=None) -> str:
     headers = {'Accept': 'application/vnd.github.v3+json'}
     if github_token:
         headers['Authorization'] = f'token {github_token}'
-    repo_url = f"https://api.github.com/repos/{owner}/{repo}"
+    repo_url = f"{GITHUB_API_URL}/repos/{owner}/{repo}"
     r = _rate_limited_get(session, repo_url, headers=headers)
     r.raise_for_status()
     return r.json().get("default_branch", "main")
@@ -65,21 +84,31 @@ def iter_tar_entries(owner: str, repo: str, ref: str = "main", github_token: str
     headers = {'Accept': 'application/vnd.github.v3+json'}
     if github_token:
         headers['Authorization'] = f'token {github_token}'
-    url = f"https://api.github.com/repos/{owner}/{repo}/tarball/{ref}"
+    url = f"{GITHUB_API_URL}/repos/{owner}/{repo}/tarball/{ref}"
     with requests.Session() as s:
         with _rate_limited_get(s, url, headers=headers, stream=True) as r:
             r.raise_for_status()
-            bio = io.BufferedReader(r.raw)
-            with tarfile.open(fileobj=bio, mode="r|*") as tf:
-                for m in tf:
-                    if not m or not m.isfile():
-                        continue
-                    parts = m.name.split("/", 1)
-                    relpath = parts[1] if len(parts) > 1 else m.name
-                    fobj = tf.extractfile(m)
-                    if not fobj:
-                        continue
-                    yield relpath, fobj
+            started = time.perf_counter()
+            try:
+                bio = io.BufferedReader(r.raw)
+                with tarfile.open(fileobj=bio, mode="r|*") as tf:
+                    for m in tf:
+                        if not m or not m.isfile():
+                            continue
+                        parts = m.name.split("/", 1)
+                        relpath = parts[1] if len(parts) > 1 else m.name
+                        fobj = tf.extractfile(m)
+                        if not fobj:
+                            continue
+                        yield relpath, fobj
+            finally:
+                # Also runs when the caller stops early on an ingest budget.
+                elapsed = time.perf_counter() - started
+                read = r.raw.tell()
+                TAR_BYTES.inc(read)
+                TAR_SECONDS.observe(elapsed)
+                if elapsed > 0:
+                    TAR_THROUGHPUT.observe(read / elapsed)
 
 def stream_repo_texts(owner: str, repo: str, github_token: str | None, per_file_cap_bytes: int):
     with requests.Session() as session:
@@ -98,7 +127,8 @@ def stream_repo_texts(owner: str, repo: str, github_token: str | None, per_file_
         finally:
             fobj.close()
 
-def list_and_get_files(owner, repo, extensions=None, github_token=None):
+def list_and_get_files(owner, repo, extensions=None, github_token=None, analytics=None):
+    # `analytics` (a RepoAnalytics) is fed each kept file as it is read.
     session = requests.Session()
     start_ts = time.time()
     total_bytes = 0
@@ -124,14 +154,17 @@ def list_and_get_files(owner, repo, extensions=None, github_token=None):
                 continue
             content = data.decode("utf-8", errors="ignore")
             if content.strip():
-                b = len(content.encode("utf-8"))
+                encoded = content.encode("utf-8")
+                b = len(encoded)
                 remaining = max(0, GITHUB_REPO_INGEST_BYTE_BUDGET - total_bytes)
                 if b > remaining:
                     if remaining == 0:
                         break
-                    content = content.encode("utf-8")[:remaining].decode("utf-8", errors="ignore")
+                    content = encoded[:remaining].decode("utf-8", errors="ignore")
                     b = len(content.encode("utf-8"))
-                files_out.append({"filename": path, "content": content})
+                files_out.append({"filename": path, "content": content, "size": b})
+                if analytics is not None:
+                    analytics.add(path, b, content.count("\n") + 1)
                 total_bytes += b
                 files_count += 1
         finally:
@@ -149,7 +182,7 @@ def get_file_content_from_github(owner, repo, file_path, branch=None, github_tok
     session.headers.update(headers)
 
     if branch is None:
-        repo_url = f"https://api.github.com/repos/{owner}/{repo}"
+        repo_url = f"{GITHUB_API_URL}/repos/{owner}/{repo}"
         repo_resp = session.get(repo_url)
         repo_resp.raise_for_status()
         branch = repo_resp.json().get("default_branch", "main")
@@ -160,7 +193,7 @@ def get_file_content_from_github(owner, repo, file_path, branch=None, github_tok
     resp = session.get(raw_url)
     if not resp.ok and resp.status_code in (404, 400):
         try:
-            repo_url = f"https://api.github.com/repos/{owner}/{repo}"
+            repo_url = f"{GITHUB_API_URL}/repos/{owner}/{repo}"
             repo_resp = session.get(repo_url)
             repo_resp.raise_for_status()
             fallback_branch = repo_resp.json().get("default_branch", branch)
@@ -172,7 +205,7 @@ def get_file_content_from_github(owner, repo, file_path, branch=None, github_tok
 
     if not resp.ok:
         if resp.status_code == 403:
-            _ = session.get("https://api.github.com/rate_limit")
+            _ = session.get(f"{GITHUB_API_URL}/rate_limit")
         raise Exception(f"Failed to fetch file content for {file_path} (status {resp.status_code}, url {raw_url})")
 
     return resp.text
@@ -186,3 +219,72 @@ def list_repo_file_paths(owner: str, repo: str, github_token: str | None = None)
         paths.append(relpath)
         fobj.close()
     return paths
+
+def _get_file_at_ref(session, owner: str, repo: str, path: str, ref: str, headers) -> Optional[str]:
+    # None when the path doesn't exist (or isn't a file) at `ref`.
+    url = f"{GITHUB_API_URL}/repos/{owner}/{repo}/contents/{quote(path, safe='/')}?ref={quote(ref, safe='')}"
+    resp = _rate_limited_get(session, url, headers=headers, stream=True)
+    try:
+        if resp.status_code == 404:
+            return None
+        resp.raise_for_status()
+        # Same per-file cap as list_and_get_files, so chunks match a full ingest.
+        data = resp.raw.read(GITHUB_MAX_BYTES_PER_FILE, decode_content=True)
+    finally:
+        resp.close()
+    return data.decode("utf-8", errors="ignore")
+
+def get_files_at_ref(owner: str, repo: str, paths: List[str], ref: str, github_token: str | None = None) -> Dict[str, Optional[str]]:
+    # Contents of specific paths at a branch or commit through the contents
+    # API, in parallel. Paths that are missing, binary or in a denied directory
+    # map to None: they have nothing to index.
+    headers = {'Accept': 'application/vnd.github.v3.raw'}
+    if github_token:
+        headers['Authorization'] = f'token {github_token}'
+    out: Dict[str, Optional[str]] = {p: None for p in paths}
+    wanted = [p for p in paths if _should_fetch(p)]
+    with requests.Session() as session, ThreadPoolExecutor(max_workers=WEBHOOK_FETCH_CONCURRENCY) as pool:
+        contents = pool.map(lambda p: _get_file_at_ref(session, owner, repo, p, ref, headers), wanted)
+        for path, content in zip(wanted, contents):
+            out[path] = content if content and content.strip() else None
+    return out
+
+# The compare API lists at most this many files per comparison.
+_COMPARE_MAX_FILES = 300
+_NULL_SHA = "0" * 40
+
+def _compare_files(session, owner: str, repo: str, base: str, head: str, headers) -> Optional[List[str]]:
+    url = f"{GITHUB_API_URL}/repos/{owner}/{repo}/compare/{quote(base, safe='')}...{quote(head, safe='')}"
+    resp = _rate_limited_get(session, url, headers=headers)
+    if resp.status_code in (404, 422):
+        return None
+    resp.raise_for_status()
+    files = resp.json().get("files") or []
+    if len(files) >= _COMPARE_MAX_FILES:
+        return None
+    paths = []
+    for f in files:
+        paths.append(f["filename"])
+        if f.get("previous_filename"):
+            paths.append(f["previous_filename"])
+    return paths
+
+def get_changed_paths(owner: str, repo: str, base: str, head: str, github_token: str | None = None) -> Optional[List[str]]:
+    # Every path that differs between two commits, or None when GitHub can't
+    # list them: a new branch, a base that no longer exists, or more files
+    # than one comparison returns. base...head only covers head's side of the
+    # merge base, so after a force push head...base adds the files the
+    # discarded commits changed.
+    if not base or not head or base == _NULL_SHA:
+        return None
+    headers = {'Accept': 'application/vnd.github.v3+json'}
+    if github_token:
+        headers['Authorization'] = f'token {github_token}'
+    with requests.Session() as session:
+        forward = _compare_files(session, owner, repo, base, head, headers)
+        if forward is None:
+            return None
+        backward = _compare_files(session, owner, repo, head, base, headers)
+        if backward is None:
+            return None
+    return sorted(set(forward) | set(backward))
@@ -0,0 +1,130 @@
+# app/services/local_embeddings.py
+import hashlib
+import logging
+import math
+import re
+from collections import Counter
+from threading import Lock
+from typing import List
+from langchain_core.embeddings import Embeddings
+from app.core.config import LOCAL_EMBED_MODEL, LOCAL_EMBED_DIM, LOCAL_EMBED_BATCH_SIZE
+from app.utils.concurrency import run_blocking
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+_SUBWORD_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+_BUCKET_CACHE_SIZE = 200_000
+
+class HashingEmbeddings(Embeddings):
+    # Zero-dependency code embedder: identifiers, their camel/snake subwords and
+    # adjacent-identifier bigrams are hashed into `dim` signed buckets with
+    # sublinear term frequency, then L2-normalised. Stateless, so documents and
+    # queries embed the same way and any vector store can hold the vectors.
+
+    model_id = "hash"
+
+    def __init__(self, dim: int = LOCAL_EMBED_DIM):
+        self.dim = dim
+        self._buckets = {}
+        self._lock = Lock()
+
+    def _bucket(self, feature: str):
+        hit = self._buckets.get(feature)
+        if hit is not None:
+            return hit
+        h = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+        hit = (h % self.dim, 1.0 if h >> 63 else -1.0)
+        with self._lock:
+            if len(self._buckets) >= _BUCKET_CACHE_SIZE:
+                self._buckets.clear()
+            self._buckets[feature] = hit
+        return hit
+
+    def _features(self, text: str) -> Counter:
+        features = Counter()
+        previous = None
+        for token in _TOKEN_RE.findall(text):
+            word = token.lower()
+            features[word] += 1.0
+            parts = _SUBWORD_RE.findall(token)
+            if len(parts) > 1:
+                for part in parts:
+                    features[part.lower()] += 0.5
+            if previous is not None:
+                features[previous + " " + word] += 0.5
+            previous = word
+        return features
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.dim
+        for feature, weight in self._features(text).items():
+            index, sign = self._bucket(feature)
+            vector[index] += sign * (1.0 + math.log(weight)) if weight >= 1 else sign * weight
+        norm = math.sqrt(sum(v * v for v in vector))
+        if not norm:
+            # Vector stores reject all-zero vectors (e.g. a chunk of punctuation).
+            vector[0] = 1.0
+            return vector
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts: List[str], **kwargs) -> List[List[float]]:
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await run_blocking(self.embed_documents, texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+class SentenceTransformerEmbeddings(Embeddings):
+    # Small sentence-transformers (or ONNX-exported) model run in-process.
+    # encode() batches internally and releases the GIL inside torch/onnxruntime,
+    # so concurrent requests overlap on the run_blocking thread pool.
+
+    def __init__(self, model_name: str, batch_size: int = LOCAL_EMBED_BATCH_SIZE):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.batch_size = batch_size
+        self.dim = self.model.get_sentence_embedding_dimension()
+        # Short and Pinecone-safe (index names are limited to 45 characters).
+        self.model_id = "st" + hashlib.sha1(model_name.encode("utf-8")).hexdigest()[:8]
+
+    def embed_documents(self, texts: List[str], **kwargs) -> List[List[float]]:
+        vectors = self.model.encode(
+            texts, batch_size=self.batch_size, normalize_embeddings=True, show_progress_bar=False,
+        )
+        return vectors.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await run_blocking(self.embed_documents, texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await run_blocking(self.embed_query, text)
+
+_embedder = None
+_embedder_lock = Lock()
+
+def get_local_embedder():
+    # One shared instance per process: the model (or bucket cache) is the
+    # expensive part and both are safe to share across threads.
+    global _embedder
+    with _embedder_lock:
+        if _embedder is None:
+            if LOCAL_EMBED_MODEL:
+                # No fallback to hashing: a worker embedding with something
+                # else than the rest would query vectors it can't compare to.
+                try:
+                    _embedder = SentenceTransformerEmbeddings(LOCAL_EMBED_MODEL)
+                except Exception as e:
+                    raise RuntimeError(f"LOCAL_EMBED_MODEL {LOCAL_EMBED_MODEL!r} could not be loaded: {e}") from e
+                logger.info("local embeddings: %s (%s, dim %d)", LOCAL_EMBED_MODEL, _embedder.model_id, _embedder.dim)
+            else:
+                _embedder = HashingEmbeddings()
+        return _embedder
@@ -0,0 +1,216 @@
+# app/services/ollama_client.py
+import asyncio
+import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from threading import Condition, Lock
+from typing import List, NamedTuple
+import httpx
+from langchain_core.embeddings import Embeddings
+from app.core.config import (
+    OLLAMA_BASE_URL,
+    EMBED_MODEL,
+    OLLAMA_LLM_MODEL,
+    OLLAMA_EMBED_DIM,
+    OLLAMA_EMBED_BATCH_SIZE,
+    OLLAMA_EMBED_CONCURRENCY,
+    OLLAMA_GENERATE_CONCURRENCY,
+    OLLAMA_NUM_CTX,
+    OLLAMA_KEEP_ALIVE,
+    OLLAMA_TIMEOUT,
+)
+
+class OllamaError(RuntimeError):
+    pass
+
+class _Message(NamedTuple):
+    # Same .content shape as the LangChain chat messages rag_service reads.
+    content: str
+
+def _wake(fut):
+    if not fut.done():
+        fut.set_result(None)
+
+class _Slots:
+    # A semaphore shared by blocking callers (ingest threads) and async ones
+    # (chat), so OLLAMA_*_CONCURRENCY caps the whole process, not each side.
+    # A release hands the slot straight to a waiting coroutine if there is one.
+
+    def __init__(self, size: int):
+        self._free = size
+        self._cond = Condition()
+        self._waiters = deque()
+
+    def acquire(self):
+        with self._cond:
+            while self._free <= 0:
+                self._cond.wait()
+            self._free -= 1
+
+    async def aacquire(self):
+        loop = asyncio.get_running_loop()
+        with self._cond:
+            if self._free > 0:
+                self._free -= 1
+                return
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self._cond:
+                handed = waiter not in self._waiters
+                if not handed:
+                    self._waiters.remove(waiter)
+            if handed:
+                self.release()
+            raise
+
+    def release(self):
+        with self._cond:
+            while self._waiters:
+                loop, fut = self._waiters.popleft()
+                try:
+                    loop.call_soon_threadsafe(_wake, fut)
+                    return
+                except RuntimeError:
+                    # That loop is closed; try the next waiter.
+                    continue
+            self._free += 1
+            self._cond.notify()
+
+    def __enter__(self):
+        self.acquire()
+
+    def __exit__(self, *exc):
+        self.release()
+
+    async def __aenter__(self):
+        await self.aacquire()
+
+    async def __aexit__(self, *exc):
+        self.release()
+
+# One keep-alive client per process for blocking callers (ingest) and one per
+# event loop for async callers; both draw on the same slots per kind of work.
+_limits = httpx.Limits(
+    max_connections=OLLAMA_EMBED_CONCURRENCY + OLLAMA_GENERATE_CONCURRENCY,
+    max_keepalive_connections=OLLAMA_EMBED_CONCURRENCY + OLLAMA_GENERATE_CONCURRENCY,
+)
+_timeout = httpx.Timeout(OLLAMA_TIMEOUT, connect=10.0)
+_sync_client = None
+_sync_lock = Lock()
+_embed_slots = _Slots(OLLAMA_EMBED_CONCURRENCY)
+_generate_slots = _Slots(OLLAMA_GENERATE_CONCURRENCY)
+_embed_pool = ThreadPoolExecutor(max_workers=OLLAMA_EMBED_CONCURRENCY, thread_name_prefix="ollama-embed")
+_async_state = None
+
+def _client() -> httpx.Client:
+    global _sync_client
+    with _sync_lock:
+        if _sync_client is None:
+            _sync_client = httpx.Client(base_url=OLLAMA_BASE_URL, timeout=_timeout, limits=_limits)
+        return _sync_client
+
+def _aclient() -> httpx.AsyncClient:
+    # An AsyncClient belongs to the loop that first used it.
+    global _async_state
+    loop = asyncio.get_running_loop()
+    if _async_state is None or _async_state[0] is not loop:
+        _async_state = (loop, httpx.AsyncClient(base_url=OLLAMA_BASE_URL, timeout=_timeout, limits=_limits))
+    return _async_state[1]
+
+async def aclose():
+    global _sync_client, _async_state
+    if _async_state is not None:
+        await _async_state[1].aclose()
+        _async_state = None
+    with _sync_lock:
+        if _sync_client is not None:
+            _sync_client.close()
+            _sync_client = None
+
+def _check(resp: httpx.Response) -> dict:
+    if resp.status_code >= 400:
+        raise OllamaError(f"Ollama {resp.request.url.path} failed ({resp.status_code}): {resp.text[:300]}")
+    return resp.json()
+
+def _embed_payload(texts: List[str]) -> dict:
+    return {"model": EMBED_MODEL, "input": texts, "keep_alive": OLLAMA_KEEP_ALIVE}
+
+def _batches(texts: List[str]):
+    return [texts[i:i + OLLAMA_EMBED_BATCH_SIZE] for i in range(0, len(texts), OLLAMA_EMBED_BATCH_SIZE)]
+
+class OllamaEmbeddings(Embeddings):
+    # Uses the batch /api/embed endpoint; batches run in parallel up to
+    # OLLAMA_EMBED_CONCURRENCY.
+    dim = OLLAMA_EMBED_DIM
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        with _embed_slots:
+            return _check(_client().post("/api/embed", json=_embed_payload(texts)))["embeddings"]
+
+    def embed_documents(self, texts: List[str], **kwargs) -> List[List[float]]:
+        batches = _batches(texts)
+        if len(batches) == 1:
+            return self._embed_batch(batches[0])
+        return [v for vectors in _embed_pool.map(self._embed_batch, batches) for v in vectors]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def _aembed_batch(self, texts: List[str]) -> List[List[float]]:
+        async with _embed_slots:
+            return _check(await _aclient().post("/api/embed", json=_embed_payload(texts)))["embeddings"]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        results = await asyncio.gather(*(self._aembed_batch(b) for b in _batches(texts)))
+        return [v for vectors in results for v in vectors]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+class OllamaChat:
+    # The invoke / ainvoke / astream subset of a LangChain chat model.
+
+    def __init__(self, model: str = OLLAMA_LLM_MODEL, temperature: float = 0):
+        self.model = model
+        self.temperature = temperature
+
+    def _payload(self, prompt: str, stream: bool) -> dict:
+        return {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "stream": stream,
+            "keep_alive": OLLAMA_KEEP_ALIVE,
+            "options": {"temperature": self.temperature, "num_ctx": OLLAMA_NUM_CTX},
+        }
+
+    def invoke(self, prompt: str) -> _Message:
+        with _generate_slots:
+            data = _check(_client().post("/api/chat", json=self._payload(prompt, False)))
+        return _Message(data["message"]["content"])
+
+    async def ainvoke(self, prompt: str) -> _Message:
+        async with _generate_slots:
+            data = _check(await _aclient().post("/api/chat", json=self._payload(prompt, False)))
+        return _Message(data["message"]["content"])
+
+    async def astream(self, prompt: str):
+        # /api/chat streams one JSON object per line until "done": true.
+        async with _generate_slots:
+            async with _aclient().stream("POST", "/api/chat", json=self._payload(prompt, True)) as resp:
+                if resp.status_code >= 400:
+                    body = await resp.aread()
+                    raise OllamaError(f"Ollama /api/chat failed ({resp.status_code}): {body[:300]!r}")
+                async for line in resp.aiter_lines():
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    if data.get("error"):
+                        raise OllamaError(data["error"])
+                    content = data.get("message", {}).get("content", "")
+                    if content:
+                        yield _Message(content)
+                    if data.get("done"):
+                        break
@@ -0,0 +1,170 @@
+# app/services/query_scope.py
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from app.services.repo_analysis import LANGUAGE_BY_EXTENSION, file_metadata, parent_dirs
+
+# Namespaces fully ingested at this INDEX_VERSION or later have scope
+# metadata on every chunk; before that only files a push re-indexed do.
+SCOPE_INDEX_VERSION = 2
+
+class QueryScope(NamedTuple):
+    # Empty fields don't restrict; dirs match the directory and everything below it.
+    dirs: Tuple[str, ...] = ()
+    files: Tuple[str, ...] = ()
+    languages: Tuple[str, ...] = ()
+    tests: Optional[bool] = None
+    # Read from the message rather than given by the caller; such a scope may
+    # be wrong, so weak scoped results are topped up from the whole repo.
+    inferred: bool = False
+
+    def __bool__(self):
+        return bool(self.dirs or self.files or self.languages or self.tests is not None)
+
+    def as_dict(self) -> Dict:
+        return {"dirs": list(self.dirs), "files": list(self.files), "languages": list(self.languages), "tests": self.tests}
+
+_LANGUAGES = set(LANGUAGE_BY_EXTENSION.values()) | {"Dockerfile", "Makefile"}
+_LANGUAGE_ALIASES = {
+    "golang": "Go", "js": "JavaScript", "ts": "TypeScript", "py": "Python",
+    "c++": "C++", "cpp": "C++", "c#": "C#", "csharp": "C#", "shell": "Shell", "bash": "Shell",
+}
+_LANGUAGE_BY_NAME = {**{lang.lower(): lang for lang in _LANGUAGES}, **_LANGUAGE_ALIASES}
+_LANG_NAME = "|".join(re.escape(n) for n in sorted(_LANGUAGE_BY_NAME, key=len, reverse=True))
+# Only directives count: a language or "tests" merely mentioned in a
+# question ("stored in JSON", "is it only Python?", "test mode") doesn't.
+_RESTRICT = (
+    r"\b(?:(?:restrict|limit)(?:ed)?\s+(?:it\s+|this\s+|(?:the\s+)?(?:search|answer)\s+)?to"
+    r"|(?:search|look)\s+only\s+(?:at|in|through)|only\s+(?:search|look)\s+(?:at|in|through)|only\s+consider)"
+    r"\s+(?:the\s+)?"
+)
+# "X only" counts at the start of a sentence or clause, not mid-question.
+_CLAUSE_START = r"(?:^|[.?!,;:]\s+|\()"
+# "restrict to Python", "search only in the Go code", "TypeScript files only"
+_LANG_RES = (
+    re.compile(rf"{_RESTRICT}({_LANG_NAME})(?![\w+#])", re.I),
+    re.compile(rf"{_CLAUSE_START}({_LANG_NAME})(?:\s+(?:files|code|sources))?\s+only\b", re.I),
+)
+# A bare word only counts as a directory next to "folder"/"directory"/...;
+# otherwise the path must contain a slash or be in backticks.
+_PATH = r"[\w.@-]+(?:/[\w.@-]+)*/?"
+_DIR_RES = (
+    re.compile(rf"\b(?:in|under|inside|within|from)\s+(?:the\s+)?(`{_PATH}`|[\w.@-]+/{_PATH}|[\w.@-]+/)", re.I),
+    re.compile(rf"\b(?:in|under|inside|within|from)\s+(?:the\s+)?`?({_PATH})`?\s+(?:dir|directory|folder|package|module)\b", re.I),
+    re.compile(rf"\b(?:dir|directory|folder|package)\s+(`{_PATH}`|{_PATH})", re.I),
+    re.compile(r"`([\w.@-]+(?:/[\w.@-]+)+/?)`"),
+)
+_ONLY_TESTS_RE = re.compile(rf"{_RESTRICT}(?:unit\s+)?tests?\b|{_CLAUSE_START}(?:unit\s+)?test(?:s|\s+files)\s+only\b", re.I)
+_NO_TESTS_RE = re.compile(r"\b(?:excluding|exclude|ignore|ignoring|without|skip|skipping)\s+(?:the\s+)?tests?\b|\bnon-?test\b|\bsource\s+only\b", re.I)
+
+def normalize_language(name: str) -> Optional[str]:
+    # The name chunk metadata stores ("py" -> "Python"); None if unknown.
+    return _LANGUAGE_BY_NAME.get(name.strip().lower())
+
+def normalize_path(token: str) -> str:
+    return token.strip().removeprefix("./").strip("/")
+
+def _language(name: str) -> Optional[str]:
+    # "go" is an ordinary word; only the capitalized name counts.
+    if name == "go" or name == "GO":
+        return None
+    return normalize_language(name)
+
+def _repo_layout(files: Iterable[str]):
+    paths = set(files)
+    dirs = {d for p in paths for d in parent_dirs(p)}
+    languages = {file_metadata(p)["lang"] for p in paths}
+    return paths, dirs, languages
+
+def _resolve_path(token: str, paths, dirs) -> Tuple[List[str], List[str]]:
+    # Exact directory or file first, else every directory or file whose
+    # trailing segments match ("services" -> "backend/app/services").
+    token = normalize_path(token)
+    if token in dirs:
+        return [token], []
+    if token in paths:
+        return [], [token]
+    suffix = "/" + token
+    return sorted(d for d in dirs if d.endswith(suffix)), sorted(p for p in paths if p.endswith(suffix))
+
+def infer_scope(message: str, repo_files: Optional[Iterable[str]] = None) -> QueryScope:
+    # Scope phrases in a chat message. With the repo's file list (the symbol
+    # index has one) paths and languages are checked against what exists, so
+    # a phrase like "in general" never filters; without it only explicit
+    # multi-segment paths are taken.
+    paths, dirs, present = _repo_layout(repo_files) if repo_files is not None else (None, None, None)
+    scope_dirs, scope_files, languages = [], [], []
+
+    for regex in _DIR_RES:
+        for token in regex.findall(message):
+            token = token.strip("`").rstrip(".,;:!?")
+            if not token or _language(token):
+                continue
+            if paths is None:
+                token = token.strip("/")
+                if "/" in token:
+                    (scope_files if "." in token.rpartition("/")[2] else scope_dirs).append(token)
+                continue
+            found_dirs, found_files = _resolve_path(token, paths, dirs)
+            scope_dirs += found_dirs
+            scope_files += found_files
+
+    for regex in _LANG_RES:
+        for name in regex.findall(message):
+            lang = _language(name)
+            if lang and (present is None or lang in present):
+                languages.append(lang)
+
+    tests = None
+    if _NO_TESTS_RE.search(message):
+        tests = False
+    elif _ONLY_TESTS_RE.search(message):
+        tests = True
+    return QueryScope(
+        tuple(dict.fromkeys(scope_dirs)), tuple(dict.fromkeys(scope_files)), tuple(dict.fromkeys(languages)), tests,
+        inferred=True,
+    )
+
+def merge_scopes(explicit: Optional[QueryScope], inferred: QueryScope) -> QueryScope:
+    # Fields the caller set win over inferred ones; the result counts as
+    # caller-given, so retrieval never widens it.
+    if not explicit:
+        return inferred
+    return QueryScope(
+        explicit.dirs or inferred.dirs,
+        explicit.files or inferred.files,
+        explicit.languages or inferred.languages,
+        explicit.tests if explicit.tests is not None else inferred.tests,
+    )
+
+def scope_filter(scope: Optional[QueryScope]) -> Optional[Dict]:
+    # Pinecone metadata filter over the fields chunking stores (file_metadata).
+    if not scope:
+        return None
+    clauses = []
+    where = []
+    if scope.dirs:
+        where.append({"dirs": {"$in": list(scope.dirs)}})
+    if scope.files:
+        where.append({"file": {"$in": list(scope.files)}})
+    if where:
+        clauses.append(where[0] if len(where) == 1 else {"$or": where})
+    if scope.languages:
+        clauses.append({"lang": {"$in": list(scope.languages)}})
+    if scope.tests is not None:
+        clauses.append({"is_test": {"$eq": scope.tests}})
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+def in_scope(scope: Optional[QueryScope], path: str) -> bool:
+    # scope_filter evaluated on a path, for vectors ingested before the scope
+    # metadata existed and for fetched dependency chunks.
+    if not scope:
+        return True
+    meta = file_metadata(path)
+    if scope.dirs or scope.files:
+        in_dir = any(d in scope.dirs for d in meta.get("dirs", ()))
+        if not (in_dir or path in scope.files):
+            return False
+    if scope.languages and meta["lang"] not in scope.languages:
+        return False
+    return scope.tests is None or meta["is_test"] == scope.tests
@@ -1,13 +1,30 @@
 # app/services/rag_service.py
 
 import os
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain_google_genai import GoogleGenerativeAIEmbeddings, ChatGoogleGenerativeAI
+import time
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
 from app.utils.pinecone_client import get_pinecone_index
-from app.core.config import EMBED_MODEL, LLM_MODEL, GEMINI_LLM_MODEL, GEMINI_EMBED_MODEL
-from langchain_pinecone import PineconeVectorStore
-from langchain.chains import RetrievalQA
-import openai   
+from app.core.config import (
+    EMBED_MODEL,
+    LLM_MODEL,
+    GEMINI_LLM_MODEL,
+    GEMINI_EMBED_MODEL,
+    EMBED_BATCH_MAX_WAIT_MS,
+    EMBED_BATCH_MAX_SIZE,
+    LOCAL_LLM_PROVIDER,
+    OLLAMA_EMBED_DIM,
+)
+from langchain_core.embeddings import Embeddings
+from app.services.retrieval_service import RerankingRetriever
+from app.services.chunking_service import vector_id
+from app.services.context_service import pack_context, context_budget_for
+from app.utils.concurrency import run_blocking
+from app.utils.metrics import Counter, Histogram, timed
+
+logger = logging.getLogger(__name__)
 
 def batch_chunks(chunks, max_batch_bytes=2*1024*1024):  
     batch = []
@@ -33,53 +50,14 @@ def batch_chunks(chunks, max_batch_bytes=2*1024*1024):
     if batch:
         yield batch
 
-def upsert_chunks_to_pinecone(chunks, namespace, openai_api_key):
-    embedder = OpenAIEmbeddings(openai_api_key=openai_api_key, model=EMBED_MODEL)
-    pinecone_index = get_pinecone_index()
-    
-    vectorstore = PineconeVectorStore(
-        index=pinecone_index,
-        embedding=embedder,
-        namespace=namespace
-    )
-    
-    total_added = 0
-    batch_num = 0
-    total_batches = list(batch_chunks(chunks))
-    
-    for batch in total_batches:
-        batch_num += 1
-        texts = [c['text'] for c in batch]
-        metadatas = [c['metadata'] for c in batch]
-        batch_bytes = sum(len(t.encode('utf-8')) + len(str(m).encode('utf-8')) + 500 for t, m in zip(texts, metadatas))
-        
-        try:
-            vectorstore.add_texts(texts, metadatas=metadatas)
-            total_added += len(texts)
-        except Exception as e:
-            continue
+# Providers that run in-process or on-prem, without a per-user API key.
+KEYLESS_PROVIDERS = {"local", "ollama"}
 
-def get_retriever(namespace, openai_api_key):
-    embedder = OpenAIEmbeddings(openai_api_key=openai_api_key, model=EMBED_MODEL)
-    pinecone_index = get_pinecone_index()
-    vectorstore = PineconeVectorStore(
-        index=pinecone_index,
-        embedding=embedder,
-        namespace=namespace,
-    )
-    return vectorstore.as_retriever()
-
-def chat_with_rag(query, namespace, openai_api_key):
-    retriever = get_retriever(namespace, openai_api_key)
-    llm = ChatOpenAI(openai_api_key=openai_api_key, model=LLM_MODEL, temperature=0)
-    qa_chain = RetrievalQA.from_chain_type(
-        llm=llm,
-        retriever=retriever,
-        return_source_documents=True,
-        chain_type="stuff"
-    )
-    result = qa_chain(query)
-    return result['result']
+def llm_provider_for(provider: str) -> str:
+    return LOCAL_LLM_PROVIDER if provider == "local" else provider
+
+def requires_api_key(provider: str) -> bool:
+    return provider not in KEYLESS_PROVIDERS
 
 def validate_key(provider: str, api_key: str) -> bool:
     try:
@@ -101,6 +79,7 @@ def validate_key(provider: str, api_key: str) -> bool:
 
 def validate_openai_key(openai_api_key):
     try:
+        import openai
         client = openai.OpenAI(api_key=openai_api_key)
         models = client.models.list()
         return True
@@ -108,58 +87,356 @@ def validate_openai_key(openai_api_key):
         return False
     
 
-def delete_pinecone_namespace(namespace):
-    try:
-        index = get_pinecone_index()
-        index.delete(delete_all=True, namespace=namespace)
-    except Exception as e:
-        print(f"Error deleting namespace {namespace} from Pinecone: {e}")
-
+# Provider SDKs are imported on first use so importing the app stays cheap.
 def get_embedder(provider: str, api_key: str):
     if provider == "openai":
+        from langchain_openai import OpenAIEmbeddings
         return OpenAIEmbeddings(openai_api_key=api_key, model=EMBED_MODEL)   
     elif provider == "gemini":
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
         return GoogleGenerativeAIEmbeddings(google_api_key=api_key, model=GEMINI_EMBED_MODEL)
+    elif provider == "local":
+        from app.services.local_embeddings import get_local_embedder
+        return get_local_embedder()
+    elif provider == "ollama":
+        from app.services.ollama_client import OllamaEmbeddings
+        return OllamaEmbeddings()
     else:
         raise ValueError("Unknown provider")
 
 def get_llm(provider: str, api_key: str):
+    provider = llm_provider_for(provider)
     if provider == "openai":
+        from langchain_openai import ChatOpenAI
         return ChatOpenAI(openai_api_key=api_key, model=LLM_MODEL, temperature=0)
     elif provider == "gemini":
+        from langchain_google_genai import ChatGoogleGenerativeAI
         return ChatGoogleGenerativeAI(api_key=api_key, model=GEMINI_LLM_MODEL, temperature=0)
+    elif provider == "ollama":
+        from app.services.ollama_client import OllamaChat
+        return OllamaChat(temperature=0)
     else:
         raise ValueError("Unknown provider")
     
 
 def embed_dim_for_provider(provider: str) -> int:
+    if provider == "local":
+        from app.services.local_embeddings import get_local_embedder
+        return get_local_embedder().dim
+    if provider == "ollama":
+        return OLLAMA_EMBED_DIM
     return 1536 if provider=="openai" else 768  
 
+def pinecone_index_for(provider: str):
+    if provider == "local":
+        # Same dim doesn't mean same vector space: the index is named after
+        # the embedder too, so hashing and model vectors never share one.
+        from app.services.local_embeddings import get_local_embedder
+        embedder = get_local_embedder()
+        return get_pinecone_index(f"local-{embedder.model_id}", embedder.dim)
+    return get_pinecone_index(provider, embed_dim_for_provider(provider))
+
+EMBED_DOCUMENT_BATCH_LATENCY = Histogram(
+    "gitrag_embed_document_batch_seconds",
+    "Latency of one ingest embed_documents call.",
+    ("provider",),
+)
+EMBED_TOKENS = Counter(
+    "gitrag_embed_tokens_total",
+    "Tokens sent for embedding, by provider and kind (document: cl100k count, query: ~4 chars/token estimate).",
+    ("provider", "kind"),
+)
+UPSERT_BATCH_LATENCY = Histogram(
+    "gitrag_pinecone_upsert_batch_seconds",
+    "Latency of upserting one embedded batch into Pinecone.",
+    ("provider",),
+)
+UPSERT_VECTORS = Counter(
+    "gitrag_pinecone_upserted_vectors_total",
+    "Vectors upserted into Pinecone.",
+    ("provider",),
+)
+LLM_LATENCY = Histogram(
+    "gitrag_llm_seconds",
+    "LLM call latency, to the last token for streamed answers.",
+    ("provider", "route"),
+    buckets=(0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0),
+)
+LLM_FIRST_TOKEN = Histogram(
+    "gitrag_llm_first_token_seconds",
+    "Time from request start to the first streamed answer token.",
+    ("provider",),
+    buckets=(0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0),
+)
+
 def upsert_chunks_to_pinecone(chunks, namespace, provider, api_key):
+    # Embed and upsert as separate calls (what PineconeVectorStore.add_texts
+    # does internally) so each stage gets its own latency histogram.
     embedder = get_embedder(provider, api_key)
-    index = get_pinecone_index(provider, embed_dim_for_provider(provider))
-    vectorstore = PineconeVectorStore(index=index, embedding=embedder, namespace=namespace)
+    index = pinecone_index_for(provider)
     for batch in batch_chunks(chunks):
         texts = [c['text'] for c in batch]
         metadatas = [c['metadata'] for c in batch]
-        vectorstore.add_texts(texts, metadatas=metadatas)
+        with timed(EMBED_DOCUMENT_BATCH_LATENCY, provider=provider):
+            vectors = embedder.embed_documents(texts)
+        EMBED_TOKENS.inc(sum(m['end_token'] - m['start_token'] for m in metadatas), provider=provider, kind="document")
+        records = [
+            {"id": vector_id(m['file'], m['chunk_index']), "values": v, "metadata": {**m, "text": t}}
+            for t, m, v in zip(texts, metadatas, vectors)
+        ]
+        with timed(UPSERT_BATCH_LATENCY, provider=provider):
+            index.upsert(vectors=records, namespace=namespace, batch_size=64, show_progress=False)
+        UPSERT_VECTORS.inc(len(records), provider=provider)
 
-def get_retriever(namespace, provider, api_key):
-    embedder = get_embedder(provider, api_key)
-    index = get_pinecone_index(provider, embed_dim_for_provider(provider))
-    vs = PineconeVectorStore(index=index, embedding=embedder, namespace=namespace)
-    return vs.as_retriever()
+def _file_vector_ids(index, namespace, path):
+    # Ids of a file's chunks currently in the namespace (see vector_id).
+    try:
+        return [i for page in index.list(prefix=vector_id(path, 0)[:-1], namespace=namespace) for i in page]
+    except Exception:
+        # Pod-based indexes have no list(). Chunk indices are contiguous from
+        # 0, so fetch pages of candidate ids until one comes back short.
+        ids, start, page = [], 0, 100
+        while True:
+            candidates = [vector_id(path, i) for i in range(start, start + page)]
+            found = index.fetch(ids=candidates, namespace=namespace).vectors
+            ids.extend(i for i in candidates if i in found)
+            if len(found) < page:
+                return ids
+            start += page
+
+def replace_file_vectors(paths, chunks, namespace, provider, api_key):
+    # Re-indexes whole files in place: `chunks` (all chunks of `paths`, none
+    # for a deleted file) overwrite the files' ids, then ids past each file's
+    # new chunk count are deleted. Returns the change in vector count.
+    index = pinecone_index_for(provider)
+    old = {i for p in paths for i in _file_vector_ids(index, namespace, p)}
+    if chunks:
+        upsert_chunks_to_pinecone(chunks, namespace, provider, api_key)
+    new = {vector_id(c['metadata']['file'], c['metadata']['chunk_index']) for c in chunks}
+    stale = sorted(old - new)
+    for i in range(0, len(stale), 1000):
+        index.delete(ids=stale[i:i + 1000], namespace=namespace)
+    return len(new) - len(old)
+
+EMBED_BATCH_SIZE = Histogram(
+    "gitrag_embed_query_batch_size",
+    "Queries per batched query-embedding call.",
+    ("provider",),
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+)
+EMBED_BATCH_LATENCY = Histogram(
+    "gitrag_embed_query_batch_seconds",
+    "Latency of one batched query-embedding call.",
+    ("provider",),
+)
+EMBED_QUERY_WAIT = Histogram(
+    "gitrag_embed_query_wait_seconds",
+    "Time a query waited for its batched embedding, including queueing.",
+    ("provider",),
+)
+
+class _QueryEmbeddingBatcher:
+    # Collects concurrent query texts for one (provider, API key) and embeds
+    # them with a single embed_documents call, fanning vectors back out.
+
+    def __init__(self, provider, embedder, max_wait_ms=EMBED_BATCH_MAX_WAIT_MS, max_size=EMBED_BATCH_MAX_SIZE):
+        self.provider = provider
+        self.embedder = embedder
+        self.max_wait = max_wait_ms / 1000
+        self.max_size = max_size
+        self._pending = []
+        self._timer = None
+        # Strong references to in-flight batches; the loop only keeps weak ones.
+        self._tasks = set()
+
+    async def embed(self, text):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= self.max_size:
+            self._dispatch()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._dispatch)
+        started = time.perf_counter()
+        try:
+            return await future
+        finally:
+            EMBED_QUERY_WAIT.observe(time.perf_counter() - started, provider=self.provider)
+
+    def _dispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._task_done)
+
+    def _task_done(self, task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("query embedding batch failed", exc_info=task.exception())
+
+    async def _run(self, batch):
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        started = time.perf_counter()
+        try:
+            if self.provider == "gemini":
+                # Gemini embeds queries and documents with different task types.
+                vectors = await run_blocking(self.embedder.embed_documents, texts, task_type="retrieval_query")
+            else:
+                vectors = await self.embedder.aembed_documents(texts)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            EMBED_BATCH_LATENCY.observe(time.perf_counter() - started, provider=self.provider)
+            EMBED_BATCH_SIZE.observe(len(texts), provider=self.provider)
+            # Estimated (~4 characters per token): tokenizing here would put
+            # tiktoken on the event loop for every query.
+            EMBED_TOKENS.inc(sum(len(t) for t in texts) // 4, provider=self.provider, kind="query")
+        by_text = dict(zip(texts, vectors))
+        for text, future in batch:
+            if not future.done():
+                future.set_result(by_text[text])
+
+class BatchedQueryEmbeddings(Embeddings):
+    # Drop-in embedder whose async query path goes through the batcher.
+
+    def __init__(self, embedder, batcher):
+        self.embedder = embedder
+        self.batcher = batcher
+
+    def embed_documents(self, texts):
+        return self.embedder.embed_documents(texts)
+
+    def embed_query(self, text):
+        return self.embedder.embed_query(text)
+
+    async def aembed_documents(self, texts):
+        return await self.embedder.aembed_documents(texts)
+
+    async def aembed_query(self, text):
+        return await self.batcher.embed(text)
+
+_MAX_BATCHERS = 256
+_batchers = OrderedDict()
+
+def get_query_embedder(provider: str, api_key: str):
+    key = (provider, hashlib.sha256(api_key.encode("utf-8")).hexdigest())
+    batcher = _batchers.get(key)
+    if batcher is None:
+        batcher = _batchers[key] = _QueryEmbeddingBatcher(provider, get_embedder(provider, api_key))
+        while len(_batchers) > _MAX_BATCHERS:
+            _batchers.popitem(last=False)
+    else:
+        _batchers.move_to_end(key)
+    return BatchedQueryEmbeddings(batcher.embedder, batcher)
+
+def get_retriever(namespace, provider, api_key, dependency_graph=None, scope=None, scope_prefilter=True):
+    embedder = get_query_embedder(provider, api_key)
+    index = pinecone_index_for(provider)
+    return RerankingRetriever(
+        index=index, embedder=embedder, namespace=namespace, dependency_graph=dependency_graph,
+        scope=scope, scope_prefilter=scope_prefilter,
+    )
+
+_QA_PROMPT = """Use the following pieces of context from the repository to answer the question at the end. If you don't know the answer, just say that you don't know, don't try to make up an answer.
+
+{context}
+
+Question: {question}
+Helpful Answer:"""
 
-def chat_with_rag(query, namespace, provider, api_key):
-    retriever = get_retriever(namespace, provider, api_key)
+def build_prompt(query, docs, provider):
+    context, spans = pack_context(docs, context_budget_for(llm_provider_for(provider)))
+    return _QA_PROMPT.format(context=context, question=query), spans
+
+def retrieve_prompt(query, namespace, provider, api_key, dependency_graph=None, scope=None, scope_prefilter=True):
+    retriever = get_retriever(namespace, provider, api_key, dependency_graph, scope, scope_prefilter)
+    docs = retriever.invoke(query)
+    prompt, spans = build_prompt(query, docs, provider)
+    return prompt, docs, spans
+
+def chat_with_rag(query, namespace, provider, api_key, dependency_graph=None, scope=None, scope_prefilter=True):
+    started = time.perf_counter()
     llm = get_llm(provider, api_key)
-    
-    qa = RetrievalQA.from_chain_type(llm=llm, retriever=retriever, return_source_documents=True, chain_type="stuff")
-    return qa(query)['result']
+    prompt, docs, spans = retrieve_prompt(query, namespace, provider, api_key, dependency_graph, scope, scope_prefilter)
+    retrieved = time.perf_counter()
+    with timed(LLM_LATENCY, provider=llm_provider_for(provider), route="chat"):
+        answer = llm.invoke(prompt)
+    logger.info(
+        "chat ns=%s provider=%s chunks=%d spans=%d context_tokens=%d retrieval_ms=%.1f llm_ms=%.1f",
+        namespace, provider, len(docs), len(spans), sum(s["tokens"] for s in spans),
+        (retrieved - started) * 1000, (time.perf_counter() - retrieved) * 1000,
+    )
+    return answer.content
+
+async def aretrieve_prompt(query, namespace, provider, api_key, dependency_graph=None, scope=None, scope_prefilter=True):
+    # First use of a provider resolves its Pinecone index over the network.
+    retriever = await run_blocking(get_retriever, namespace, provider, api_key, dependency_graph, scope, scope_prefilter)
+    docs = await retriever.ainvoke(query)
+    prompt, spans = build_prompt(query, docs, provider)
+    return prompt, docs, spans
+
+async def achat_with_rag(query, namespace, provider, api_key, dependency_graph=None, scope=None, scope_prefilter=True):
+    started = time.perf_counter()
+    llm = get_llm(provider, api_key)
+    prompt, docs, spans = await aretrieve_prompt(query, namespace, provider, api_key, dependency_graph, scope, scope_prefilter)
+    retrieved = time.perf_counter()
+    with timed(LLM_LATENCY, provider=llm_provider_for(provider), route="chat"):
+        answer = await llm.ainvoke(prompt)
+    logger.info(
+        "chat ns=%s provider=%s chunks=%d spans=%d context_tokens=%d retrieval_ms=%.1f llm_ms=%.1f",
+        namespace, provider, len(docs), len(spans), sum(s["tokens"] for s in spans),
+        (retrieved - started) * 1000, (time.perf_counter() - retrieved) * 1000,
+    )
+    return answer.content
+
+def _source_summary(spans):
+    return [
+        {"file": s["file"], "start_token": s["start"], "end_token": s["end"], "score": round(s["score"], 4)}
+        for s in spans
+    ]
+
+async def stream_chat_with_rag(query, namespace, provider, api_key, dependency_graph=None, scope=None, scope_prefilter=True):
+    started = time.perf_counter()
+    llm = get_llm(provider, api_key)
+    prompt, docs, spans = await aretrieve_prompt(query, namespace, provider, api_key, dependency_graph, scope, scope_prefilter)
+    if scope:
+        yield "scope", scope.as_dict()
+    yield "sources", _source_summary(spans)
+
+    first_token_at = None
+    # Closed explicitly: when the client goes away this generator is closed at
+    # a yield, and `async for` alone would leave the provider stream (and an
+    # Ollama generate slot) open until garbage collection.
+    stream = llm.astream(prompt)
+    try:
+        with timed(LLM_LATENCY, provider=llm_provider_for(provider), route="chat_stream"):
+            async for chunk in stream:
+                if not chunk.content:
+                    continue
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                    LLM_FIRST_TOKEN.observe(first_token_at - started, provider=llm_provider_for(provider))
+                yield "token", chunk.content
+    finally:
+        await stream.aclose()
+    logger.info(
+        "chat_stream ns=%s provider=%s spans=%d ttft_ms=%.1f total_ms=%.1f",
+        namespace, provider, len(spans),
+        ((first_token_at or time.perf_counter()) - started) * 1000, (time.perf_counter() - started) * 1000,
+    )
 
 def delete_pinecone_namespace(namespace, provider):
     try:
-        index = get_pinecone_index(provider, embed_dim_for_provider(provider))
+        index = pinecone_index_for(provider)
         index.delete(delete_all=True, namespace=namespace)
+        return True
     except Exception as e:
         print(f"Error deleting namespace {namespace} ({provider}): {e}")
+        return False
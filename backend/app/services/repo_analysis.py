@@ -1,4 +1,59 @@
 # app/services/repo_analysis.py
+import heapq
+import math
+import os
+
+LANGUAGE_BY_EXTENSION = {
+    ".py": "Python", ".pyi": "Python", ".ipynb": "Jupyter Notebook",
+    ".js": "JavaScript", ".jsx": "JavaScript", ".mjs": "JavaScript", ".cjs": "JavaScript",
+    ".ts": "TypeScript", ".tsx": "TypeScript",
+    ".go": "Go", ".java": "Java", ".kt": "Kotlin", ".scala": "Scala",
+    ".rb": "Ruby", ".php": "PHP", ".rs": "Rust", ".swift": "Swift",
+    ".c": "C", ".h": "C", ".cc": "C++", ".cpp": "C++", ".hpp": "C++", ".cs": "C#",
+    ".sh": "Shell", ".bash": "Shell", ".sql": "SQL",
+    ".html": "HTML", ".css": "CSS", ".scss": "SCSS", ".vue": "Vue", ".svelte": "Svelte",
+    ".md": "Markdown", ".rst": "reStructuredText", ".json": "JSON", ".yml": "YAML", ".yaml": "YAML",
+    ".toml": "TOML", ".xml": "XML",
+}
+
+def language_for_path(path: str) -> str:
+    base = os.path.basename(path)
+    if base == "Dockerfile":
+        return "Dockerfile"
+    if base == "Makefile":
+        return "Makefile"
+    return LANGUAGE_BY_EXTENSION.get(os.path.splitext(base)[1].lower(), "Other")
+
+_TEST_DIRS = {"test", "tests", "__tests__", "spec", "specs", "testing", "testdata", "e2e"}
+_TEST_SUFFIXES = (
+    "_test.py", "_test.go", "_spec.rb", "_test.rb", "Test.java", "Tests.java", "Test.kt", "Tests.cs",
+    ".test.js", ".test.jsx", ".test.ts", ".test.tsx", ".spec.js", ".spec.jsx", ".spec.ts", ".spec.tsx",
+)
+
+def is_test_path(path: str) -> bool:
+    parts = path.split("/")
+    base = parts[-1]
+    if any(p.lower() in _TEST_DIRS for p in parts[:-1]):
+        return True
+    return base.startswith("test_") or base == "conftest.py" or base.endswith(_TEST_SUFFIXES)
+
+def parent_dirs(path: str) -> list[str]:
+    # "a/b/c.py" -> ["a", "a/b"]: every directory a path-scoped query can name.
+    parts = path.split("/")[:-1]
+    return ["/".join(parts[:i]) for i in range(1, len(parts) + 1)]
+
+def file_metadata(path: str) -> dict:
+    # Per-file vector metadata used as retrieval filters (see query_scope).
+    metadata = {
+        "dir": path.rpartition("/")[0],
+        "ext": os.path.splitext(path)[1].lower(),
+        "lang": language_for_path(path),
+        "is_test": is_test_path(path),
+    }
+    dirs = parent_dirs(path)
+    if dirs:
+        metadata["dirs"] = dirs
+    return metadata
 
 def build_file_tree(files):
     tree = {}
@@ -15,37 +70,108 @@ def build_file_tree(files):
                 current = current[part]
     return tree
 
-def analyze_repo(files):
-    analytics = {
-        "num_files": len(files),
-        "file_extensions": {},
-        "total_lines": 0,
-        "total_bytes": 0,
-        "largest_file": "",
-        "largest_file_size": 0,
-    }
+class _LogHistogram:
+    # Log-spaced counts (8 buckets per doubling, ~9% error): memory grows with
+    # log(max value), not with the number of files.
+    def __init__(self, per_doubling: int = 8):
+        self.per_doubling = per_doubling
+        self.counts = {}
+        self.zeros = 0
+        self.n = 0
+        self.max = 0
+
+    def add(self, value: int):
+        self.n += 1
+        self.max = max(self.max, value)
+        if value <= 0:
+            self.zeros += 1
+            return
+        bucket = int(math.log2(value) * self.per_doubling)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+
+    def percentile(self, q: float) -> int:
+        if not self.n:
+            return 0
+        target = max(1, math.ceil(q * self.n))
+        seen = self.zeros
+        if seen >= target:
+            return 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= target:
+                return min(self.max, round(2 ** ((bucket + 0.5) / self.per_doubling)))
+        return self.max
+
+    def summary(self):
+        return {
+            "p50": self.percentile(0.5),
+            "p90": self.percentile(0.9),
+            "p99": self.percentile(0.99),
+            "max": self.max,
+        }
+
+class RepoAnalytics:
+    # Online accumulator fed one file at a time (e.g. straight from the tar
+    # stream): only counters, log histograms and a top-N heap are kept.
+    def __init__(self, top_n: int = 10):
+        self.top_n = top_n
+        self.num_files = 0
+        self.total_bytes = 0
+        self.total_lines = 0
+        self.extensions = {}
+        self.directories = {}
+        self._largest = []
+        self._sizes = _LogHistogram()
+        self._lines = _LogHistogram()
+
+    def add(self, path: str, size: int, lines: int):
+        self.num_files += 1
+        self.total_bytes += size
+        self.total_lines += lines
+        self._sizes.add(size)
+        self._lines.add(lines)
+
+        ext = path.rsplit(".", 1)[-1] if "." in os.path.basename(path) else ""
+        top = path.split("/", 1)[0] if "/" in path else ""
+        for totals in (self.extensions.setdefault(ext, [0, 0, 0]), self.directories.setdefault(top, [0, 0, 0])):
+            totals[0] += 1
+            totals[1] += size
+            totals[2] += lines
 
+        entry = (size, path, lines)
+        if len(self._largest) < self.top_n:
+            heapq.heappush(self._largest, entry)
+        elif entry > self._largest[0]:
+            heapq.heapreplace(self._largest, entry)
+
+    def add_text(self, path: str, content: str):
+        self.add(path, len(content.encode("utf-8")), content.count("\n") + 1 if content else 0)
+
+    def result(self):
+        largest = sorted(self._largest, reverse=True)
+        totals = lambda t: {"files": t[0], "bytes": t[1], "lines": t[2]}
+        return {
+            "num_files": self.num_files,
+            "file_extensions": {ext: t[0] for ext, t in self.extensions.items()},
+            "total_lines": self.total_lines,
+            "total_bytes": self.total_bytes,
+            "largest_file": largest[0][1] if largest else "",
+            "largest_file_size": largest[0][0] if largest else 0,
+            "largest_files": [{"path": p, "bytes": b, "lines": l} for b, p, l in largest],
+            "file_size_percentiles": self._sizes.summary(),
+            "line_count_percentiles": self._lines.summary(),
+            "extension_totals": {ext: totals(t) for ext, t in self.extensions.items()},
+            "directory_totals": {d or "(root)": totals(t) for d, t in self.directories.items()},
+        }
+
+def analyze_repo(files):
+    analytics = RepoAnalytics()
     for f in files:
-        filename = f["filename"]
-        content = f["content"]
-        ext = filename.split('.')[-1] if '.' in filename else ''
-        analytics["file_extensions"].setdefault(ext, 0)
-        analytics["file_extensions"][ext] += 1
-        num_lines = content.count('\n') + 1 if content else 0
-        analytics["total_lines"] += num_lines
-        analytics["total_bytes"] += len(content.encode("utf-8"))
-        if len(content.encode("utf-8")) > analytics["largest_file_size"]:
-            analytics["largest_file"] = filename
-            analytics["largest_file_size"] = len(content.encode("utf-8"))
-
-    return analytics
-
-def dummy_dependency_graph(files):
-    nodes = [{"id": f["filename"]} for f in files if f["filename"].endswith(".py")]
-    edges = []
-    if len(nodes) >= 2:
-        edges.append({"from": nodes[0]["id"], "to": nodes[1]["id"]})
-    return {"nodes": nodes, "edges": edges}
+        if "size" in f:
+            analytics.add(f["filename"], f["size"], f["content"].count("\n") + 1 if f["content"] else 0)
+        else:
+            analytics.add_text(f["filename"], f["content"])
+    return analytics.result()
 
 def build_file_tree_from_paths(paths: list[str]):
     tree = {}
@@ -61,3 +187,96 @@ def build_file_tree_from_paths(paths: list[str]):
                     cur[part] = {}
                 cur = cur[part]
     return tree
+
+def _utf16_len(s: str) -> int:
+    # Prefix lengths are read by JS, whose string indices count UTF-16 units.
+    if s.isascii():
+        return len(s)
+    return len(s) + sum(1 for c in s if ord(c) > 0xFFFF)
+
+def front_code_paths(paths: list[str]):
+    # Sorted paths as (shared prefix length with the previous path, suffix).
+    prefix_lengths, suffixes = [], []
+    prev = ""
+    for p in sorted(set(paths)):
+        n = len(os.path.commonprefix((prev, p)))
+        prefix_lengths.append(_utf16_len(p[:n]))
+        suffixes.append(p[n:])
+        prev = p
+    return {"encoding": "front", "count": len(suffixes), "prefix_lengths": prefix_lengths, "suffixes": suffixes}
+
+def front_decode_paths(encoded) -> list[str]:
+    # Python counterpart of the client decoder; slices in UTF-16 units.
+    paths, prev = [], b""
+    for n, suffix in zip(encoded["prefix_lengths"], encoded["suffixes"]):
+        prev = prev[:2 * n] + suffix.encode("utf-16-le")
+        paths.append(prev.decode("utf-16-le"))
+    return paths
+
+def flatten_file_tree(paths: list[str]):
+    # The nested tree without the nesting. Directories are sorted, so a parent
+    # always precedes its children; dir_parents[i] is the index of directory
+    # i's parent, -1 at the top level. Files are grouped by directory:
+    # file_counts[0] files at the top level, then file_counts[i + 1] in
+    # directory i, in that order.
+    dirs = set()
+    for p in paths:
+        d = p.rpartition("/")[0]
+        while d and d not in dirs:
+            dirs.add(d)
+            d = d.rpartition("/")[0]
+    by_dir = {}
+    # A path can't be both a file and a directory in one tree.
+    for p in set(paths) - dirs:
+        parent, _, name = p.rpartition("/")
+        by_dir.setdefault(parent, []).append(name)
+    dirs = sorted(dirs)
+    index = {d: i for i, d in enumerate(dirs)}
+    dir_names, dir_parents = [], []
+    for d in dirs:
+        parent, _, name = d.rpartition("/")
+        dir_names.append(name)
+        dir_parents.append(index[parent] if parent else -1)
+    file_names, file_counts = [], []
+    for d in [""] + dirs:
+        names = sorted(by_dir.get(d, ()))
+        file_names.extend(names)
+        file_counts.append(len(names))
+    return {
+        "encoding": "flat",
+        "dir_names": dir_names,
+        "dir_parents": dir_parents,
+        "file_names": file_names,
+        "file_counts": file_counts,
+    }
+
+def build_tree_entries(files):
+    # Flat rows for repo_tree_entries: every file plus every directory with
+    # recursive size / file / subdirectory totals.
+    entries = []
+    dirs = {}
+    for f in files:
+        path = f["filename"]
+        size = f["size"] if "size" in f else len(f["content"].encode("utf-8")) if f.get("content") else 0
+        parent, _, name = path.rpartition("/")
+        entries.append({"parent": parent, "is_file": True, "name": name, "size": size, "file_count": 0, "dir_count": 0})
+
+        ancestors = []
+        d = parent
+        while d:
+            ancestors.append(d)
+            d = d.rpartition("/")[0]
+        ancestors.reverse()
+        for i, d in enumerate(ancestors):
+            node = dirs.get(d)
+            if node is None:
+                node = dirs[d] = {"size": 0, "file_count": 0, "dir_count": 0}
+                for outer in ancestors[:i]:
+                    dirs[outer]["dir_count"] += 1
+            node["size"] += size
+            node["file_count"] += 1
+
+    for d, totals in dirs.items():
+        parent, _, name = d.rpartition("/")
+        entries.append({"parent": parent, "is_file": False, "name": name, **totals})
+    return entries
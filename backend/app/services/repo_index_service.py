@@ -0,0 +1,71 @@
+# app/services/repo_index_service.py
+import logging
+from typing import List
+from sqlalchemy.orm import Session
+from app.core.config import INDEXED_REPOS_PER_USER, INDEXED_REPO_VECTORS_PER_USER, INDEXED_REPO_VECTORS_TOTAL
+from app.crud.active_repo import get_active_repo, delete_active_repo
+from app.crud.indexed_repo import (
+    IndexedRepoInfo,
+    get_indexed_repo,
+    upsert_indexed_repo,
+    delete_indexed_repo,
+    lru_indexed_repos,
+    indexed_vector_total,
+    legacy_namespace,
+)
+from app.crud.symbol_index import delete_symbol_index
+from app.services.rag_service import delete_pinecone_namespace
+
+logger = logging.getLogger(__name__)
+
+def adopt_active_repo(db: Session, user_id: str):
+    # Repos ingested before indexed_repos existed only have an ActiveRepo row;
+    # register them so they take part in LRU eviction.
+    active = get_active_repo(db, user_id)
+    if active and not get_indexed_repo(db, user_id, active.repo_url):
+        upsert_indexed_repo(db, user_id, active.repo_url, legacy_namespace(user_id, active.repo_url), active.provider, 0)
+
+def evict_repo(db: Session, info: IndexedRepoInfo) -> bool:
+    # Keep the row when the vectors could not be deleted, so a later pass retries.
+    if not delete_pinecone_namespace(info.namespace, info.provider):
+        return False
+    delete_symbol_index(db, info.namespace)
+    delete_indexed_repo(db, info.user_id, info.repo_url)
+    active = get_active_repo(db, info.user_id)
+    if active and active.repo_url == info.repo_url:
+        delete_active_repo(db, info.user_id)
+    logger.info("evicted ns=%s user=%s repo=%s vectors=%d", info.namespace, info.user_id, info.repo_url, info.vector_count)
+    return True
+
+def evict_cold_repos(db: Session, user_id: str, keep_repo_url: str) -> List[IndexedRepoInfo]:
+    # Least recently used first, never the repo the caller is about to use.
+    evicted = []
+    rows = lru_indexed_repos(db, user_id)
+    count = len(rows)
+    vectors = sum(r.vector_count for r in rows)
+    for info in rows:
+        over_count = INDEXED_REPOS_PER_USER and count > INDEXED_REPOS_PER_USER
+        over_vectors = INDEXED_REPO_VECTORS_PER_USER and vectors > INDEXED_REPO_VECTORS_PER_USER
+        if not (over_count or over_vectors):
+            break
+        if info.repo_url == keep_repo_url or not evict_repo(db, info):
+            continue
+        evicted.append(info)
+        count -= 1
+        vectors -= info.vector_count
+
+    if INDEXED_REPO_VECTORS_TOTAL:
+        total = indexed_vector_total(db)
+        while total > INDEXED_REPO_VECTORS_TOTAL:
+            progressed = False
+            for info in lru_indexed_repos(db, limit=100):
+                if total <= INDEXED_REPO_VECTORS_TOTAL:
+                    break
+                if (info.user_id, info.repo_url) == (user_id, keep_repo_url) or not evict_repo(db, info):
+                    continue
+                evicted.append(info)
+                total -= info.vector_count
+                progressed = True
+            if not progressed:
+                break
+    return evicted
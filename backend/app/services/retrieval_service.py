@@ -0,0 +1,260 @@
+# app/services/retrieval_service.py
+import logging
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from app.core.config import (
+    RETRIEVAL_CANDIDATE_K,
+    RETRIEVAL_FINAL_K,
+    RETRIEVAL_LEXICAL_WEIGHT,
+    RETRIEVAL_MMR_LAMBDA,
+    RETRIEVAL_DEPENDENCY_K,
+    RETRIEVAL_SCOPE_MIN_SCORE,
+)
+from app.services.chunking_service import _encode, vector_id
+from app.services.dependency_graph import direct_dependencies
+from app.services.query_scope import in_scope, scope_filter
+from app.utils.concurrency import run_blocking
+from app.utils.metrics import Histogram, timed
+
+logger = logging.getLogger(__name__)
+
+RETRIEVAL_LATENCY = Histogram(
+    "gitrag_retrieval_seconds",
+    "Retrieval latency by stage: fetch (query embedding + vector query), rerank (lexical + MMR), expand (dependency fetch).",
+    ("stage",),
+)
+
+_IDENT_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_WORD_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+_STOPWORDS = {
+    "the", "a", "an", "is", "are", "was", "of", "to", "in", "on", "for", "and", "or",
+    "how", "what", "where", "which", "who", "why", "does", "do", "did", "this", "that",
+    "it", "its", "be", "with", "as", "by", "from", "at", "can", "me", "my", "i", "you",
+    "explain", "show", "tell", "about", "code", "file", "files", "repo",
+}
+
+def lexical_terms(text: str) -> set:
+    terms = set()
+    for ident in _IDENT_RE.findall(text):
+        terms.add(ident.lower())
+        for part in ident.split("_"):
+            for word in _WORD_RE.findall(part):
+                terms.add(word.lower())
+    return {t for t in terms if len(t) > 1 and t not in _STOPWORDS}
+
+def _parse_matches(res) -> List[Dict[str, Any]]:
+    candidates = []
+    for match in res.matches:
+        metadata = dict(match.metadata or {})
+        text = metadata.pop("text", "")
+        if not text:
+            continue
+        candidates.append({
+            "text": text,
+            "metadata": metadata,
+            "score": float(match.score or 0.0),
+            "values": match.values,
+        })
+    return candidates
+
+# Namespaces not fully ingested since chunks carry scope metadata can't be
+# filtered by it (a push re-index only adds it to the files it touched);
+# they are queried unfiltered, this many times deeper, and the matches
+# checked by path instead.
+_UNSCOPED_OVERFETCH = 4
+
+def _query_kwargs(query_vector, namespace: str, top_k: int, metadata_filter: Optional[Dict] = None) -> Dict[str, Any]:
+    kwargs = dict(vector=query_vector, top_k=top_k, namespace=namespace, include_values=True, include_metadata=True)
+    if metadata_filter:
+        kwargs["filter"] = metadata_filter
+    return kwargs
+
+def _scoped(candidates: List[Dict[str, Any]], scope, top_k: int) -> List[Dict[str, Any]]:
+    return [c for c in candidates if in_scope(scope, c["metadata"].get("file", ""))][:top_k]
+
+def _weak(scoped: List[Dict[str, Any]]) -> bool:
+    # For an inferred scope, nothing close in it means the question probably
+    # wasn't about that part of the repo. Caller-given scopes are never widened.
+    return not scoped or max(c["score"] for c in scoped) < RETRIEVAL_SCOPE_MIN_SCORE
+
+def _widened(scoped: List[Dict[str, Any]], wide: List[Dict[str, Any]], top_k: int, namespace: str) -> List[Dict[str, Any]]:
+    logger.info(
+        "retrieval ns=%s widening scope: %d scoped candidates, best score %.3f",
+        namespace, len(scoped), max((c["score"] for c in scoped), default=0.0),
+    )
+    have = {(c["metadata"].get("file"), c["metadata"].get("chunk_index")) for c in scoped}
+    return scoped + [c for c in wide[:top_k] if (c["metadata"].get("file"), c["metadata"].get("chunk_index")) not in have]
+
+def fetch_candidates(index, embedder, query: str, namespace: str, top_k: int, scope=None, prefilter=True) -> List[Dict[str, Any]]:
+    query_vector = embedder.embed_query(query)
+    if not scope:
+        return _parse_matches(index.query(**_query_kwargs(query_vector, namespace, top_k)))
+    if prefilter:
+        scoped = _parse_matches(index.query(**_query_kwargs(query_vector, namespace, top_k, scope_filter(scope))))
+        if not scope.inferred or not _weak(scoped):
+            return scoped
+        wide = _parse_matches(index.query(**_query_kwargs(query_vector, namespace, top_k)))
+    else:
+        wide = _parse_matches(index.query(**_query_kwargs(query_vector, namespace, top_k * _UNSCOPED_OVERFETCH)))
+        scoped = _scoped(wide, scope, top_k)
+        if not scope.inferred or not _weak(scoped):
+            return scoped
+    return _widened(scoped, wide, top_k, namespace)
+
+async def afetch_candidates(index, embedder, query: str, namespace: str, top_k: int, scope=None, prefilter=True) -> List[Dict[str, Any]]:
+    query_vector = await embedder.aembed_query(query)
+    if not scope:
+        return _parse_matches(await run_blocking(index.query, **_query_kwargs(query_vector, namespace, top_k)))
+    if prefilter:
+        res = await run_blocking(index.query, **_query_kwargs(query_vector, namespace, top_k, scope_filter(scope)))
+        scoped = _parse_matches(res)
+        if not scope.inferred or not _weak(scoped):
+            return scoped
+        wide = _parse_matches(await run_blocking(index.query, **_query_kwargs(query_vector, namespace, top_k)))
+    else:
+        res = await run_blocking(index.query, **_query_kwargs(query_vector, namespace, top_k * _UNSCOPED_OVERFETCH))
+        wide = _parse_matches(res)
+        scoped = _scoped(wide, scope, top_k)
+        if not scope.inferred or not _weak(scoped):
+            return scoped
+    return _widened(scoped, wide, top_k, namespace)
+
+def rerank_candidates(query: str, candidates: List[Dict[str, Any]], lexical_weight: float = RETRIEVAL_LEXICAL_WEIGHT):
+    query_terms = lexical_terms(query)
+    for c in candidates:
+        if query_terms:
+            doc_terms = lexical_terms(c["text"]) | lexical_terms(c["metadata"].get("file", ""))
+            lexical = len(query_terms & doc_terms) / len(query_terms)
+        else:
+            lexical = 0.0
+        c["lexical"] = lexical
+        c["relevance"] = (1.0 - lexical_weight) * c["score"] + lexical_weight * lexical
+    return sorted(candidates, key=lambda c: c["relevance"], reverse=True)
+
+def mmr_select(candidates: List[Dict[str, Any]], k: int, lambda_mult: float = RETRIEVAL_MMR_LAMBDA):
+    if len(candidates) <= k:
+        return list(candidates)
+    import numpy as np
+    vectors = np.asarray([c["values"] for c in candidates], dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.where(norms == 0, 1.0, norms)
+    similarity = vectors @ vectors.T
+    relevance = np.asarray([c["relevance"] for c in candidates], dtype=np.float32)
+
+    selected = [int(np.argmax(relevance))]
+    redundancy = similarity[selected[0]].copy()
+    while len(selected) < k:
+        mmr = lambda_mult * relevance - (1.0 - lambda_mult) * redundancy
+        mmr[selected] = -np.inf
+        best = int(np.argmax(mmr))
+        selected.append(best)
+        redundancy = np.maximum(redundancy, similarity[best])
+    return [candidates[i] for i in selected]
+
+def _dependency_fetch_ids(graph: Dict, selected: List[Dict[str, Any]], k: int, scope=None) -> List[str]:
+    files = direct_dependencies(graph, [c["metadata"].get("file", "") for c in selected])
+    have = {(c["metadata"].get("file"), c["metadata"].get("chunk_index")) for c in selected}
+    return [vector_id(f, 0) for f in files if (f, 0) not in have and in_scope(scope, f)][:k]
+
+def _parse_fetched(res, ids: List[str], selected: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # Dependencies rank just below the weakest direct hit so packing keeps them last.
+    floor = min((c["relevance"] for c in selected), default=0.0) * 0.9
+    found = []
+    for vid in ids:
+        vec = res.vectors.get(vid)
+        metadata = dict(vec.metadata or {}) if vec else {}
+        text = metadata.pop("text", "")
+        if not text:
+            continue
+        metadata["via"] = "dependency"
+        found.append({"text": text, "metadata": metadata, "score": floor, "relevance": floor})
+    return found
+
+def fetch_dependency_chunks(index, namespace: str, graph: Dict, selected: List[Dict[str, Any]], k: int, scope=None):
+    # Head chunk of each directly imported file, fetched by id: no extra vector query.
+    ids = _dependency_fetch_ids(graph, selected, k, scope)
+    if not ids:
+        return []
+    return _parse_fetched(index.fetch(ids=ids, namespace=namespace), ids, selected)
+
+async def afetch_dependency_chunks(index, namespace: str, graph: Dict, selected: List[Dict[str, Any]], k: int, scope=None):
+    ids = _dependency_fetch_ids(graph, selected, k, scope)
+    if not ids:
+        return []
+    res = await run_blocking(index.fetch, ids=ids, namespace=namespace)
+    return _parse_fetched(res, ids, selected)
+
+def _count_tokens(items) -> int:
+    return sum(len(_encode(c["text"])) for c in items)
+
+class RerankingRetriever(BaseRetriever):
+    index: Any
+    embedder: Any
+    namespace: str
+    candidate_k: int = RETRIEVAL_CANDIDATE_K
+    final_k: int = RETRIEVAL_FINAL_K
+    lexical_weight: float = RETRIEVAL_LEXICAL_WEIGHT
+    mmr_lambda: float = RETRIEVAL_MMR_LAMBDA
+    dependency_graph: Optional[Dict] = None
+    dependency_k: int = RETRIEVAL_DEPENDENCY_K
+    # QueryScope: restricts candidates and dependency chunks to matching paths.
+    scope: Optional[Any] = None
+    # False when the namespace's chunks may lack scope metadata (see _UNSCOPED_OVERFETCH).
+    scope_prefilter: bool = True
+
+    def _select(self, query: str, candidates: List[Dict[str, Any]], started: float) -> List[Dict[str, Any]]:
+        fetched = time.perf_counter()
+        ranked = rerank_candidates(query, candidates, self.lexical_weight)
+        selected = mmr_select(ranked, self.final_k, self.mmr_lambda)
+        done = time.perf_counter()
+        RETRIEVAL_LATENCY.observe(fetched - started, stage="fetch")
+        RETRIEVAL_LATENCY.observe(done - fetched, stage="rerank")
+
+        if logger.isEnabledFor(logging.INFO):
+            baseline = sorted(candidates, key=lambda c: c["score"], reverse=True)[:self.final_k]
+            logger.info(
+                "retrieval ns=%s scope=%s candidates=%d kept=%d tokens_topk=%d tokens_kept=%d fetch_ms=%.1f rerank_ms=%.1f",
+                self.namespace, scope_filter(self.scope), len(candidates), len(selected), _count_tokens(baseline),
+                _count_tokens(selected), (fetched - started) * 1000, (done - fetched) * 1000,
+            )
+        return selected
+
+    def _expands(self, selected: List[Dict[str, Any]]) -> bool:
+        return bool(self.dependency_graph and self.dependency_graph.get("deps") and self.dependency_k > 0 and selected)
+
+    @staticmethod
+    def _documents(items: List[Dict[str, Any]]) -> List[Document]:
+        return [
+            Document(page_content=c["text"], metadata={**c["metadata"], "score": c["relevance"]})
+            for c in items
+        ]
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        started = time.perf_counter()
+        candidates = fetch_candidates(
+            self.index, self.embedder, query, self.namespace, max(self.candidate_k, self.final_k),
+            self.scope, self.scope_prefilter,
+        )
+        selected = self._select(query, candidates, started)
+        if self._expands(selected):
+            with timed(RETRIEVAL_LATENCY, stage="expand"):
+                selected += fetch_dependency_chunks(self.index, self.namespace, self.dependency_graph, selected, self.dependency_k, self.scope)
+        return self._documents(selected)
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun) -> List[Document]:
+        started = time.perf_counter()
+        candidates = await afetch_candidates(
+            self.index, self.embedder, query, self.namespace, max(self.candidate_k, self.final_k),
+            self.scope, self.scope_prefilter,
+        )
+        selected = self._select(query, candidates, started)
+        if self._expands(selected):
+            with timed(RETRIEVAL_LATENCY, stage="expand"):
+                selected += await afetch_dependency_chunks(self.index, self.namespace, self.dependency_graph, selected, self.dependency_k, self.scope)
+        return self._documents(selected)
@@ -0,0 +1,341 @@
+# app/services/symbol_index.py
+import ast
+import hashlib
+import re
+from collections import Counter, OrderedDict
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Tuple
+from app.services.repo_analysis import language_for_path
+from app.utils.ttl_cache import CACHE_REQUESTS
+
+# defs:    [(name, line, kind)]
+# imports: [(module, [imported names], line)]
+Symbols = Tuple[List[Tuple[str, int, str]], List[Tuple[str, List[str], int]]]
+
+_JS_DEF_RES = (
+    (re.compile(r"^\s*(?:export\s+)?(?:default\s+)?(?:async\s+)?function\s*\*?\s*([A-Za-z_$][\w$]*)"), "function"),
+    (re.compile(r"^\s*(?:export\s+)?(?:default\s+)?(?:abstract\s+)?class\s+([A-Za-z_$][\w$]*)"), "class"),
+    (re.compile(r"^\s*(?:export\s+)?interface\s+([A-Za-z_$][\w$]*)"), "interface"),
+    (re.compile(r"^\s*(?:export\s+)?type\s+([A-Za-z_$][\w$]*)\s*(?:<[^=]*>)?\s*="), "type"),
+    (re.compile(r"^\s*(?:export\s+)?(?:const|let|var)\s+([A-Za-z_$][\w$]*)\s*=\s*(?:async\s+)?(?:function|\([^)]*\)\s*=>|[A-Za-z_$][\w$]*\s*=>)"), "function"),
+    (re.compile(r"^\s*(?:export\s+)?(?:const|let|var)\s+([A-Za-z_$][\w$]*)\s*="), "variable"),
+)
+_JS_IMPORT_FROM_RE = re.compile(r"""^\s*import\s+(?:type\s+)?(.+?)\s+from\s+['"]([^'"]+)['"]""")
+_JS_IMPORT_BARE_RE = re.compile(r"""^\s*import\s+['"]([^'"]+)['"]""")
+_JS_REQUIRE_RE = re.compile(r"""require\(\s*['"]([^'"]+)['"]\s*\)""")
+_JS_EXPORT_FROM_RE = re.compile(r"""^\s*export\s+.+?\s+from\s+['"]([^'"]+)['"]""")
+
+_GO_FUNC_RE = re.compile(r"^func\s+(?:\([^)]*\)\s*)?([A-Za-z_]\w*)\s*[\[(]")
+_GO_TYPE_RE = re.compile(r"^type\s+([A-Za-z_]\w*)\s+(struct|interface)?")
+_GO_IMPORT_RE = re.compile(r"""^import\s+(?:[\w.]+\s+)?"([^"]+)\"""")
+_GO_IMPORT_LINE_RE = re.compile(r"""^\s*(?:[\w.]+\s+)?"([^"]+)\"""")
+
+_JAVA_TYPE_RE = re.compile(r"^\s*(?:(?:public|protected|private|abstract|final|static|sealed)\s+)*(class|interface|enum|record)\s+([A-Za-z_]\w*)")
+_JAVA_METHOD_RE = re.compile(r"^\s+(?:(?:public|protected|private|abstract|final|static|synchronized|native|default)\s+)+[\w<>\[\],.? ]+?\s+([a-z_]\w*)\s*\(")
+_JAVA_IMPORT_RE = re.compile(r"^\s*import\s+(?:static\s+)?([\w.]+(?:\.\*)?)\s*;")
+
+def _python_symbols(content: str) -> Symbols:
+    tree = ast.parse(content)
+    defs, imports = [], []
+
+    def visit(node, in_class=False):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                defs.append((child.name, child.lineno, "method" if in_class else "function"))
+                visit(child)
+            elif isinstance(child, ast.ClassDef):
+                defs.append((child.name, child.lineno, "class"))
+                visit(child, in_class=True)
+            elif isinstance(child, ast.Import):
+                for alias in child.names:
+                    imports.append((alias.name, [], child.lineno))
+            elif isinstance(child, ast.ImportFrom):
+                module = "." * child.level + (child.module or "")
+                imports.append((module, [a.name for a in child.names], child.lineno))
+            elif isinstance(child, (ast.Assign, ast.AnnAssign)) and node is tree:
+                targets = child.targets if isinstance(child, ast.Assign) else [child.target]
+                for t in targets:
+                    if isinstance(t, ast.Name):
+                        defs.append((t.id, child.lineno, "variable"))
+            else:
+                visit(child, in_class)
+
+    visit(tree)
+    return defs, imports
+
+def _js_symbols(content: str) -> Symbols:
+    defs, imports = [], []
+    for lineno, line in enumerate(content.splitlines(), 1):
+        m = _JS_IMPORT_FROM_RE.match(line)
+        if m:
+            names = re.findall(r"[A-Za-z_$][\w$]*", re.sub(r"\bas\s+[\w$]+", "", m.group(1)))
+            imports.append((m.group(2), [n for n in names if n != "type"], lineno))
+            continue
+        m = _JS_IMPORT_BARE_RE.match(line) or _JS_EXPORT_FROM_RE.match(line)
+        if m:
+            imports.append((m.group(1), [], lineno))
+            continue
+        for module in _JS_REQUIRE_RE.findall(line):
+            imports.append((module, [], lineno))
+        for regex, kind in _JS_DEF_RES:
+            m = regex.match(line)
+            if m:
+                defs.append((m.group(1), lineno, kind))
+                break
+    return defs, imports
+
+def _go_symbols(content: str) -> Symbols:
+    defs, imports = [], []
+    in_import_block = False
+    for lineno, line in enumerate(content.splitlines(), 1):
+        if in_import_block:
+            if line.strip().startswith(")"):
+                in_import_block = False
+                continue
+            m = _GO_IMPORT_LINE_RE.match(line)
+            if m:
+                imports.append((m.group(1), [], lineno))
+            continue
+        if line.startswith("import ("):
+            in_import_block = True
+            continue
+        m = _GO_IMPORT_RE.match(line)
+        if m:
+            imports.append((m.group(1), [], lineno))
+            continue
+        m = _GO_FUNC_RE.match(line)
+        if m:
+            defs.append((m.group(1), lineno, "function"))
+            continue
+        m = _GO_TYPE_RE.match(line)
+        if m:
+            defs.append((m.group(1), lineno, m.group(2) or "type"))
+    return defs, imports
+
+def _java_symbols(content: str) -> Symbols:
+    defs, imports = [], []
+    for lineno, line in enumerate(content.splitlines(), 1):
+        m = _JAVA_IMPORT_RE.match(line)
+        if m:
+            module = m.group(1)
+            imports.append((module, [module.rsplit(".", 1)[-1]], lineno))
+            continue
+        m = _JAVA_TYPE_RE.match(line)
+        if m:
+            defs.append((m.group(2), lineno, m.group(1)))
+            continue
+        m = _JAVA_METHOD_RE.match(line)
+        if m:
+            defs.append((m.group(1), lineno, "method"))
+    return defs, imports
+
+_EXTRACTORS = {
+    "Python": _python_symbols,
+    "JavaScript": _js_symbols,
+    "TypeScript": _js_symbols,
+    "Go": _go_symbols,
+    "Java": _java_symbols,
+}
+
+def extract_symbols(path: str, content: str) -> Symbols:
+    extractor = _EXTRACTORS.get(language_for_path(path))
+    if not extractor:
+        return [], []
+    try:
+        return extractor(content)
+    except (SyntaxError, ValueError, RecursionError):
+        return [], []
+
+# Extraction results keyed by (language, content hash): re-ingesting a repo
+# only parses the files that actually changed.
+_SYMBOLS_CACHE_SIZE = 50000
+_symbols_cache: "OrderedDict[Tuple[str, str], Symbols]" = OrderedDict()
+_symbols_cache_lock = Lock()
+
+def symbols_cache_key(path: str, content: str):
+    language = language_for_path(path)
+    if language not in _EXTRACTORS:
+        return None
+    return language, hashlib.sha1((content or "").encode("utf-8")).hexdigest()
+
+def get_cached_symbols(key) -> Optional[Symbols]:
+    with _symbols_cache_lock:
+        symbols = _symbols_cache.get(key)
+        if symbols is not None:
+            _symbols_cache.move_to_end(key)
+    CACHE_REQUESTS.inc(cache="symbols", result="miss" if symbols is None else "hit")
+    return symbols
+
+def put_cached_symbols(key, symbols: Symbols):
+    with _symbols_cache_lock:
+        _symbols_cache[key] = symbols
+        _symbols_cache.move_to_end(key)
+        while len(_symbols_cache) > _SYMBOLS_CACHE_SIZE:
+            _symbols_cache.popitem(last=False)
+
+def build_symbol_index(files: Iterable[Dict], symbols: Optional[Dict[str, Symbols]] = None) -> Dict:
+    # Compact, JSON-friendly layout: files are referenced by their position
+    # in "files" so each path is stored once. `symbols` holds per-path
+    # extraction results already computed during chunking.
+    paths, lines, defs, imports, imported_names = [], [], {}, {}, {}
+    for f in files:
+        path, content = f["filename"], f["content"]
+        fi = len(paths)
+        paths.append(path)
+        lines.append(content.count("\n") + 1 if content else 0)
+        if symbols is not None:
+            file_defs, file_imports = symbols.get(path) or ([], [])
+        else:
+            file_defs, file_imports = extract_symbols(path, content)
+        for name, line, kind in file_defs:
+            defs.setdefault(name, []).append([fi, line, kind])
+        for module, names, line in file_imports:
+            imports.setdefault(module, []).append([fi, line])
+            for name in names:
+                imported_names.setdefault(name, []).append([fi, line])
+    return {"v": 1, "files": paths, "lines": lines, "defs": defs, "imports": imports, "names": imported_names}
+
+def patch_symbol_index(index: Dict, files: Iterable[Dict], drop: Iterable[str], symbols: Optional[Dict[str, Symbols]] = None) -> Dict:
+    # Replaces whole files in an index from build_symbol_index without the
+    # rest of the repo's contents: entries of `drop` and of `files` are
+    # removed, then `files` are appended.
+    files = list(files)
+    replaced = set(drop) | {f["filename"] for f in files}
+    keep = [fi for fi, path in enumerate(index["files"]) if path not in replaced]
+    remap = {old: new for new, old in enumerate(keep)}
+
+    def kept(table):
+        out = {}
+        for key, hits in table.items():
+            hits = [[remap[h[0]], *h[1:]] for h in hits if h[0] in remap]
+            if hits:
+                out[key] = hits
+        return out
+
+    patched = {
+        "v": 1,
+        "files": [index["files"][fi] for fi in keep],
+        "lines": [index["lines"][fi] for fi in keep],
+        "defs": kept(index["defs"]),
+        "imports": kept(index["imports"]),
+        "names": kept(index["names"]),
+    }
+    added = build_symbol_index(files, symbols)
+    offset = len(patched["files"])
+    patched["files"] += added["files"]
+    patched["lines"] += added["lines"]
+    for table in ("defs", "imports", "names"):
+        for key, hits in added[table].items():
+            patched[table].setdefault(key, []).extend([h[0] + offset, *h[1:]] for h in hits)
+    return patched
+
+_TICKS = "`'\""
+_DEFINITION_RES = (
+    re.compile(r"where\s+(?:is|are)\s+(?:the\s+)?(?:function\s+|class\s+|method\s+)?[`'\"]?([\w.$]+)[`'\"]?\s+(?:defined|declared|implemented)", re.I),
+    re.compile(r"(?:find|show|locate|go\s+to)\s+(?:the\s+)?(?:definition|declaration)\s+of\s+[`'\"]?([\w.$]+)", re.I),
+    re.compile(r"(?:which|what)\s+file\s+(?:defines|declares|contains\s+the\s+definition\s+of)\s+[`'\"]?([\w.$]+)", re.I),
+)
+_USAGE_RES = (
+    re.compile(r"(?:which|what)\s+files?\s+(?:imports?|uses?|requires?|references?|depends?\s+on)\s+[`'\"]?([\w./@$-]+)", re.I),
+    re.compile(r"(?:who|what)\s+(?:imports|uses|requires)\s+[`'\"]?([\w./@$-]+)", re.I),
+    re.compile(r"where\s+(?:is|are)\s+[`'\"]?([\w./@$-]+)[`'\"]?\s+(?:used|imported|required|referenced)", re.I),
+)
+# Only questions about the whole repo; "what language does the parser
+# accept?" is about the code and goes to retrieval.
+_REPO_NOUN = r"(?:this|the|my|your)\s+(?:repo(?:sitory)?|project|codebase|code\s*base)"
+# The whole question, so "how many files import requests?" or "... in
+# backend/app?" go to retrieval instead of getting the repo total.
+_FILE_COUNT_RE = re.compile(
+    r"^\s*how\s+many\s+(?:(?!source\b)([\w#+]+)\s+)?(?:source\s+)?files"
+    rf"(?:\s+(?:are\s+there|(?:does|do)\s+{_REPO_NOUN}\s+have))?"
+    rf"(?:\s+(?:are\s+)?in\s+{_REPO_NOUN})?"
+    r"\s*[?.!]*\s*$",
+    re.I,
+)
+_LANGUAGE_STATS_RE = re.compile(
+    r"(?:what|which)\s+(?:programming\s+)?languages?\s+(?:"
+    rf"(?:is|are|does|do)\s+{_REPO_NOUN}\s+(?:written|built|coded|implemented|made|use|using)"
+    rf"|(?:is|are)\s+(?:used\s+)?(?:in|by)\s+{_REPO_NOUN}"
+    rf"|(?:make\s+up|makes\s+up)\s+{_REPO_NOUN})"
+    rf"|what\s+is\s+{_REPO_NOUN}\s+written\s+in"
+    r"|language\s+(?:stats|statistics|breakdown|distribution|mix)",
+    re.I,
+)
+
+def _format_locations(index: Dict, hits: List[List], extra=lambda hit: "") -> str:
+    files = index["files"]
+    return "\n".join(f"- {files[h[0]]}:{h[1]}{extra(h)}" for h in sorted(hits, key=lambda h: (files[h[0]], h[1])))
+
+def _answer_definition(index: Dict, symbol: str) -> Optional[str]:
+    name = symbol.strip(_TICKS).split(".")[-1]
+    hits = index["defs"].get(name)
+    if not hits:
+        return None
+    return f"`{name}` is defined in:\n" + _format_locations(index, hits, lambda h: f" ({h[2]})")
+
+def _module_matches(module: str, target: str) -> bool:
+    if module == target:
+        return True
+    parts = re.split(r"[./]", module.lstrip("./"))
+    target_parts = re.split(r"[./]", target.lstrip("./"))
+    n = len(target_parts)
+    return any(parts[i:i + n] == target_parts for i in range(len(parts) - n + 1))
+
+def _answer_usage(index: Dict, symbol: str) -> Optional[str]:
+    target = symbol.strip(_TICKS).rstrip(".")
+    hits = list(index["names"].get(target, []))
+    for module, locations in index["imports"].items():
+        if _module_matches(module, target):
+            hits.extend(locations)
+    if not hits:
+        return None
+    seen, unique = set(), []
+    for h in hits:
+        if (h[0], h[1]) not in seen:
+            seen.add((h[0], h[1]))
+            unique.append(h)
+    file_count = len({h[0] for h in unique})
+    return f"`{target}` is imported in {file_count} file(s):\n" + _format_locations(index, unique)
+
+def _language_counts(index: Dict) -> Tuple[Counter, Counter]:
+    files, lines = Counter(), Counter()
+    for path, n in zip(index["files"], index["lines"]):
+        lang = language_for_path(path)
+        files[lang] += 1
+        lines[lang] += n
+    return files, lines
+
+def _answer_file_count(index: Dict, qualifier: Optional[str]) -> Optional[str]:
+    total = len(index["files"])
+    if not qualifier:
+        return f"The indexed repo has {total} file(s)."
+    files, _ = _language_counts(index)
+    for lang, n in files.items():
+        if lang.lower() == qualifier.lower():
+            return f"The indexed repo has {n} {lang} file(s) out of {total}."
+    return None
+
+def _answer_language_stats(index: Dict) -> str:
+    files, lines = _language_counts(index)
+    total_lines = sum(lines.values()) or 1
+    rows = [
+        f"- {lang}: {files[lang]} file(s), {lines[lang]} lines ({lines[lang] * 100 / total_lines:.1f}%)"
+        for lang, _ in lines.most_common()
+    ]
+    return "Language breakdown of the indexed files:\n" + "\n".join(rows)
+
+def answer_structural_query(index: Dict, message: str) -> Optional[str]:
+    for regex in _DEFINITION_RES:
+        m = regex.search(message)
+        if m:
+            return _answer_definition(index, m.group(1))
+    for regex in _USAGE_RES:
+        m = regex.search(message)
+        if m:
+            return _answer_usage(index, m.group(1))
+    m = _FILE_COUNT_RE.match(message)
+    if m:
+        return _answer_file_count(index, m.group(1))
+    if _LANGUAGE_STATS_RE.search(message):
+        return _answer_language_stats(index)
+    return None
@@ -0,0 +1,44 @@
+# app/services/warmup.py
+import importlib
+import logging
+import time
+from sqlalchemy import text
+from app.services.chunking_service import get_encoding
+from app.utils.db import engine
+
+logger = logging.getLogger(__name__)
+
+# Imported lazily by the request paths; loading them here moves the cost
+# off the first chat/ingest request.
+_HEAVY_MODULES = (
+    "langchain_openai",
+    "langchain_google_genai",
+    "pinecone",
+    "numpy",
+)
+
+def warm_up():
+    timings = {}
+    for name in _HEAVY_MODULES:
+        started = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            print(f"Warm-up: could not import {name}: {e}")
+            continue
+        timings[name] = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    get_encoding()
+    timings["tiktoken"] = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        timings["db"] = (time.perf_counter() - started) * 1000
+    except Exception as e:
+        print(f"Warm-up: database ping failed: {e}")
+
+    logger.info("warm-up done: %s", " ".join(f"{k}={v:.0f}ms" for k, v in timings.items()))
+    return timings
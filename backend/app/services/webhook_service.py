@@ -0,0 +1,256 @@
+# app/services/webhook_service.py
+import asyncio
+import hashlib
+import hmac
+import logging
+import os
+import time
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Set, Tuple
+
+from app.core.config import WEBHOOK_DEBOUNCE_SECONDS, WEBHOOK_MAX_DELAY_SECONDS
+from app.crud.api_key import get_api_key_by_provider
+from app.crud.indexed_repo import indexed_repos_for_repo, add_indexed_repo_vectors
+from app.crud.symbol_index import get_symbol_index, upsert_symbol_index
+from app.services.chunking_service import chunk_text_to_chunks, _should_skip_file
+from app.services.github_service import get_changed_paths, get_files_at_ref, list_and_get_files
+from app.services.rag_service import replace_file_vectors, requires_api_key
+from app.services.symbol_index import extract_symbols, patch_symbol_index
+from app.utils.concurrency import run_blocking
+from app.utils.db import SessionLocal
+from app.utils.metrics import Counter, Histogram, STAGE_LATENCY_BUCKETS
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_PUSHES = Counter(
+    "gitrag_webhook_pushes_total",
+    "GitHub push deliveries by outcome.",
+    ("result",),
+)
+REINDEX_FILES = Counter(
+    "gitrag_webhook_reindexed_files_total",
+    "Files re-indexed after a push, by outcome.",
+    ("result",),
+)
+REINDEX_SECONDS = Histogram(
+    "gitrag_webhook_reindex_seconds",
+    "Wall time of one coalesced push re-index.",
+    buckets=STAGE_LATENCY_BUCKETS,
+)
+
+# GitHub lists at most this many commits in a push payload.
+_PAYLOAD_MAX_COMMITS = 20
+# Pushes patch vectors by vector_id(); older namespaces need a full re-ingest.
+_MIN_INDEX_VERSION = 1
+
+class PushChanges(NamedTuple):
+    owner: str
+    repo: str
+    branch: str
+    paths: Set[str]
+    before: str = ""
+    after: str = ""
+    # The payload's commits may not name every changed file (force push, or
+    # more commits than the payload lists); the rest come from the compare API.
+    truncated: bool = False
+    # Users whose webhook secret signed the delivery; only their namespaces
+    # for the repo are re-indexed.
+    users: FrozenSet[str] = frozenset()
+
+class PushContent(NamedTuple):
+    paths: List[str]
+    files: List[Dict]
+    chunks: List[Dict]
+    # The changed files couldn't be listed, so `paths` is the whole branch;
+    # indexed files missing from it were deleted.
+    full: bool = False
+
+def verify_signature(secret: str, body: bytes, signature: Optional[str]) -> bool:
+    # X-Hub-Signature-256: "sha256=" + HMAC-SHA256 of the raw body.
+    if not secret or not signature or not signature.startswith("sha256="):
+        return False
+    expected = hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature[len("sha256="):])
+
+def push_changes(payload: dict) -> Optional[PushChanges]:
+    # Ingest reads the default branch, so only pushes to it change an index.
+    # Added, modified and removed paths are all just "touched": they are
+    # re-read at the branch head when the re-index runs, which keeps
+    # coalesced or out-of-order deliveries correct.
+    ref = payload.get("ref") or ""
+    repository = payload.get("repository") or {}
+    if payload.get("deleted") or not ref.startswith("refs/heads/"):
+        return None
+    branch = ref[len("refs/heads/"):]
+    if branch != repository.get("default_branch"):
+        return None
+    owner, _, repo = (repository.get("full_name") or "").partition("/")
+    commits = payload.get("commits") or []
+    paths = set()
+    for commit in commits:
+        for key in ("added", "modified", "removed"):
+            paths.update(commit.get(key) or ())
+    truncated = bool(payload.get("forced")) or len(commits) >= _PAYLOAD_MAX_COMMITS
+    if not owner or not repo or not (paths or truncated):
+        return None
+    return PushChanges(owner, repo, branch, paths, payload.get("before") or "", payload.get("after") or "", truncated)
+
+def load_push(changes: PushChanges, github_token: Optional[str] = None) -> PushContent:
+    # Current contents of the touched paths, chunked. Paths that no longer
+    # exist (or aren't indexed at all) have no files and no chunks, so their
+    # vectors are simply deleted. A truncated push adds the compare API's
+    # paths; if even those can't be listed the whole branch is re-read.
+    paths = set(changes.paths)
+    if changes.truncated:
+        changed = get_changed_paths(changes.owner, changes.repo, changes.before, changes.after, github_token)
+        if changed is None:
+            files = [
+                {"filename": f["filename"], "content": f["content"]}
+                for f in list_and_get_files(changes.owner, changes.repo, github_token=github_token)
+                if not _should_skip_file(f["filename"])
+            ]
+            chunks = [c for f in files for c in chunk_text_to_chunks(f["filename"], f["content"])]
+            return PushContent(sorted(paths | {f["filename"] for f in files}), files, chunks, full=True)
+        paths.update(changed)
+    contents = get_files_at_ref(changes.owner, changes.repo, sorted(paths), changes.branch, github_token)
+    files = [
+        {"filename": path, "content": content}
+        for path, content in contents.items()
+        if content is not None and not _should_skip_file(path)
+    ]
+    chunks = [c for f in files for c in chunk_text_to_chunks(f["filename"], f["content"])]
+    return PushContent(sorted(paths), files, chunks)
+
+def apply_push(changes: PushChanges) -> Dict:
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        targets = []
+        for info in indexed_repos_for_repo(db, changes.owner, changes.repo):
+            if info.user_id not in changes.users:
+                continue
+            if (info.index_version or 0) < _MIN_INDEX_VERSION:
+                # Its ids aren't vector_id()s, so replacing by id would leave
+                # the old vectors next to the new ones.
+                logger.warning("push reindex skipped ns=%s: indexed before per-file vector ids, re-ingest it", info.namespace)
+                continue
+            targets.append(info)
+        if not targets:
+            return {"namespaces": 0}
+        content = load_push(changes, os.getenv("GITHUB_TOKEN"))
+        files, chunks = content.files, content.chunks
+        symbols = {f["filename"]: extract_symbols(f["filename"], f["content"]) for f in files}
+        updated = 0
+        for info in targets:
+            api_key = ""
+            if requires_api_key(info.provider):
+                api_key = get_api_key_by_provider(db, info.user_id, info.provider)
+                if not api_key:
+                    logger.warning("push reindex skipped ns=%s: no %s API key", info.namespace, info.provider)
+                    continue
+            index = get_symbol_index(db, info.namespace)
+            paths = content.paths
+            if content.full and index is not None:
+                # Files indexed earlier but gone from the branch.
+                paths = sorted(set(paths) | set(index["files"]))
+            try:
+                delta = replace_file_vectors(paths, chunks, info.namespace, info.provider, api_key)
+            except Exception:
+                logger.exception("push reindex failed ns=%s", info.namespace)
+                continue
+            add_indexed_repo_vectors(db, info.user_id, info.repo_url, delta)
+            if index is not None:
+                upsert_symbol_index(db, info.namespace, patch_symbol_index(index, files, paths, symbols))
+            updated += 1
+        removed = len(content.paths) - len(files)
+        REINDEX_FILES.inc(len(files), result="updated")
+        REINDEX_FILES.inc(removed, result="removed")
+        logger.info(
+            "push reindex %s/%s files=%d removed=%d chunks=%d full=%s namespaces=%d/%d",
+            changes.owner, changes.repo, len(files), removed, len(chunks), content.full, updated, len(targets),
+        )
+        return {"namespaces": updated, "files": len(files), "removed": removed, "chunks": len(chunks), "full": content.full}
+    finally:
+        db.close()
+        REINDEX_SECONDS.observe(time.perf_counter() - started)
+
+class _PendingPush:
+    def __init__(self, changes: PushChanges, now: float):
+        self.changes = changes
+        self.paths = set(changes.paths)
+        # Coalesced pushes compare from the first one's base to the latest head.
+        self.before = changes.before
+        self.truncated = changes.truncated
+        self.users = set(changes.users)
+        self.first = self.last = now
+        self.pushes = 1
+
+    def merged(self) -> PushChanges:
+        return self.changes._replace(
+            paths=self.paths, before=self.before, truncated=self.truncated, users=frozenset(self.users),
+        )
+
+# Debounces pushes per repo: touched paths accumulate until no push arrived
+# for `debounce` seconds (or `max_delay` after the first), then one re-index
+# runs in the blocking pool. Pushes arriving during a run queue the next one,
+# so a repo is never re-indexed concurrently within a worker.
+class PushReindexer:
+    def __init__(self, debounce: float = WEBHOOK_DEBOUNCE_SECONDS, max_delay: float = WEBHOOK_MAX_DELAY_SECONDS, apply=apply_push):
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.apply = apply
+        self._pending: Dict[Tuple[str, str], _PendingPush] = {}
+        self._tasks: Dict[Tuple[str, str], asyncio.Task] = {}
+
+    def submit(self, changes: PushChanges):
+        key = (changes.owner.lower(), changes.repo.lower())
+        now = time.monotonic()
+        pending = self._pending.get(key)
+        if pending:
+            pending.paths |= changes.paths
+            pending.truncated = pending.truncated or changes.truncated
+            pending.users |= changes.users
+            pending.changes = changes
+            pending.last = now
+            pending.pushes += 1
+        else:
+            self._pending[key] = _PendingPush(changes, now)
+        if key not in self._tasks:
+            self._tasks[key] = asyncio.create_task(self._run(key))
+
+    def pending_paths(self) -> int:
+        return sum(len(p.paths) for p in self._pending.values())
+
+    async def wait_idle(self):
+        # Until every queued push has been applied.
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks.values()), return_exceptions=True)
+
+    async def _run(self, key):
+        try:
+            while key in self._pending:
+                pending = self._pending[key]
+                delay = min(pending.last + self.debounce, pending.first + self.max_delay) - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                    continue
+                del self._pending[key]
+                try:
+                    await run_blocking(self.apply, pending.merged())
+                except Exception:
+                    logger.exception("push reindex failed for %s/%s (%d pushes)", *key, pending.pushes)
+        finally:
+            self._tasks.pop(key, None)
+
+    async def stop(self):
+        # Pushes still waiting are dropped: their files stay stale until the
+        # next push or a refresh ingest. A run already in the blocking pool
+        # completes there but isn't awaited.
+        if self._pending:
+            logger.warning("dropping %d pending push paths on shutdown", self.pending_paths())
+        self._pending.clear()
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+push_reindexer = PushReindexer()
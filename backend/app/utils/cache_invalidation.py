@@ -0,0 +1,86 @@
+# app/utils/cache_invalidation.py
+import json
+import os
+import select
+import psycopg2
+import threading
+import uuid
+from sqlalchemy import text
+from app.core.config import CACHE_INVALIDATION_CHANNEL, DATABASE_URL
+from app.utils.db import engine
+from app.utils.ttl_cache import TTLCache, get_cache, clear_all_caches
+
+# Identifies this process so it can skip its own notifications.
+_ORIGIN = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+def invalidate_cached(cache: TTLCache, key):
+    cache.invalidate(key)
+    if not CACHE_INVALIDATION_CHANNEL:
+        return
+    payload = json.dumps({"cache": cache.name, "key": key, "origin": _ORIGIN})
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": CACHE_INVALIDATION_CHANNEL, "payload": payload})
+    except Exception as e:
+        # Other workers fall back to the TTL.
+        print(f"Error publishing cache invalidation for {cache.name}: {e}")
+
+def _apply(payload: str):
+    try:
+        msg = json.loads(payload)
+    except ValueError:
+        return
+    if msg.get("origin") == _ORIGIN:
+        return
+    cache = get_cache(msg.get("cache", ""))
+    if cache is None:
+        return
+    key = msg.get("key")
+    cache.invalidate(tuple(key) if isinstance(key, list) else key)
+
+class InvalidationListener:
+    def __init__(self, channel: str = CACHE_INVALIDATION_CHANNEL):
+        self.channel = channel
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if not self.channel or self._thread:
+            return
+        self._thread = threading.Thread(target=self._run, name="cache-invalidation", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        backoff = 1
+        while not self._stop.is_set():
+            conn = None
+            try:
+                # Dedicated connection: LISTEN would otherwise pin a pool slot forever.
+                conn = psycopg2.connect(DATABASE_URL)
+                conn.autocommit = True
+                with conn.cursor() as cur:
+                    cur.execute(f'LISTEN "{self.channel}"')
+                backoff = 1
+                while not self._stop.is_set():
+                    if select.select([conn], [], [], 1.0) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        _apply(conn.notifies.pop(0).payload)
+            except Exception as e:
+                print(f"Cache invalidation listener error, reconnecting: {e}")
+                # Missed notifications while disconnected: drop everything.
+                clear_all_caches()
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 30)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+invalidation_listener = InvalidationListener()
@@ -0,0 +1,13 @@
+# app/utils/concurrency.py
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from app.core.config import BLOCKING_POOL_SIZE
+
+# Bounded, so a burst of slow DB or Pinecone calls queues up here instead of
+# spawning threads without limit or stalling the event loop.
+_executor = ThreadPoolExecutor(max_workers=BLOCKING_POOL_SIZE, thread_name_prefix="blocking")
+
+async def run_blocking(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(fn, *args, **kwargs))
@@ -1,16 +1,79 @@
 # app/utils/db.py
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from app.core.config import DATABASE_URL
-import psycopg2
+from app.core.config import (
+    DATABASE_URL,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+    DB_STATEMENT_CACHE_SIZE,
+)
 
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+_POOL_ARGS = dict(
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=True,
+)
+
+# Sync engine: ingest, the chat log writer and schema setup (all run off the event loop).
+engine = create_engine(DATABASE_URL, **_POOL_ARGS)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 Base = declarative_base()
 
+def _async_engine_args(url: str):
+    # Same database through asyncpg. libpq-only query params are translated
+    # or dropped because asyncpg.connect() rejects them.
+    u = make_url(url)
+    query = dict(u.query)
+    connect_args = {"statement_cache_size": DB_STATEMENT_CACHE_SIZE}
+    sslmode = query.pop("sslmode", None)
+    if sslmode:
+        connect_args["ssl"] = sslmode
+    query.pop("channel_binding", None)
+    query["prepared_statement_cache_size"] = str(DB_STATEMENT_CACHE_SIZE)
+    u = u.set(drivername="postgresql+asyncpg", query=query)
+    return u, connect_args
+
+_async_url, _async_connect_args = _async_engine_args(DATABASE_URL)
+# Async engine for request handlers: the models are shared, so routes move
+# over one at a time by swapping get_db for get_async_db and the a* CRUD helpers.
+async_engine = create_async_engine(_async_url, connect_args=_async_connect_args, **_POOL_ARGS)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+def ensure_indexes():
+    # create_all() skips tables that already exist; add indexes declared later.
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+def ensure_columns():
+    # Same for nullable columns added to existing tables.
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                col_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN IF NOT EXISTS "{column.name}" {col_type}'))
+
+def init_db():
+    Base.metadata.create_all(bind=engine)
+    ensure_columns()
+    ensure_indexes()
+
 def get_db_connection():
-    return psycopg2.connect(DATABASE_URL)
+    # DB-API connection checked out of the pool; close() returns it.
+    return engine.raw_connection()
 
 def get_db():
     db = SessionLocal()
@@ -18,3 +81,7 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,25 @@
+# app/utils/json_response.py
+import gzip
+import orjson
+from starlette.requests import Request
+from starlette.responses import Response
+from app.core.config import RESPONSE_GZIP_MIN_BYTES, RESPONSE_GZIP_LEVEL
+from app.utils.static_files import accepts_encoding
+
+def accepts_gzip(request: Request) -> bool:
+    return accepts_encoding(request.headers.get("accept-encoding", ""), "gzip")
+
+def encode_body(obj, gzip_ok: bool):
+    # orjson is several times faster than json for big lists of strings;
+    # small bodies aren't worth the compression round trip.
+    body = orjson.dumps(obj)
+    if gzip_ok and len(body) >= RESPONSE_GZIP_MIN_BYTES:
+        return gzip.compress(body, compresslevel=RESPONSE_GZIP_LEVEL, mtime=0), "gzip"
+    return body, None
+
+def fast_json_response(request: Request, obj, status_code: int = 200) -> Response:
+    body, encoding = encode_body(obj, accepts_gzip(request))
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
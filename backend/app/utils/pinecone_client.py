@@ -1,16 +1,27 @@
 # app/utils/pinecone_client.py
-from pinecone import Pinecone, ServerlessSpec
+from threading import Lock
 from app.core.config import PINECONE_API_KEY, PINECONE_INDEX
 
+_indexes = {}
+_indexes_lock = Lock()
+
 def get_pinecone_index(provider: str, dim: int, metric="cosine"):
     base = PINECONE_INDEX  # e.g. "gitrag-code"
     name = f"{base}-{provider}-{dim}"
-    pc = Pinecone(api_key=PINECONE_API_KEY)
-    if not pc.has_index(name):
-        pc.create_index(
-            name=name,
-            dimension=dim,
-            spec=ServerlessSpec(cloud="aws", region="us-east-1"),
-            metric=metric
-        )
-    return pc.Index(name)
+    # Index handles are reusable; only the first call per name pays for the
+    # has_index/create_index round trips.
+    with _indexes_lock:
+        index = _indexes.get(name)
+        if index is not None:
+            return index
+        from pinecone import Pinecone, ServerlessSpec
+        pc = Pinecone(api_key=PINECONE_API_KEY)
+        if not pc.has_index(name):
+            pc.create_index(
+                name=name,
+                dimension=dim,
+                spec=ServerlessSpec(cloud="aws", region="us-east-1"),
+                metric=metric
+            )
+        index = _indexes[name] = pc.Index(name)
+        return index
@@ -0,0 +1,55 @@
+# app/utils/precompress.py
+# Writes .gz (and, with the brotli package installed, .br) siblings for
+# compressible files in a built frontend, so the static layer never
+# compresses at request time. Run after `npm run build`:
+#   python -m app.utils.precompress frontend/dist
+import gzip
+import os
+import sys
+
+COMPRESSIBLE_SUFFIXES = (".js", ".mjs", ".css", ".html", ".svg", ".json", ".map", ".txt", ".xml", ".wasm", ".ico")
+MIN_SIZE = 1024
+
+def _brotli():
+    try:
+        import brotli
+        return brotli
+    except ImportError:
+        return None
+
+def _write_if_smaller(path: str, original: bytes, compressed: bytes) -> bool:
+    # Variants that don't save anything would only cost a disk read.
+    if len(compressed) >= len(original):
+        return False
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(compressed)
+    os.replace(tmp, path)
+    return True
+
+def precompress(directory: str):
+    brotli = _brotli()
+    if brotli is None:
+        print("brotli not installed; writing .gz variants only")
+    written = saved = 0
+    for root, _, names in os.walk(directory):
+        for name in names:
+            if not name.endswith(COMPRESSIBLE_SUFFIXES):
+                continue
+            path = os.path.join(root, name)
+            with open(path, "rb") as f:
+                data = f.read()
+            if len(data) < MIN_SIZE:
+                continue
+            gz = gzip.compress(data, compresslevel=9, mtime=0)
+            if _write_if_smaller(path + ".gz", data, gz):
+                written += 1
+                saved += len(data) - len(gz)
+            if brotli is not None:
+                br = brotli.compress(data, quality=11)
+                if _write_if_smaller(path + ".br", data, br):
+                    written += 1
+    print(f"wrote {written} precompressed files under {directory} (gzip saves {saved / 1e6:.1f} MB)")
+
+if __name__ == "__main__":
+    precompress(sys.argv[1] if len(sys.argv) > 1 else "frontend/dist")
@@ -0,0 +1,40 @@
+# app/utils/singleflight.py
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+from app.utils.metrics import Counter
+
+SINGLEFLIGHT_CALLS = Counter(
+    "gitrag_singleflight_calls_total",
+    "Calls through a single-flight group; result=leader ran the work, result=shared awaited another caller's run.",
+    ("flight", "result"),
+)
+
+class SingleFlight:
+    # Concurrent callers with the same key await one shared computation.
+    # The work runs as its own task, so a caller that disconnects or is
+    # cancelled does not cancel it for the others.
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is not None:
+            SINGLEFLIGHT_CALLS.inc(flight=self.name, result="shared")
+            return await asyncio.shield(task)
+
+        task = asyncio.ensure_future(fn())
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._done(key, t))
+        SINGLEFLIGHT_CALLS.inc(flight=self.name, result="leader")
+        return await asyncio.shield(task)
+
+    def _done(self, key: Hashable, task: asyncio.Future):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved even if every caller went away
+
+    def inflight(self) -> int:
+        return len(self._inflight)
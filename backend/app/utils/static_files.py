@@ -0,0 +1,166 @@
+# app/utils/static_files.py
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from typing import Dict, NamedTuple, Optional
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+
+# Vite emits content-hashed names like assets/index-BxY3k9aQ.js.
+_HASHED_RE = re.compile(r"[-.][A-Za-z0-9_-]{8,}\.[a-z0-9]+$")
+_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+SHORT = "public, max-age=3600"
+
+class _Variant(NamedTuple):
+    path: str
+    stat: os.stat_result
+    etag: str
+
+class _Entry(NamedTuple):
+    media_type: str
+    cache_control: str
+    variants: Dict[str, _Variant]  # "" is the identity encoding
+
+def encoding_qvalues(header: str) -> Dict[str, float]:
+    # Accept-Encoding as {coding: q}; a coding without q= has q 1.
+    qvalues = {}
+    for part in header.lower().split(","):
+        coding, *params = (p.strip() for p in part.split(";"))
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        qvalues[coding] = q
+    return qvalues
+
+def accepts_encoding(header: str, encoding: str) -> bool:
+    qvalues = encoding_qvalues(header)
+    return qvalues.get(encoding, qvalues.get("*", 0.0)) > 0
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+def _file_etag(stat: os.stat_result, encoding: str) -> str:
+    return _encoded_etag(f"{stat.st_size:x}-{int(stat.st_mtime):x}", encoding)
+
+def _encoded_etag(tag: str, encoding: str) -> str:
+    # Strong ETags name one exact body, so each encoding gets its own.
+    suffix = f"-{encoding}" if encoding else ""
+    return f'"{tag}{suffix}"'
+
+class PrecompressedStaticFiles:
+    # Serves a built SPA from a file index taken once at startup: no per-request
+    # stat/exists calls. Precompressed .br/.gz siblings (app.utils.precompress)
+    # are used when the client accepts them. Hashed assets are cached
+    # immutably; index.html is held in memory and revalidated by ETag.
+
+    def __init__(self, directory: str, index: str = "index.html", api_prefix: str = "/api"):
+        self.directory = directory
+        self.index_name = index
+        self.api_prefix = api_prefix
+        self._files: Dict[str, _Entry] = {}
+        self._index: Dict[str, bytes] = {}
+        self._index_etags: Dict[str, str] = {}
+        self._scan()
+
+    def _scan(self):
+        if not os.path.isdir(self.directory):
+            print(f"Static directory {self.directory} not found; serving API only")
+            return
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith((".br", ".gz")):
+                    continue
+                path = os.path.join(root, name)
+                rel = os.path.relpath(path, self.directory).replace(os.sep, "/")
+                variants = {"": _Variant(path, os.stat(path), "")}
+                for encoding, suffix in _ENCODINGS:
+                    if os.path.exists(path + suffix):
+                        variants[encoding] = _Variant(path + suffix, os.stat(path + suffix), "")
+                variants = {enc: v._replace(etag=_file_etag(v.stat, enc)) for enc, v in variants.items()}
+                media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+                cache_control = IMMUTABLE if rel.startswith("assets/") and _HASHED_RE.search(name) else SHORT
+                self._files[rel] = _Entry(media_type, cache_control, variants)
+
+        entry = self._files.pop(self.index_name, None)
+        if entry:
+            with open(entry.variants[""].path, "rb") as f:
+                body = f.read()
+            self._index = {"": body, "gzip": gzip.compress(body, mtime=0)}
+            if "br" in entry.variants:
+                with open(entry.variants["br"].path, "rb") as f:
+                    self._index["br"] = f.read()
+            digest = hashlib.sha256(body).hexdigest()[:32]
+            self._index_etags = {enc: _encoded_etag(digest, enc) for enc in self._index}
+
+    @staticmethod
+    def _pick(variants, accept_encoding: str) -> str:
+        if len(variants) > 1:
+            for encoding, _ in _ENCODINGS:
+                if encoding in variants and accepts_encoding(accept_encoding, encoding):
+                    return encoding
+        return ""
+
+    def index_response(self, if_none_match: Optional[str], accept_encoding: str, method: str = "GET") -> Response:
+        if not self._index:
+            return Response('{"detail":"Not Found"}', status_code=404, media_type="application/json")
+        encoding = self._pick(self._index, accept_encoding)
+        etag = self._index_etags[encoding]
+        headers = {"Cache-Control": REVALIDATE, "ETag": etag, "Vary": "Accept-Encoding"}
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        body = b"" if method == "HEAD" else self._index[encoding]
+        if method == "HEAD":
+            headers["Content-Length"] = str(len(self._index[encoding]))
+        return Response(body, media_type="text/html", headers=headers)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            raise HTTPException(status_code=404)
+        method = scope["method"]
+        if method not in ("GET", "HEAD"):
+            raise HTTPException(status_code=405)
+        headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"]}
+        path = scope["path"]
+        rel = path.lstrip("/")
+        entry = self._files.get(rel)
+
+        if entry is None:
+            if path.startswith(self.api_prefix + "/") or path == self.api_prefix:
+                raise HTTPException(status_code=404)
+            # SPA route (or "/"): the client-side router takes it from here.
+            response = self.index_response(headers.get("if-none-match"), headers.get("accept-encoding", ""), method)
+            await response(scope, receive, send)
+            return
+
+        encoding = self._pick(entry.variants, headers.get("accept-encoding", ""))
+        variant = entry.variants[encoding]
+        out = {"Cache-Control": entry.cache_control, "ETag": variant.etag}
+        if len(entry.variants) > 1:
+            out["Vary"] = "Accept-Encoding"
+        if etag_matches(headers.get("if-none-match"), variant.etag):
+            response = Response(status_code=304, headers=out)
+        else:
+            if encoding:
+                out["Content-Encoding"] = encoding
+            response = FileResponse(
+                variant.path, headers=out, media_type=entry.media_type, stat_result=variant.stat, method=method,
+            )
+        await response(scope, receive, send)
@@ -0,0 +1,65 @@
+# app/utils/ttl_cache.py
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Hashable
+from app.utils.metrics import Counter
+
+CACHE_REQUESTS = Counter(
+    "gitrag_cache_requests_total",
+    "In-process cache lookups by cache and result (hit/miss).",
+    ("cache", "result"),
+)
+
+MISSING = object()
+
+_caches: Dict[str, "TTLCache"] = {}
+
+class TTLCache:
+    # Small thread-safe LRU whose entries expire after `ttl` seconds. Caches
+    # register by name so cross-worker invalidations can find them.
+
+    def __init__(self, name: str, ttl: float, maxsize: int = 10_000):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = Lock()
+        _caches[name] = self
+
+    def get(self, key: Hashable) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > now:
+                self._data.move_to_end(key)
+                CACHE_REQUESTS.inc(cache=self.name, result="hit")
+                return entry[1]
+            if entry is not None:
+                del self._data[key]
+        CACHE_REQUESTS.inc(cache=self.name, result="miss")
+        return MISSING
+
+    def set(self, key: Hashable, value: Any):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+def get_cache(name: str):
+    return _caches.get(name)
+
+def clear_all_caches():
+    for cache in list(_caches.values()):
+        cache.clear()
@@ -0,0 +1,25 @@
+# benchmarks/chat_load.py
+# Closed-loop load test for /api/ai/chat against a running server, e.g.
+#   uvicorn app.main:app --workers 1
+#   python -m benchmarks.chat_load --user-id <id> --concurrency 1,4,16,32
+# With the async chat path, throughput should keep rising with concurrency
+# on a single worker until the provider or Pinecone becomes the bottleneck.
+import argparse
+
+from benchmarks.load import run_levels
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test /api/ai/chat")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--user-id", required=True)
+    parser.add_argument("--provider", default=None)
+    parser.add_argument("--message", default="How is the chat request routed to the LLM?")
+    parser.add_argument("--concurrency", default="1,2,4,8,16")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds per concurrency level")
+    args = parser.parse_args()
+
+    payload = {"user_id": args.user_id, "message": args.message, "provider": args.provider}
+    run_levels(args.base_url, ("POST", "/api/ai/chat", {"json": payload}), args.concurrency, args.duration, timeout=120)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+# benchmarks/db_load.py
+# Closed-loop load test for DB-bound endpoints against a running server, e.g.
+#   uvicorn app.main:app --workers 1
+#   python -m benchmarks.db_load --user-id <id> --endpoint history --concurrency 1,8,32,64
+# These endpoints do no LLM or Pinecone work, so requests/second tracks how
+# well one worker overlaps database round trips (DB_POOL_SIZE / DB_MAX_OVERFLOW).
+import argparse
+
+from benchmarks.load import run_levels
+
+def _requests(user_id: str):
+    return {
+        "history": ("POST", "/api/ai/get_chat_history", {"json": {"user_id": user_id, "limit": 50}}),
+        "active_repo": ("POST", "/api/repo/get_active_repo", {"json": {"user_id": user_id}}),
+        "metadata": ("GET", "/api/repo/metadata", {"params": {"user_id": user_id}}),
+        "tree": ("GET", "/api/repo/tree/children", {"params": {"user_id": user_id}}),
+        "api_key": ("POST", "/api/ai/get_api_key", {"json": {"user_id": user_id, "provider": "openai"}}),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test DB-bound API endpoints")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--user-id", required=True)
+    parser.add_argument("--endpoint", default="history,active_repo,tree",
+                        help="comma-separated: history, active_repo, metadata, tree, api_key")
+    parser.add_argument("--concurrency", default="1,8,32,64")
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per concurrency level")
+    args = parser.parse_args()
+
+    requests = _requests(args.user_id)
+    for name in args.endpoint.split(","):
+        print(f"\n{name}: {requests[name][0]} {requests[name][1]}")
+        run_levels(args.base_url, requests[name], args.concurrency, args.duration)
+
+if __name__ == "__main__":
+    main()
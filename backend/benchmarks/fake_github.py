@@ -0,0 +1,383 @@
+# benchmarks/fake_github.py
+# Synthetic repository tarballs plus a local HTTP server answering the GitHub
+# endpoints ingest uses (repo, tarball, languages, contributors, topics,
+# releases, readme, rate_limit, contents) plus push payloads for the webhook.
+# Point the app at it with GITHUB_API_URL.
+#   python -m benchmarks.fake_github --files 2000 --mix python=5,javascript=3,go=2 --port 8765
+import argparse
+import io
+import json
+import random
+import tarfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import unquote
+
+_LANGUAGES = {
+    # name: (GitHub language, extension, directories)
+    "python": ("Python", ".py", ("app", "app/services", "app/utils", "tests")),
+    "javascript": ("JavaScript", ".js", ("src", "src/components", "src/lib")),
+    "typescript": ("TypeScript", ".ts", ("web", "web/api", "web/hooks")),
+    "go": ("Go", ".go", ("pkg/server", "pkg/store", "internal/util")),
+    "java": ("Java", ".java", ("src/main/java/com/example/core", "src/main/java/com/example/web")),
+    "markdown": ("Markdown", ".md", ("docs",)),
+}
+
+_WORDS = (
+    "user", "repo", "index", "cache", "token", "chunk", "file", "tree", "graph", "query",
+    "vector", "batch", "stream", "config", "session", "record", "result", "worker", "client", "store",
+)
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip().lower()
+        if name not in _LANGUAGES:
+            raise ValueError(f"unknown language {name!r}; choose from {', '.join(_LANGUAGES)}")
+        weights[name] = float(weight or 1)
+    return weights
+
+def _ident(rng: random.Random) -> str:
+    return rng.choice(_WORDS) + "_" + rng.choice(_WORDS)
+
+def _camel(name: str) -> str:
+    return "".join(p.title() for p in name.split("_"))
+
+def _python(rng, module: str, peers: List[str], target: int) -> str:
+    lines = [f"# {module}", "import os", "import json"]
+    for peer in rng.sample(peers, min(3, len(peers))):
+        lines.append(f"from {peer.rsplit('.', 1)[0].replace('/', '.')} import {_ident(rng)}")
+    while sum(len(l) + 1 for l in lines) < target:
+        name = _ident(rng)
+        lines += [
+            "", f"def {name}(items, limit=10):",
+            f"    # Collects {rng.choice(_WORDS)} entries for the {rng.choice(_WORDS)} stage.",
+            "    out = []", "    for item in items[:limit]:",
+            f"        out.append(json.dumps({{'{rng.choice(_WORDS)}': item}}))",
+            "    return out",
+        ]
+        if rng.random() < 0.3:
+            cls = _camel(_ident(rng))
+            lines += ["", f"class {cls}:", "    def __init__(self, value):", "        self.value = value"]
+    return "\n".join(lines) + "\n"
+
+def _javascript(rng, module: str, peers: List[str], target: int) -> str:
+    lines = [f"// {module}"]
+    for peer in rng.sample(peers, min(3, len(peers))):
+        lines.append(f"import {{ {_camel(_ident(rng))} }} from './{peer.rsplit('/', 1)[-1].rsplit('.', 1)[0]}';")
+    while sum(len(l) + 1 for l in lines) < target:
+        name = _camel(_ident(rng))
+        lines += [
+            "", f"export function {name[0].lower() + name[1:]}(items, limit = 10) {{",
+            f"  // Maps {rng.choice(_WORDS)} entries for the {rng.choice(_WORDS)} view.",
+            f"  return items.slice(0, limit).map((item) => ({{ {rng.choice(_WORDS)}: item }}));",
+            "}",
+        ]
+    return "\n".join(lines) + "\n"
+
+def _go(rng, module: str, peers: List[str], target: int) -> str:
+    package = module.rsplit("/", 2)[-2]
+    lines = [f"package {package}", "", "import (", '\t"fmt"']
+    for peer in rng.sample(peers, min(2, len(peers))):
+        lines.append(f'\t"example.com/bench/{peer.rsplit("/", 1)[0]}"')
+    lines.append(")")
+    while sum(len(l) + 1 for l in lines) < target:
+        name = _camel(_ident(rng))
+        lines += [
+            "", f"func {name}(items []string, limit int) []string {{",
+            "\tout := make([]string, 0, limit)",
+            "\tfor i := 0; i < limit && i < len(items); i++ {",
+            f'\t\tout = append(out, fmt.Sprintf("{rng.choice(_WORDS)}=%s", items[i]))',
+            "\t}", "\treturn out", "}",
+        ]
+    return "\n".join(lines) + "\n"
+
+def _java(rng, module: str, peers: List[str], target: int) -> str:
+    package = module.rsplit("/", 1)[0].split("java/", 1)[-1].replace("/", ".")
+    cls = module.rsplit("/", 1)[-1][:-5]
+    lines = [f"package {package};", "", "import java.util.List;"]
+    for peer in rng.sample(peers, min(2, len(peers))):
+        lines.append(f"import {peer.split('java/', 1)[-1][:-5].replace('/', '.')};")
+    lines += ["", f"public class {cls} {{"]
+    while sum(len(l) + 1 for l in lines) < target:
+        name = _camel(_ident(rng))
+        lines += [
+            f"    public List<String> {name[0].lower() + name[1:]}(List<String> items, int limit) {{",
+            "        return items.subList(0, Math.min(limit, items.size()));",
+            "    }", "",
+        ]
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+def _markdown(rng, module: str, peers: List[str], target: int) -> str:
+    lines = [f"# {_camel(_ident(rng))}", ""]
+    while sum(len(l) + 1 for l in lines) < target:
+        lines.append(" ".join(rng.choice(_WORDS) for _ in range(16)) + ".")
+    return "\n".join(lines) + "\n"
+
+_GENERATORS = {
+    "python": _python, "javascript": _javascript, "typescript": _javascript,
+    "go": _go, "java": _java, "markdown": _markdown,
+}
+
+def generate_files(files: int, mix: Dict[str, float], avg_bytes: int, seed: int = 0) -> List[Tuple[str, str]]:
+    # Deterministic for a given seed so runs are comparable across commits.
+    rng = random.Random(seed)
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    paths: Dict[str, List[str]] = {n: [] for n in names}
+    for i in range(files):
+        lang = rng.choices(names, weights)[0]
+        _, ext, dirs = _LANGUAGES[lang]
+        stem = f"{_ident(rng)}_{i}"
+        if lang == "java":
+            stem = _camel(stem)
+        paths[lang].append(f"{rng.choice(dirs)}/{stem}{ext}")
+
+    out = []
+    for lang, lang_paths in paths.items():
+        for path in lang_paths:
+            # Skewed sizes: most files small, a few large, like real repos.
+            target = max(64, int(rng.lognormvariate(0, 0.8) * avg_bytes))
+            out.append((path, _GENERATORS[lang](rng, path, lang_paths, target)))
+    if any(lang == "go" for lang in mix):
+        out.append(("go.mod", "module example.com/bench\n\ngo 1.22\n"))
+    out.append(("README.md", "# Synthetic benchmark repository\n"))
+    rng.shuffle(out)
+    return out
+
+def generate_content(path: str, avg_bytes: int = 4000, seed: int = 0) -> str:
+    # Synthetic content for an arbitrary path, in the language its extension implies.
+    rng = random.Random(f"{seed}:{path}")
+    lang = next((name for name, (_, ext, _) in _LANGUAGES.items() if path.endswith(ext)), "markdown")
+    return _GENERATORS[lang](rng, path, [], max(64, int(rng.lognormvariate(0, 0.8) * avg_bytes)))
+
+def build_tarball(files: List[Tuple[str, str]], prefix: str = "bench-synthetic-0000000") -> bytes:
+    # Same layout as GitHub's tarball endpoint: one top-level "<owner>-<repo>-<sha>/" dir.
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w:gz", compresslevel=6) as tf:
+        for path, content in files:
+            data = content.encode("utf-8")
+            info = tarfile.TarInfo(f"{prefix}/{path}")
+            info.size = len(data)
+            info.mtime = 0
+            tf.addfile(info, io.BytesIO(data))
+    return buf.getvalue()
+
+def language_bytes(files: List[Tuple[str, str]]) -> Dict[str, int]:
+    by_ext = {ext: name for name, ext, _ in _LANGUAGES.values()}
+    totals: Dict[str, int] = {}
+    for path, content in files:
+        name = by_ext.get("." + path.rsplit(".", 1)[-1])
+        if name:
+            totals[name] = totals.get(name, 0) + len(content.encode("utf-8"))
+    return dict(sorted(totals.items(), key=lambda kv: -kv[1]))
+
+class FakeGitHub:
+    # Serves one synthetic repo at /repos/<owner>/<repo>/... for any owner/repo.
+    # Every `rate_limit_every`-th request gets a 403 with X-RateLimit-Remaining: 0
+    # and a reset one second out, to exercise the client's backoff path.
+
+    def __init__(self, files: List[Tuple[str, str]], host: str = "127.0.0.1", port: int = 0,
+                 rate_limit_every: int = 0, default_branch: str = "main"):
+        # contents/ serves `files` as pushes change it; the tarball is rebuilt
+        # on the next request after a push.
+        self.tarball = build_tarball(files)
+        self.files = dict(files)
+        self.pushes = 0
+        self._tarball_pushes = 0
+        # Snapshot of `files` at each commit sha a push named, for compare/.
+        self.history: Dict[str, Dict[str, str]] = {}
+        self.languages = language_bytes(files)
+        self.default_branch = default_branch
+        self.rate_limit_every = rate_limit_every
+        self.requests = 0
+        self.rate_limited = 0
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="fake-github", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _count(self) -> int:
+        with self._lock:
+            self.requests += 1
+            return self.requests
+
+    def _routes(self, owner: str, repo: str, rest: List[str]):
+        if not rest:
+            return 200, "application/json", json.dumps({
+                "name": repo, "full_name": f"{owner}/{repo}", "owner": {"login": owner},
+                "description": "Synthetic benchmark repository", "default_branch": self.default_branch,
+                "stargazers_count": 0, "forks_count": 0, "open_issues_count": 0, "subscribers_count": 0,
+                "size": len(self.tarball) // 1024, "language": next(iter(self.languages), None),
+                "license": None, "homepage": None,
+                "created_at": "2024-01-01T00:00:00Z", "updated_at": "2024-01-01T00:00:00Z",
+                "pushed_at": "2024-01-01T00:00:00Z",
+            }).encode()
+        if rest[0] == "tarball":
+            with self._lock:
+                if self._tarball_pushes != self.pushes:
+                    self.tarball = build_tarball(sorted(self.files.items()))
+                    self._tarball_pushes = self.pushes
+            return 200, "application/x-gzip", self.tarball
+        if rest[0] == "compare" and len(rest) == 2:
+            base, _, head = unquote(rest[1]).partition("...")
+            if base not in self.history or head not in self.history:
+                return 404, "application/json", b'{"message": "Not Found"}'
+            old, new = self.history[base], self.history[head]
+            files = [
+                {"filename": p, "status": "removed" if p not in new else "added" if p not in old else "modified"}
+                for p in sorted(old.keys() | new.keys()) if old.get(p) != new.get(p)
+            ]
+            return 200, "application/json", json.dumps({"status": "ahead", "files": files}).encode()
+        if rest[0] == "languages":
+            return 200, "application/json", json.dumps(self.languages).encode()
+        if rest[0] == "contributors":
+            return 200, "application/json", json.dumps([
+                {"login": f"dev{i}", "contributions": 100 - i * 7, "avatar_url": ""} for i in range(12)
+            ]).encode()
+        if rest[0] == "topics":
+            return 200, "application/json", b'{"names": ["benchmark"]}'
+        if rest[0] == "releases":
+            return 200, "application/json", b"[]"
+        if rest[0] == "readme":
+            return 200, "text/plain", b"# Synthetic benchmark repository\n"
+        if rest[0] == "contents":
+            content = self.files.get(unquote("/".join(rest[1:])))
+            if content is None:
+                return 404, "application/json", b'{"message": "Not Found"}'
+            return 200, "text/plain", content.encode("utf-8")
+        return 404, "application/json", b'{"message": "Not Found"}'
+
+    def push(self, changes: Dict[str, Optional[str]], owner: str = "bench", repo: str = "synthetic") -> dict:
+        # Applies one commit (path -> new content, None to delete) and returns
+        # the push webhook payload GitHub would send for it.
+        added, modified, removed = [], [], []
+        with self._lock:
+            snapshot = dict(self.files)
+            for path, content in changes.items():
+                if content is None:
+                    if self.files.pop(path, None) is not None:
+                        removed.append(path)
+                else:
+                    (modified if path in self.files else added).append(path)
+                    self.files[path] = content
+            self.pushes += 1
+            n = self.pushes
+            before, after = f"{n - 1:040x}", f"{n:040x}"
+            self.history.setdefault(before, snapshot)
+            self.history[after] = dict(self.files)
+        return {
+            "ref": f"refs/heads/{self.default_branch}",
+            "before": before,
+            "after": after,
+            "created": False,
+            "deleted": False,
+            "forced": False,
+            "repository": {
+                "name": repo, "full_name": f"{owner}/{repo}", "default_branch": self.default_branch,
+                "html_url": f"https://github.com/{owner}/{repo}",
+            },
+            "commits": [{
+                "id": after, "distinct": True, "message": f"Synthetic push {n}",
+                "added": added, "removed": removed, "modified": modified,
+            }],
+            "head_commit": {"id": after, "added": added, "removed": removed, "modified": modified},
+        }
+
+    def apply_payload(self, payload: dict, avg_bytes: int = 4000):
+        # Replays a recorded push against the synthetic repo: its added and
+        # modified paths get fresh content, its removed paths are deleted.
+        with self._lock:
+            self.pushes += 1
+            self.history.setdefault(payload.get("before") or "", dict(self.files))
+            for commit in payload.get("commits") or ():
+                for path in (commit.get("added") or []) + (commit.get("modified") or []):
+                    self.files[path] = generate_content(path, avg_bytes, seed=self.pushes)
+                for path in commit.get("removed") or ():
+                    self.files.pop(path, None)
+            self.history[payload.get("after") or ""] = dict(self.files)
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, content_type, body, remaining):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("X-RateLimit-Limit", "5000")
+                self.send_header("X-RateLimit-Remaining", str(remaining))
+                self.send_header("X-RateLimit-Used", str(5000 - remaining))
+                self.send_header("X-RateLimit-Reset", str(int(time.time()) + 1))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                n = fake._count()
+                path = self.path.split("?", 1)[0].strip("/").split("/")
+                if path == ["rate_limit"]:
+                    body = json.dumps({"resources": {"core": {"limit": 5000, "remaining": 5000 - n}}}).encode()
+                    self._send(200, "application/json", body, max(0, 5000 - n))
+                    return
+                if fake.rate_limit_every and n % fake.rate_limit_every == 0:
+                    with fake._lock:
+                        fake.rate_limited += 1
+                    self._send(403, "application/json", b'{"message": "API rate limit exceeded"}', 0)
+                    return
+                if len(path) < 3 or path[0] != "repos":
+                    self._send(404, "application/json", b'{"message": "Not Found"}', max(0, 5000 - n))
+                    return
+                status, content_type, body = fake._routes(path[1], path[2], path[3:])
+                self._send(status, content_type, body, max(0, 5000 - n))
+
+        return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a synthetic repository over a GitHub-like API")
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--avg-bytes", type=int, default=4000)
+    parser.add_argument("--mix", default="python=5,javascript=3,go=1,markdown=1")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rate-limit-every", type=int, default=0)
+    args = parser.parse_args()
+
+    files = generate_files(args.files, parse_mix(args.mix), args.avg_bytes, args.seed)
+    fake = FakeGitHub(files, port=args.port, rate_limit_every=args.rate_limit_every)
+    print(f"{len(files)} files, tarball {len(fake.tarball) / 1e6:.1f} MB; GITHUB_API_URL={fake.url}")
+    try:
+        fake.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
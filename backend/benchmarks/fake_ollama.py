@@ -0,0 +1,189 @@
+# benchmarks/fake_ollama.py
+# Local stand-in for an Ollama server: /api/embed (batched), /api/chat
+# (streamed NDJSON or single JSON) and /api/tags, with optional latency. It
+# records peak in-flight requests so client concurrency limits can be checked.
+#   python -m benchmarks.fake_ollama --port 11434
+#   python -m benchmarks.fake_ollama --selftest
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_ANSWER = "The repository ingests GitHub tarballs, chunks files by tokens and answers questions from retrieved code."
+
+def _vector(text: str, dim: int):
+    digest = hashlib.shake_128(text.encode("utf-8")).digest(dim)
+    values = [b - 127.5 for b in digest]
+    norm = math.sqrt(sum(v * v for v in values)) or 1.0
+    return [v / norm for v in values]
+
+class FakeOllama:
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, dim: int = 768,
+                 embed_latency_ms: float = 0.0, token_latency_ms: float = 0.0):
+        self.dim = dim
+        self.embed_latency = embed_latency_ms / 1000
+        self.token_latency = token_latency_ms / 1000
+        self.requests = {"embed": 0, "chat": 0}
+        self.embedded_texts = 0
+        self.in_flight = {"embed": 0, "chat": 0}
+        self.peak_in_flight = {"embed": 0, "chat": 0}
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, name="fake-ollama", daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _enter(self, kind: str):
+        with self._lock:
+            self.requests[kind] += 1
+            self.in_flight[kind] += 1
+            self.peak_in_flight[kind] = max(self.peak_in_flight[kind], self.in_flight[kind])
+
+    def _leave(self, kind: str):
+        with self._lock:
+            self.in_flight[kind] -= 1
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _json(self, status, obj):
+                body = json.dumps(obj).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path == "/api/tags":
+                    self._json(200, {"models": [{"name": "nomic-embed-text"}, {"name": "llama3.1"}]})
+                else:
+                    self._json(404, {"error": "not found"})
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if self.path == "/api/embed":
+                    self._embed(body)
+                elif self.path == "/api/chat":
+                    self._chat(body)
+                else:
+                    self._json(404, {"error": "not found"})
+
+            def _embed(self, body):
+                texts = body.get("input") or []
+                texts = [texts] if isinstance(texts, str) else texts
+                fake._enter("embed")
+                try:
+                    if fake.embed_latency:
+                        time.sleep(fake.embed_latency)
+                    with fake._lock:
+                        fake.embedded_texts += len(texts)
+                    self._json(200, {"model": body.get("model"), "embeddings": [_vector(t, fake.dim) for t in texts]})
+                finally:
+                    fake._leave("embed")
+
+            def _chat(self, body):
+                fake._enter("chat")
+                try:
+                    words = _ANSWER.split(" ")
+                    if not body.get("stream", True):
+                        time.sleep(fake.token_latency * len(words))
+                        self._json(200, {"model": body.get("model"), "message": {"role": "assistant", "content": _ANSWER}, "done": True})
+                        return
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/x-ndjson")
+                    self.send_header("Transfer-Encoding", "chunked")
+                    self.end_headers()
+                    for i, word in enumerate(words):
+                        if fake.token_latency:
+                            time.sleep(fake.token_latency)
+                        self._chunk({"message": {"role": "assistant", "content": word if i == 0 else " " + word}, "done": False})
+                    self._chunk({"message": {"role": "assistant", "content": ""}, "done": True})
+                    self.wfile.write(b"0\r\n\r\n")
+                finally:
+                    fake._leave("chat")
+
+            def _chunk(self, obj):
+                data = json.dumps(obj).encode() + b"\n"
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+        return Handler
+
+def selftest(args):
+    # Drives the app's Ollama client against the stand-in and checks results
+    # and that in-flight requests never exceed the configured limits.
+    with FakeOllama(dim=args.dim, embed_latency_ms=20, token_latency_ms=2) as fake:
+        os.environ["OLLAMA_BASE_URL"] = fake.url
+        os.environ["OLLAMA_EMBED_DIM"] = str(args.dim)
+        from app.core.config import OLLAMA_EMBED_BATCH_SIZE, OLLAMA_EMBED_CONCURRENCY, OLLAMA_GENERATE_CONCURRENCY
+        from app.services import ollama_client
+
+        embedder = ollama_client.OllamaEmbeddings()
+        texts = [f"chunk {i}" for i in range(OLLAMA_EMBED_BATCH_SIZE * 6 + 3)]
+        vectors = embedder.embed_documents(texts)
+        assert len(vectors) == len(texts) and len(vectors[0]) == args.dim
+        assert vectors[5] == _vector(texts[5], args.dim), "batch results out of order"
+
+        async def run_async():
+            vectors = await embedder.aembed_documents(texts)
+            assert vectors[-1] == _vector(texts[-1], args.dim)
+            chat = ollama_client.OllamaChat()
+            answers = await asyncio.gather(*(chat.ainvoke("q") for _ in range(OLLAMA_GENERATE_CONCURRENCY * 3)))
+            assert all(a.content == _ANSWER for a in answers)
+
+            async def stream():
+                return "".join([m.content async for m in chat.astream("q")])
+            streamed = await asyncio.gather(*(stream() for _ in range(OLLAMA_GENERATE_CONCURRENCY * 3)))
+            assert all(s == _ANSWER for s in streamed), streamed[0]
+            await ollama_client.aclose()
+
+        asyncio.run(run_async())
+        assert ollama_client.OllamaChat().invoke("q").content == _ANSWER
+        assert fake.peak_in_flight["embed"] <= OLLAMA_EMBED_CONCURRENCY, fake.peak_in_flight
+        assert fake.peak_in_flight["chat"] <= OLLAMA_GENERATE_CONCURRENCY, fake.peak_in_flight
+        print(f"ok: requests={fake.requests} embedded={fake.embedded_texts} peak_in_flight={fake.peak_in_flight}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Ollama stand-in")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--embed-latency-ms", type=float, default=0.0)
+    parser.add_argument("--token-latency-ms", type=float, default=0.0)
+    parser.add_argument("--selftest", action="store_true", help="exercise app.services.ollama_client against a stand-in")
+    args = parser.parse_args()
+    if args.selftest:
+        selftest(args)
+        return
+    fake = FakeOllama(port=args.port, dim=args.dim, embed_latency_ms=args.embed_latency_ms, token_latency_ms=args.token_latency_ms)
+    print(f"fake Ollama at {fake.url}")
+    try:
+        fake.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# benchmarks/fakes.py
+# In-memory stand-ins for the embedding provider and the Pinecone index, so
+# ingest can be timed without network calls. Optional per-call and per-text
+# delays approximate provider latency.
+import hashlib
+import math
+import time
+from threading import Lock
+from types import SimpleNamespace
+from typing import Dict, List
+
+class FakeEmbeddings:
+    # Same surface as the LangChain embedders rag_service uses.
+
+    def __init__(self, dim: int = 1536, call_latency_ms: float = 0.0, per_text_latency_ms: float = 0.0):
+        self.dim = dim
+        self.call_latency = call_latency_ms / 1000
+        self.per_text_latency = per_text_latency_ms / 1000
+        self.calls = 0
+        self.texts = 0
+
+    def _vector(self, text: str) -> List[float]:
+        # Deterministic per text; one byte of SHAKE output per dimension.
+        digest = hashlib.shake_128(text.encode("utf-8")).digest(self.dim)
+        values = [b - 127.5 for b in digest]
+        norm = math.sqrt(sum(v * v for v in values)) or 1.0
+        return [v / norm for v in values]
+
+    def embed_documents(self, texts: List[str], **kwargs) -> List[List[float]]:
+        delay = self.call_latency + self.per_text_latency * len(texts)
+        if delay:
+            time.sleep(delay)
+        self.calls += 1
+        self.texts += len(texts)
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return self.embed_query(text)
+
+def _matches_filter(metadata: dict, where: dict) -> bool:
+    # The Pinecone filter operators app.services.query_scope emits; $in on a
+    # list field matches when any element is in the set.
+    for key, cond in where.items():
+        if key == "$and":
+            if not all(_matches_filter(metadata, c) for c in cond):
+                return False
+        elif key == "$or":
+            if not any(_matches_filter(metadata, c) for c in cond):
+                return False
+        else:
+            value = metadata.get(key)
+            values = value if isinstance(value, list) else [value]
+            if "$in" in cond and not any(v in cond["$in"] for v in values):
+                return False
+            if "$eq" in cond and value != cond["$eq"]:
+                return False
+    return True
+
+class FakeIndex:
+    # The subset of pinecone.Index that ingest and retrieval call.
+
+    def __init__(self, upsert_latency_ms: float = 0.0):
+        self.upsert_latency = upsert_latency_ms / 1000
+        self.namespaces: Dict[str, Dict[str, dict]] = {}
+        self.upsert_requests = 0
+        self._lock = Lock()
+
+    def upsert(self, vectors, namespace: str = "", batch_size=None, show_progress=False):
+        vectors = list(vectors)
+        step = batch_size or len(vectors) or 1
+        for i in range(0, len(vectors), step):
+            if self.upsert_latency:
+                time.sleep(self.upsert_latency)
+            with self._lock:
+                self.upsert_requests += 1
+                ns = self.namespaces.setdefault(namespace, {})
+                for v in vectors[i:i + step]:
+                    ns[v["id"]] = v
+        return SimpleNamespace(upserted_count=len(vectors))
+
+    def delete(self, ids=None, delete_all=False, namespace: str = "", filter=None):
+        with self._lock:
+            if delete_all:
+                self.namespaces.pop(namespace, None)
+            else:
+                ns = self.namespaces.get(namespace, {})
+                for i in ids or ():
+                    ns.pop(i, None)
+
+    def list(self, prefix: str = "", namespace: str = "", limit: int = 100):
+        # Pages of ids, like the serverless list() generator.
+        with self._lock:
+            ids = sorted(i for i in self.namespaces.get(namespace, {}) if i.startswith(prefix))
+        for i in range(0, len(ids), limit):
+            yield ids[i:i + limit]
+
+    def fetch(self, ids, namespace: str = ""):
+        ns = self.namespaces.get(namespace, {})
+        return SimpleNamespace(vectors={
+            i: SimpleNamespace(id=i, values=ns[i]["values"], metadata=ns[i]["metadata"]) for i in ids if i in ns
+        })
+
+    def query(self, vector, top_k: int = 10, namespace: str = "", include_values=False, include_metadata=False, filter=None):
+        ns = self.namespaces.get(namespace, {})
+        vectors = [v for v in ns.values() if not filter or _matches_filter(v["metadata"], filter)]
+        scored = sorted(
+            ((sum(a * b for a, b in zip(vector, v["values"])), v) for v in vectors),
+            key=lambda sv: sv[0], reverse=True,
+        )[:top_k]
+        return SimpleNamespace(matches=[
+            SimpleNamespace(
+                id=v["id"], score=score,
+                values=v["values"] if include_values else [],
+                metadata=v["metadata"] if include_metadata else None,
+            )
+            for score, v in scored
+        ])
+
+    def describe_index_stats(self):
+        return SimpleNamespace(namespaces={
+            name: SimpleNamespace(vector_count=len(ns)) for name, ns in self.namespaces.items()
+        })
+
+    @property
+    def vector_count(self) -> int:
+        return sum(len(ns) for ns in self.namespaces.values())
@@ -0,0 +1,224 @@
+# benchmarks/ingest.py
+# Offline ingest benchmark, run from backend/:
+#   python -m benchmarks.ingest --files 2000 --mix python=5,javascript=3,go=1 --output ingest.json
+#   python -m benchmarks.ingest --files 2000 --mix python=5,javascript=3,go=1 --compare ingest.json
+# GitHub is served by benchmarks.fake_github and the embedder / Pinecone index
+# are benchmarks.fakes, so only this process's own work is measured. --full
+# also runs the /ingest_repo handler end to end, which needs DATABASE_URL.
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import time
+
+from benchmarks.fake_github import FakeGitHub, generate_files, parse_mix
+from benchmarks.fakes import FakeEmbeddings, FakeIndex
+
+OWNER, REPO = "bench", "synthetic"
+PROVIDER = "openai"
+
+def _peak_rss_mb():
+    # ru_maxrss is KiB on Linux and bytes on macOS; children covers the chunking pool.
+    scale = 1 / (1024 * 1024) if sys.platform == "darwin" else 1 / 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale
+    return round(own, 1), round(children, 1)
+
+def _histogram_seconds(histogram, **labels):
+    return histogram.total(**labels)[1]
+
+class _Stage:
+    # Wall time plus the growth of selected histogram sums while the stage ran.
+
+    def __init__(self, name, metrics=()):
+        self.name = name
+        self.metrics = metrics
+        self.result = {}
+
+    def __enter__(self):
+        self._before = {label: _histogram_seconds(h, **kw) for label, h, kw in self.metrics}
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.result["seconds"] = time.perf_counter() - self._started
+        breakdown = {
+            label: _histogram_seconds(h, **kw) - self._before[label] for label, h, kw in self.metrics
+        }
+        if breakdown:
+            self.result["breakdown"] = breakdown
+        self.result["peak_rss_mb"], self.result["peak_child_rss_mb"] = _peak_rss_mb()
+
+def _install_fakes(embedder, index):
+    from app.services import rag_service
+    rag_service.get_embedder = lambda provider, api_key: embedder
+    rag_service.get_pinecone_index = lambda provider, dim, metric="cosine": index
+
+def run_once(args, with_full: bool):
+    from app.services.github_service import list_and_get_files, TAR_SECONDS
+    from app.services.chunking_service import chunk_files_mem
+    from app.services.rag_service import (
+        batch_chunks, upsert_chunks_to_pinecone,
+        EMBED_DOCUMENT_BATCH_LATENCY, UPSERT_BATCH_LATENCY,
+    )
+    from app.services.repo_analysis import RepoAnalytics
+
+    embedder = FakeEmbeddings(args.dim, args.embed_call_ms, args.embed_text_ms)
+    index = FakeIndex(args.upsert_ms)
+    _install_fakes(embedder, index)
+    stages = {}
+
+    with _Stage("list_and_get_files", [("tar_stream", TAR_SECONDS, {})]) as stage:
+        files = list_and_get_files(OWNER, REPO, analytics=RepoAnalytics())
+    read = sum(f["size"] for f in files)
+    stage.result.update(files=len(files), bytes=read, throughput=read / stage.result["seconds"] / 1e6, unit="MB/s")
+    stages[stage.name] = stage.result
+
+    with _Stage("chunk_files_mem") as stage:
+        chunks = chunk_files_mem(files)
+    stage.result.update(chunks=len(chunks), throughput=len(chunks) / stage.result["seconds"], unit="chunks/s")
+    stages[stage.name] = stage.result
+
+    with _Stage("batch_chunks") as stage:
+        batches = list(batch_chunks(chunks))
+    stage.result.update(batches=len(batches), throughput=len(chunks) / stage.result["seconds"], unit="chunks/s")
+    stages[stage.name] = stage.result
+
+    with _Stage("upsert", [
+        ("embed", EMBED_DOCUMENT_BATCH_LATENCY, {"provider": PROVIDER}),
+        ("pinecone_upsert", UPSERT_BATCH_LATENCY, {"provider": PROVIDER}),
+    ]) as stage:
+        upsert_chunks_to_pinecone(chunks, f"bench_{REPO}", PROVIDER, "bench-key")
+    stage.result.update(vectors=index.vector_count, throughput=index.vector_count / stage.result["seconds"], unit="vectors/s")
+    stages[stage.name] = stage.result
+
+    if with_full:
+        stages["ingest_repo"] = run_full(args)
+    return stages
+
+def run_full(args):
+    from app.crud.api_key import upsert_api_key
+    from app.routers.repo import ingest_repo
+    from app.services.github_service import TAR_SECONDS
+    from app.services.chunking_service import CHUNK_SECONDS
+    from app.services.rag_service import EMBED_DOCUMENT_BATCH_LATENCY, UPSERT_BATCH_LATENCY
+    from app.utils.db import SessionLocal
+
+    db = SessionLocal()
+    try:
+        upsert_api_key(db, args.user_id, PROVIDER, "bench-key")
+        with _Stage("ingest_repo", [
+            ("tar_stream", TAR_SECONDS, {}),
+            ("chunking", CHUNK_SECONDS, {}),
+            ("embed", EMBED_DOCUMENT_BATCH_LATENCY, {"provider": PROVIDER}),
+            ("pinecone_upsert", UPSERT_BATCH_LATENCY, {"provider": PROVIDER}),
+        ]) as stage:
+            asyncio.run(ingest_repo(
+                repo_url=f"https://github.com/{OWNER}/{REPO}", user_id=args.user_id, provider=PROVIDER, db=db,
+            ))
+        breakdown = stage.result["breakdown"]
+        # Whatever the instrumented stages don't cover: metadata calls, symbol
+        # index, dependency graph, tree rows and the DB writes.
+        breakdown["other"] = stage.result["seconds"] - sum(breakdown.values())
+        stage.result.update(throughput=args.files / stage.result["seconds"], unit="files/s")
+        return stage.result
+    finally:
+        db.close()
+
+def _median_stages(runs):
+    merged = {}
+    for name in runs[0]:
+        samples = [r[name] for r in runs]
+        row = dict(samples[-1])
+        row["seconds"] = statistics.median(s["seconds"] for s in samples)
+        row["throughput"] = statistics.median(s["throughput"] for s in samples)
+        if "breakdown" in row:
+            row["breakdown"] = {
+                k: statistics.median(s["breakdown"][k] for s in samples) for k in row["breakdown"]
+            }
+        row["peak_rss_mb"] = max(s["peak_rss_mb"] for s in samples)
+        row["peak_child_rss_mb"] = max(s["peak_child_rss_mb"] for s in samples)
+        merged[name] = row
+    return merged
+
+def print_report(result):
+    print(f"{'stage':<20} {'seconds':>9} {'throughput':>14} {'peak RSS MB':>12} {'child RSS MB':>13}")
+    for name, row in result["stages"].items():
+        throughput = f"{row['throughput']:.1f} {row['unit']}"
+        print(f"{name:<20} {row['seconds']:>9.3f} {throughput:>14} {row['peak_rss_mb']:>12.1f} {row['peak_child_rss_mb']:>13.1f}")
+        for part, seconds in row.get("breakdown", {}).items():
+            print(f"  {part:<18} {seconds:>9.3f}")
+
+def compare(result, baseline, threshold):
+    # Returns the stages that got slower than `threshold` (a fraction).
+    regressions = []
+    print(f"\n{'stage':<20} {'baseline s':>11} {'now s':>9} {'change':>8}")
+    for name, row in result["stages"].items():
+        before = baseline.get("stages", {}).get(name)
+        if not before or not before["seconds"]:
+            continue
+        change = row["seconds"] / before["seconds"] - 1
+        flag = "  REGRESSION" if change > threshold else ""
+        print(f"{name:<20} {before['seconds']:>11.3f} {row['seconds']:>9.3f} {change:>+8.1%}{flag}")
+        if flag:
+            regressions.append(name)
+    if baseline.get("config") != result["config"]:
+        print("note: baseline was recorded with a different configuration")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline ingest benchmark")
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--avg-bytes", type=int, default=4000)
+    parser.add_argument("--mix", default="python=5,javascript=3,go=1,markdown=1")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="403 every Nth fake GitHub request")
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--embed-call-ms", type=float, default=0.0, help="simulated latency per embedding call")
+    parser.add_argument("--embed-text-ms", type=float, default=0.0, help="simulated latency per embedded text")
+    parser.add_argument("--upsert-ms", type=float, default=0.0, help="simulated latency per upsert request")
+    parser.add_argument("--full", action="store_true", help="also run the /ingest_repo handler (needs DATABASE_URL)")
+    parser.add_argument("--user-id", default="bench-ingest", help="user row used by --full")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--compare", help="baseline results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="slowdown fraction reported as a regression")
+    args = parser.parse_args()
+
+    files = generate_files(args.files, parse_mix(args.mix), args.avg_bytes, args.seed)
+    with FakeGitHub(files, rate_limit_every=args.rate_limit_every) as fake:
+        # Read at import time by app.core.config, so set it before any app import.
+        os.environ["GITHUB_API_URL"] = fake.url
+        print(f"synthetic repo: {len(files)} files, tarball {len(fake.tarball) / 1e6:.1f} MB at {fake.url}")
+        runs = [run_once(args, args.full) for _ in range(args.runs)]
+        github_requests, rate_limited = fake.requests, fake.rate_limited
+
+    result = {
+        "config": {
+            "files": args.files, "avg_bytes": args.avg_bytes, "mix": args.mix, "seed": args.seed,
+            "dim": args.dim, "embed_call_ms": args.embed_call_ms, "embed_text_ms": args.embed_text_ms,
+            "upsert_ms": args.upsert_ms, "rate_limit_every": args.rate_limit_every, "full": args.full,
+        },
+        "env": {"python": platform.python_version(), "machine": platform.machine(), "cpus": os.cpu_count()},
+        "runs": args.runs,
+        "github_requests": github_requests,
+        "rate_limited": rate_limited,
+        "stages": _median_stages(runs),
+    }
+    print_report(result)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nwrote {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            if compare(result, json.load(f), args.threshold):
+                sys.exit(1)
+
+if __name__ == "__main__":
+    main()
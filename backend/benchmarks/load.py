@@ -0,0 +1,52 @@
+# benchmarks/load.py
+# Closed-loop load driver shared by chat_load and db_load: each level runs
+# `concurrency` workers that send the same request back to back for
+# `duration` seconds over one connection-limited client.
+import asyncio
+import statistics
+import time
+
+import httpx
+
+HEADER = f"{'conc':>5} {'reqs':>6} {'errs':>5} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9}"
+
+async def _worker(client, request, deadline, latencies, errors):
+    method, url, kwargs = request
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            resp = await client.request(method, url, **kwargs)
+            if resp.status_code < 400:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors.append(resp.status_code)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+
+async def run_level(base_url, request, concurrency, duration, timeout=60):
+    # request: (method, url, httpx request kwargs)
+    latencies, errors = [], []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        deadline = time.perf_counter() + duration
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            _worker(client, request, deadline, latencies, errors)
+            for _ in range(concurrency)
+        ))
+        elapsed = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0.0,
+        "p95_ms": statistics.quantiles(latencies, n=20)[-1] * 1000 if len(latencies) >= 2 else 0.0,
+    }
+
+def run_levels(base_url, request, levels: str, duration: float, timeout=60):
+    # levels: comma-separated concurrencies, e.g. "1,8,32"; prints one row each.
+    print(HEADER)
+    for level in (int(c) for c in levels.split(",")):
+        r = asyncio.run(run_level(base_url, request, level, duration, timeout))
+        print(f"{r['concurrency']:>5} {r['requests']:>6} {r['errors']:>5} {r['rps']:>8.2f} {r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f}")
@@ -0,0 +1,104 @@
+# benchmarks/path_encoding.py
+# Payload size and encode time of the /repo/files and /repo/tree response
+# formats on a large synthetic repo (or real paths, one per line), from backend/:
+#   python -m benchmarks.path_encoding --files 50000
+#   git -C ~/src/linux ls-files > paths.txt && python -m benchmarks.path_encoding --paths-file paths.txt
+# "json" is the stdlib encoder FastAPI falls back to; "orjson" is what
+# app.utils.json_response sends, gzipped above RESPONSE_GZIP_MIN_BYTES.
+import argparse
+import gzip
+import json
+import random
+import statistics
+import time
+
+import orjson
+
+from app.core.config import RESPONSE_GZIP_LEVEL
+from app.services.repo_analysis import (
+    build_file_tree_from_paths,
+    flatten_file_tree,
+    front_code_paths,
+    front_decode_paths,
+)
+
+_TOP = ("packages", "services", "apps", "libs", "tools", "docs", "tests")
+_MID = ("src", "lib", "internal", "components", "handlers", "models", "utils", "api", "core", "__tests__")
+_EXT = (".py", ".ts", ".tsx", ".go", ".java", ".md", ".json", ".js")
+
+def synthetic_paths(files: int, seed: int = 0):
+    # Monorepo-shaped: a few top-level areas, many packages, each with a
+    # dozen directories up to 4 levels below it holding ~10 files apiece.
+    rng = random.Random(seed)
+    dirs = []
+    for i in range(max(1, files // 120)):
+        package = f"{rng.choice(_TOP)}/pkg-{i:04d}"
+        for _ in range(12):
+            dirs.append("/".join([package] + [rng.choice(_MID) for _ in range(rng.randint(0, 4))]))
+    paths = set()
+    while len(paths) < files:
+        stem = rng.choice(("index", "main", "util", "service", "model", "test"))
+        paths.add(f"{rng.choice(dirs)}/{stem}_{rng.randrange(files)}{rng.choice(_EXT)}")
+    return list(paths)
+
+def _time(fn, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        out = fn()
+        samples.append(time.perf_counter() - started)
+    return out, statistics.median(samples) * 1000
+
+def measure(name: str, build, repeat: int):
+    obj, build_ms = _time(build, repeat)
+    stdlib, json_ms = _time(lambda: json.dumps(obj).encode(), repeat)
+    body, orjson_ms = _time(lambda: orjson.dumps(obj), repeat)
+    gz, gzip_ms = _time(lambda: gzip.compress(body, compresslevel=RESPONSE_GZIP_LEVEL, mtime=0), repeat)
+    return {
+        "format": name,
+        "json_bytes": len(stdlib),
+        "gzip_bytes": len(gz),
+        "build_ms": round(build_ms, 2),
+        "json_ms": round(json_ms, 2),
+        "orjson_ms": round(orjson_ms, 2),
+        "gzip_ms": round(gzip_ms, 2),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Path list / tree encoding benchmark")
+    parser.add_argument("--files", type=int, default=50000)
+    parser.add_argument("--paths-file", help="newline-separated repo paths instead of synthetic ones")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    if args.paths_file:
+        with open(args.paths_file, encoding="utf-8") as f:
+            paths = [line.strip() for line in f if line.strip()]
+    else:
+        paths = synthetic_paths(args.files, args.seed)
+
+    assert front_decode_paths(front_code_paths(paths)) == sorted(set(paths)), "front coding round trip failed"
+    results = [
+        measure("files=list", lambda: paths, args.repeat),
+        measure("files=front", lambda: front_code_paths(paths), args.repeat),
+        measure("tree=nested", lambda: build_file_tree_from_paths(paths), args.repeat),
+        measure("tree=flat", lambda: flatten_file_tree(paths), args.repeat),
+    ]
+
+    base = {"files": results[0]["json_bytes"], "tree": results[2]["json_bytes"]}
+    print(f"{len(paths)} paths, gzip level {RESPONSE_GZIP_LEVEL}, median of {args.repeat}")
+    print(f"{'format':<12} {'json KB':>9} {'vs base':>8} {'gzip KB':>9} {'build ms':>9} {'json ms':>8} {'orjson ms':>10} {'gzip ms':>8}")
+    for r in results:
+        ratio = r["json_bytes"] / base[r["format"].split("=")[0]]
+        print(
+            f"{r['format']:<12} {r['json_bytes'] / 1024:>9.1f} {ratio:>7.0%} {r['gzip_bytes'] / 1024:>9.1f} "
+            f"{r['build_ms']:>9.2f} {r['json_ms']:>8.2f} {r['orjson_ms']:>10.2f} {r['gzip_ms']:>8.2f}"
+        )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"paths": len(paths), "gzip_level": RESPONSE_GZIP_LEVEL, "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
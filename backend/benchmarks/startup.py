@@ -0,0 +1,95 @@
+# benchmarks/startup.py
+# Cold-start benchmark for the API server, run from backend/:
+#   python -m benchmarks.startup --runs 3
+# Reports the slowest modules from `python -X importtime -c "import app.main"`
+# and the time from spawning uvicorn until the first HTTP response.
+import argparse
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+_IMPORTTIME_RE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+def import_times(module: str):
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = _IMPORTTIME_RE.match(line)
+        if m:
+            self_us, cumulative_us, indent, name = m.groups()
+            depth = len(indent) // 2
+            rows.append((name, depth, int(self_us), int(cumulative_us)))
+    return rows
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def time_to_first_response(path: str, timeout: float, env: dict) -> float:
+    port = _free_port()
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    url = f"http://127.0.0.1:{port}{path}"
+    try:
+        while time.perf_counter() - started < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"server exited:\n{proc.stderr.read().decode()[-2000:]}")
+            try:
+                with urllib.request.urlopen(url, timeout=1):
+                    return time.perf_counter() - started
+            except urllib.error.HTTPError:
+                return time.perf_counter() - started
+            except (urllib.error.URLError, ConnectionError, socket.timeout):
+                time.sleep(0.02)
+        raise RuntimeError(f"no response from {url} within {timeout}s")
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--path", default="/api/metrics")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--skip-db-init", action="store_true", help="set INIT_DB_ON_STARTUP=false for the server runs")
+    parser.add_argument("--warmup", action="store_true", help="set WARMUP_ON_STARTUP=true for the server runs")
+    args = parser.parse_args()
+
+    rows = import_times(args.module)
+    total = next((cum for name, depth, _, cum in reversed(rows) if name == args.module), None)
+    print(f"import {args.module}: {total / 1000:.1f} ms" if total else f"import {args.module}")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for name, depth, self_us, cumulative_us in sorted(rows, key=lambda r: r[3], reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {'  ' * depth}{name}")
+
+    env = dict(os.environ)
+    if args.skip_db_init:
+        env["INIT_DB_ON_STARTUP"] = "false"
+    if args.warmup:
+        env["WARMUP_ON_STARTUP"] = "true"
+    samples = [time_to_first_response(args.path, args.timeout, env) for _ in range(args.runs)]
+    print(
+        f"time to first response ({args.path}): "
+        f"median={statistics.median(samples) * 1000:.0f} ms "
+        f"min={min(samples) * 1000:.0f} ms max={max(samples) * 1000:.0f} ms over {len(samples)} runs"
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+# benchmarks/webhook_replay.py
+# Replays recorded GitHub push payloads (benchmarks/payloads/*.json), from backend/:
+#   python -m benchmarks.webhook_replay
+#   python -m benchmarks.webhook_replay --url http://localhost:8000 --secret <repo webhook secret>
+# By default everything runs in-process: the synthetic repo is served by
+# benchmarks.fake_github and indexed into benchmarks.fakes, each payload is
+# applied to the stand-in and delivered through the signature check,
+# push_changes and a PushReindexer. Afterwards the index must hold exactly
+# what a fresh ingest of the changed repo would. --url posts the signed
+# payloads to a running server instead (GITHUB_API_URL pointed at
+# benchmarks.fake_github if the repo isn't real), signed with the secret
+# POST /api/webhooks/github/secret returned when it created (or, with
+# "rotate": true, replaced) the indexed repo's secret.
+import argparse
+import asyncio
+import glob
+import hashlib
+import hmac
+import json
+import os
+import sys
+import time
+import uuid
+
+from benchmarks.fake_github import FakeGitHub, generate_content, generate_files, parse_mix
+from benchmarks.fakes import FakeEmbeddings, FakeIndex
+from benchmarks.ingest import _install_fakes
+
+OWNER, REPO = "bench", "synthetic"
+PROVIDER = "openai"
+NAMESPACE = f"bench_{REPO}"
+PAYLOAD_DIR = os.path.join(os.path.dirname(__file__), "payloads")
+
+def sign(secret: str, body: bytes) -> str:
+    return "sha256=" + hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+
+def load_payloads(paths):
+    out = []
+    for path in paths:
+        with open(path, "rb") as f:
+            out.append((os.path.basename(path), f.read()))
+    return out
+
+def post_payloads(args, payloads):
+    import httpx
+
+    with httpx.Client(base_url=args.url, timeout=30) as client:
+        for name, body in payloads:
+            resp = client.post("/api/webhooks/github", content=body, headers={
+                "Content-Type": "application/json",
+                "X-GitHub-Event": "push",
+                "X-GitHub-Delivery": str(uuid.uuid4()),
+                "X-Hub-Signature-256": sign(args.secret, body),
+            })
+            print(f"{name}: {resp.status_code} {resp.text}")
+
+def _seed_files(args, payloads):
+    # The synthetic repo plus original versions of every path the payloads
+    # modify or remove, so those pushes have something to replace.
+    files = dict(generate_files(args.files, parse_mix(args.mix), args.avg_bytes, args.seed))
+    for _, body in payloads:
+        for commit in json.loads(body).get("commits") or ():
+            for path in (commit.get("modified") or []) + (commit.get("removed") or []):
+                files.setdefault(path, generate_content(path, args.avg_bytes, seed=0))
+    return list(files.items())
+
+def _symbol_view(index):
+    # Order-independent form of a symbol index, for comparing a patched one
+    # with a freshly built one.
+    files = index["files"]
+    view = {"files": sorted(files), "lines": sorted(zip(files, index["lines"]))}
+    for table in ("defs", "imports", "names"):
+        view[table] = {k: sorted([files[h[0]], *h[1:]] for h in hits) for k, hits in index[table].items()}
+    return view
+
+def replay(args, payloads):
+    files = _seed_files(args, payloads)
+    with FakeGitHub(files) as fake:
+        # Read at import time by app.core.config, so set it before any app import.
+        os.environ["GITHUB_API_URL"] = fake.url
+        from app.services.chunking_service import chunk_files_mem, chunk_text_to_chunks, _should_skip_file, vector_id
+        from app.services.rag_service import upsert_chunks_to_pinecone, replace_file_vectors
+        from app.services.symbol_index import build_symbol_index, extract_symbols, patch_symbol_index
+        from app.services.webhook_service import (
+            PushReindexer, load_push, push_changes, verify_signature,
+        )
+
+        embedder = FakeEmbeddings(args.dim)
+        index = FakeIndex()
+        _install_fakes(embedder, index)
+
+        started = time.perf_counter()
+        file_dicts = [{"filename": p, "content": c} for p, c in files]
+        upsert_chunks_to_pinecone(chunk_files_mem(file_dicts), NAMESPACE, PROVIDER, "bench-key")
+        state = {"symbols": build_symbol_index(file_dicts), "runs": []}
+        ingest_seconds = time.perf_counter() - started
+        ingest_texts = embedder.texts
+        print(f"indexed {len(files)} files, {index.vector_count} vectors in {ingest_seconds:.2f}s")
+
+        def apply(changes):
+            # apply_push without the database: one namespace, in-memory symbol index.
+            t0 = time.perf_counter()
+            content = load_push(changes)
+            changed, chunks = content.files, content.chunks
+            paths = content.paths
+            if content.full:
+                paths = sorted(set(paths) | set(state["symbols"]["files"]))
+            symbols = {f["filename"]: extract_symbols(f["filename"], f["content"]) for f in changed}
+            delta = replace_file_vectors(paths, chunks, NAMESPACE, PROVIDER, "bench-key")
+            state["symbols"] = patch_symbol_index(state["symbols"], changed, paths, symbols)
+            state["runs"].append({
+                "paths": len(paths), "files": len(changed), "chunks": len(chunks),
+                "vector_delta": delta, "seconds": time.perf_counter() - t0,
+            })
+
+        async def deliver():
+            reindexer = PushReindexer(debounce=args.debounce, max_delay=args.max_delay, apply=apply)
+            for name, body in payloads:
+                assert verify_signature(args.secret, body, sign(args.secret, body))
+                assert not verify_signature(args.secret, body + b" ", sign(args.secret, body)), "tampered body accepted"
+                payload = json.loads(body)
+                changes = push_changes(payload)
+                if changes is None:
+                    print(f"{name}: ignored")
+                    continue
+                fake.apply_payload(payload, args.avg_bytes)
+                reindexer.submit(changes)
+                print(f"{name}: queued {len(changes.paths)} paths")
+                await asyncio.sleep(args.gap)
+            await reindexer.wait_idle()
+
+        embedder.texts = 0
+        asyncio.run(deliver())
+
+        # Everything the index should hold now, from the stand-in's current files.
+        expected = {}
+        current = [{"filename": p, "content": c} for p, c in sorted(fake.files.items()) if not _should_skip_file(p)]
+        for f in current:
+            for chunk in chunk_text_to_chunks(f["filename"], f["content"]):
+                expected[vector_id(f["filename"], chunk["metadata"]["chunk_index"])] = chunk["text"]
+        stored = {i: v["metadata"]["text"] for i, v in index.namespaces.get(NAMESPACE, {}).items()}
+        ok = stored == expected
+        symbols_ok = _symbol_view(state["symbols"]) == _symbol_view(build_symbol_index(current))
+
+    for run in state["runs"]:
+        print(
+            f"reindex: {run['paths']} paths, {run['files']} files, {run['chunks']} chunks, "
+            f"vectors {run['vector_delta']:+d} in {run['seconds'] * 1000:.0f} ms"
+        )
+    print(f"{len(state['runs'])} re-index run(s) for {sum(1 for _, b in payloads if push_changes(json.loads(b)))} pushes; "
+          f"embedded {embedder.texts} texts vs {ingest_texts} for the full ingest")
+    print(f"vectors match a fresh ingest: {ok}; symbol index matches: {symbols_ok}")
+    if not ok:
+        missing, extra = expected.keys() - stored.keys(), stored.keys() - expected.keys()
+        changed = [i for i in expected.keys() & stored.keys() if expected[i] != stored[i]]
+        print(f"  missing={len(missing)} extra={len(extra)} stale={len(changed)}")
+    return ok and symbols_ok
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded GitHub push payloads")
+    parser.add_argument("payloads", nargs="*", help=f"payload files (default: {PAYLOAD_DIR}/*.json)")
+    parser.add_argument("--url", help="post to a running server instead of replaying in-process")
+    parser.add_argument("--secret", default="replay-secret", help="the repo's webhook secret (required with --url)")
+    parser.add_argument("--files", type=int, default=300)
+    parser.add_argument("--avg-bytes", type=int, default=4000)
+    parser.add_argument("--mix", default="python=5,javascript=3,typescript=1,markdown=1")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--debounce", type=float, default=0.5, help="PushReindexer debounce (seconds)")
+    parser.add_argument("--max-delay", type=float, default=5.0)
+    parser.add_argument("--gap", type=float, default=0.1, help="seconds between deliveries")
+    args = parser.parse_args()
+
+    payloads = load_payloads(args.payloads or sorted(glob.glob(os.path.join(PAYLOAD_DIR, "*.json"))))
+    if args.url:
+        post_payloads(args, payloads)
+        return
+    if not replay(args, payloads):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -10,7 +10,10 @@ export default function ChatPanel({
   onSend,
   canChat,
   chatRef,
-  onDeleteMessage
+  onDeleteMessage,
+  hasOlder,
+  loadingOlder,
+  onLoadOlder
 }) {
   return (
     <div className="md:w-[75%] w-full flex flex-col bg-[#20252b] border border-[#232b36] rounded shadow-md relative overflow-hidden">
@@ -23,6 +26,18 @@ export default function ChatPanel({
           scrollBehavior: 'smooth'
         }}
       >
+        {hasOlder && (
+          <div className="flex justify-center mb-4">
+            <button
+              type="button"
+              onClick={onLoadOlder}
+              disabled={loadingOlder}
+              className="px-3 py-1 rounded text-sm text-gray-300 border border-[#232b36] hover:border-[#2ea043] hover:text-white transition disabled:opacity-50"
+            >
+              {loadingOlder ? "Loading…" : "Load older messages"}
+            </button>
+          </div>
+        )}
         {chat.map((c, i) => (
           <ChatBubble
             key={c.id ?? i}
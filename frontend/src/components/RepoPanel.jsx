@@ -1,7 +1,7 @@
 import React from "react";
-import { Github, Star, GitFork, Globe2, BadgeCheck, BookOpen } from "lucide-react";
+import { Github, Star, GitFork, Globe2, BadgeCheck, BookOpen, RefreshCw } from "lucide-react";
 
-export default function RepoPanel({ repoData, handleNewRepo }) {
+export default function RepoPanel({ repoData, handleNewRepo, handleRefreshRepo, refreshing }) {
   if (!repoData) return null;
   return (
     <div className="md:w-[25%] w-full bg-[#20252b] border border-[#232b36] rounded shadow-sm p-4 flex flex-col">
@@ -58,7 +58,15 @@ export default function RepoPanel({ repoData, handleNewRepo }) {
         </div>
       </div>
       <button
-        className="flex items-center gap-2 px-4 py-2 bg-[#232b36] border border-[#232b36] rounded shadow text-sm text-[#2ea043] hover:bg-[#2ea043] hover:text-white transition font-semibold mt-6"
+        className="flex items-center gap-2 px-4 py-2 bg-[#232b36] border border-[#232b36] rounded shadow text-sm text-[#2ea043] hover:bg-[#2ea043] hover:text-white transition font-semibold mt-6 disabled:opacity-50"
+        onClick={handleRefreshRepo}
+        disabled={refreshing}
+      >
+        <RefreshCw className={`w-4 h-4 ${refreshing ? "animate-spin" : ""}`} />
+        Re-index Latest Commits
+      </button>
+      <button
+        className="flex items-center gap-2 px-4 py-2 bg-[#232b36] border border-[#232b36] rounded shadow text-sm text-[#2ea043] hover:bg-[#2ea043] hover:text-white transition font-semibold mt-2"
         onClick={handleNewRepo}
       >
         <Github className="w-4 h-4" />
@@ -116,6 +116,11 @@ export default function Ai() {
   const [submitted, setSubmitted] = useState(false);
 
   const chatRef = useRef();
+  // Cursor for the next older page of chat history; null once it's all loaded.
+  const [historyCursor, setHistoryCursor] = useState(null);
+  const [loadingOlder, setLoadingOlder] = useState(false);
+  // Set while prepending older messages so the view stays where it was.
+  const keepScrollRef = useRef(null);
 
   // New: ingest progress UI state
   const initialCheckpoints = useMemo(
@@ -137,6 +142,7 @@ export default function Ai() {
 
   useEffect(() => {
     async function checkActiveRepo() {
+      setHistoryCursor(null);
       if (!user?.id) {
         setSubmitted(false);
         setRepoUrl("");
@@ -180,8 +186,20 @@ export default function Ai() {
     checkActiveRepo();
   }, [user?.id]);
 
+  function formatHistory(messages) {
+    return messages.map((msg) => ({
+      sender: msg.role === "assistant" ? "ai" : "user",
+      text: msg.content,
+      id: msg.id,
+      avatar: msg.role === "assistant"
+        ? "/logo.png"
+        : (user?.avatar_url || user?.picture || "/logo.png"),
+    }));
+  }
+
   async function fetchUserChatHistory(userId) {
     setGlobalLoading({ show: true, messages: loadingMessages.chatHistory, subtext: "" });
+    setHistoryCursor(null);
     try {
       const res = await fetch(`${BACKEND_URL}/api/ai/get_chat_history`, {
         method: "POST",
@@ -190,15 +208,8 @@ export default function Ai() {
       });
       const data = await res.json();
       if (res.ok && Array.isArray(data.messages) && data.messages.length > 0) {
-        const formatted = data.messages.map((msg) => ({
-          sender: msg.role === "assistant" ? "ai" : "user",
-          text: msg.content,
-          id: msg.id,
-          avatar: msg.role === "assistant"
-            ? "/logo.png"
-            : (user?.avatar_url || user?.picture || "/logo.png"),
-        }));
-        setChat(formatted);
+        setChat(formatHistory(data.messages));
+        setHistoryCursor(data.next_cursor || null);
       } else {
         setChat([
           { sender: "ai", text: "Repo loaded! Now ask me anything about your codebase.", avatar: "/logo.png" }
@@ -212,13 +223,35 @@ export default function Ai() {
     setGlobalLoading({ show: false, messages: [], subtext: "" });
   }
 
+  async function loadOlderMessages() {
+    if (!historyCursor || loadingOlder || !user?.id) return;
+    setLoadingOlder(true);
+    try {
+      const res = await fetch(`${BACKEND_URL}/api/ai/get_chat_history`, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ user_id: user.id, before: historyCursor }),
+      });
+      const data = await res.json();
+      if (res.ok && Array.isArray(data.messages)) {
+        if (chatRef.current) {
+          keepScrollRef.current = chatRef.current.scrollHeight - chatRef.current.scrollTop;
+        }
+        setChat((c) => [...formatHistory(data.messages), ...c]);
+        setHistoryCursor(data.next_cursor || null);
+      }
+    } catch {}
+    setLoadingOlder(false);
+  }
+
   async function handleDeleteMessage(msgId) {
     setGlobalLoading({ show: true, messages: loadingMessages.deleteMessage, subtext: "" });
     try {
-      await fetch(`${BACKEND_URL}/api/ai/delete_message?msg_id=${msgId}&user_id=${user.id}`, {
+      const res = await fetch(`${BACKEND_URL}/api/ai/delete_message?msg_id=${msgId}&user_id=${user.id}`, {
         method: "DELETE",
       });
-      await fetchUserChatHistory(user.id);
+      // Drop it in place rather than reloading, which would discard older pages.
+      if (res.ok) setChat((c) => c.filter((m) => m.id !== msgId));
     } catch {}
     setGlobalLoading({ show: false, messages: [], subtext: "" });
   }
@@ -253,9 +286,13 @@ export default function Ai() {
   }, [user?.id, globalLoading]);
 
   useEffect(() => {
-    if (chatRef.current) {
-      chatRef.current.scrollTop = chatRef.current.scrollHeight;
+    if (!chatRef.current) return;
+    if (keepScrollRef.current !== null) {
+      chatRef.current.scrollTop = chatRef.current.scrollHeight - keepScrollRef.current;
+      keepScrollRef.current = null;
+      return;
     }
+    chatRef.current.scrollTop = chatRef.current.scrollHeight;
   }, [chat, loadingChat]);
 
   async function fetchRepoMeta(repo_url) {
@@ -333,6 +370,18 @@ export default function Ai() {
       alert("Please enter a repo URL.");
       return;
     }
+    await ingestRepo(false);
+  }
+
+  // Re-ingest the open repo from scratch to pick up new commits; a plain
+  // submit of an already indexed repo reuses its index.
+  async function handleRefreshRepo() {
+    if (window.confirm("Re-index this repo from its latest commit? This can take a while for large repos.")) {
+      await ingestRepo(true);
+    }
+  }
+
+  async function ingestRepo(refresh) {
     if (!apiKeyExists) {
       alert("Please add your OpenAI or Gemini API key from the sidebar first. If you have added then make sure to toggle on the correct provider");
       return;
@@ -352,6 +401,7 @@ export default function Ai() {
           user_id: user.id,
           repo_url: repoUrl,
           provider: provider,
+          refresh: refresh,
         }),
       });
       if (!res.ok) {
@@ -411,7 +461,7 @@ export default function Ai() {
     setLoadingChat(true);
 
     try {
-      const res = await fetch(`${BACKEND_URL}/api/ai/chat`, {
+      const res = await fetch(`${BACKEND_URL}/api/ai/chat/stream`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({
@@ -424,16 +474,34 @@ export default function Ai() {
         const errData = await res.json();
         throw new Error(errData.detail || "Chat request failed.");
       }
-      const data = await res.json();
-      const updatedChat = [
-        ...newChat,
-        {
-          sender: "ai",
-          text: data.result || "(No answer)",
-          avatar: "/logo.png",
-        },
-      ];
-      setChat(updatedChat);
+      let answer = "";
+      setChat([...newChat, { sender: "ai", text: "", avatar: "/logo.png" }]);
+      const updateAnswer = (fields) =>
+        setChat((c) => [...c.slice(0, -1), { ...c[c.length - 1], ...fields }]);
+
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const events = buffer.split("\n\n");
+        buffer = events.pop();
+        for (const raw of events) {
+          const event = raw.match(/^event: (.*)$/m)?.[1];
+          const data = JSON.parse(raw.match(/^data: (.*)$/m)?.[1] ?? "null");
+          if (event === "token") {
+            answer += data;
+            updateAnswer({ text: answer });
+          } else if (event === "done") {
+            updateAnswer({ id: data?.id });
+          } else if (event === "error") {
+            throw new Error(data?.detail || "Chat request failed.");
+          }
+        }
+      }
+      if (!answer) updateAnswer({ text: "(No answer)" });
     } catch (err) {
       setChat((c) => [
         ...c,
@@ -449,7 +517,7 @@ export default function Ai() {
   }
 
   async function handleNewRepo() {
-    if (window.confirm("Switching repo will clear the current chat and context. Continue?")) {
+    if (window.confirm("Switch to another repo? This one stays indexed, so coming back to it is quick. Continue?")) {
       setGlobalLoading({ show: true, messages: loadingMessages.switchRepo, subtext: "" });
       try {
         await fetch(`${BACKEND_URL}/api/repo/switch_repo`, {
@@ -461,6 +529,7 @@ export default function Ai() {
       setRepoUrl("");
       setRepoData(null);
       setSubmitted(false);
+      setHistoryCursor(null);
       setChat([
         { sender: "ai", text: "Paste your GitHub repo URL to start chatting about your code.", avatar: "/logo.png" }
       ]);
@@ -604,7 +673,7 @@ export default function Ai() {
           )}
           {submitted && repoData && (
             <div className="w-full max-w-[99vw] mx-auto flex flex-1 min-h-0 flex-col md:flex-row gap-4 p-4">
-              <RepoPanel repoData={repoData} handleNewRepo={handleNewRepo} />
+              <RepoPanel repoData={repoData} handleNewRepo={handleNewRepo} handleRefreshRepo={handleRefreshRepo} refreshing={loadingRepo} />
               <ChatPanel
                 chat={chat}
                 msg={msg}
@@ -614,6 +683,9 @@ export default function Ai() {
                 canChat={apiKeyExists}
                 chatRef={chatRef}
                 onDeleteMessage={handleDeleteMessage}
+                hasOlder={Boolean(historyCursor)}
+                loadingOlder={loadingOlder}
+                onLoadOlder={loadOlderMessages}
               />
             </div>
           )}
@@ -156,7 +156,9 @@ function RepoAnalytics({ analytics }) {
           return (
             <div key={key} className="flex justify-between items-center">
               <span className="text-gray-400 capitalize">{key.replace(/_/g, ' ')}:</span>
-              <span className="text-gray-200 font-mono bg-gray-900/50 px-1 py-0.5 rounded">{String(value)}</span>
+              <span className="text-gray-200 font-mono bg-gray-900/50 px-1 py-0.5 rounded">
+                {value !== null && typeof value === "object" ? JSON.stringify(value) : String(value)}
+              </span>
             </div>
           );
         })}
@@ -167,11 +169,22 @@ function RepoAnalytics({ analytics }) {
 
 // --- Dependency Graph ---
 function DependencyGraph({ graph }) {
-  if (!graph || Object.keys(graph).length === 0) return null;
+  if (!graph || !graph.files || graph.files.length === 0) return null;
+  // Compact adjacency from the backend: deps[i] lists indices imported by files[i].
+  const rows = graph.files
+    .map((file, i) => ({ file, deps: (graph.deps[i] || []).map((j) => graph.files[j]) }))
+    .filter((row) => row.deps.length > 0);
   return (
-    <CollapsibleCard title="Dependency Graph" icon={<NetworkIcon className="w-4 h-4 text-gray-400" />}>
-      <div className="overflow-x-auto text-[11px] text-gray-300 max-h-40 bg-gray-900/50 p-1 rounded">
-        <pre className="whitespace-pre-wrap">{JSON.stringify(graph, null, 2)}</pre>
+    <CollapsibleCard title={`Dependency Graph (${graph.edges} edges)`} icon={<NetworkIcon className="w-4 h-4 text-gray-400" />}>
+      <div className="overflow-auto text-[11px] text-gray-300 max-h-60 bg-gray-900/50 p-1 rounded font-mono">
+        {rows.map((row) => (
+          <div key={row.file} className="mb-1">
+            <div className="text-gray-200">{row.file}</div>
+            {row.deps.map((dep) => (
+              <div key={dep} className="pl-2 text-gray-400">→ {dep}</div>
+            ))}
+          </div>
+        ))}
       </div>
     </CollapsibleCard>
   );
@@ -239,11 +252,11 @@ export default function Repo() {
       setSelectedFile(null);
       setFileContent("");
       try {
-        const res = await fetch(`${BACKEND_URL}/api/repo/metadata`, {
-          method: "POST",
-          headers: { "Content-Type": "application/json" },
-          body: JSON.stringify({ user_id: user?.id }),
-        });
+        // GET so the browser cache revalidates with If-None-Match (304 on repeat loads).
+        const res = await fetch(
+          `${BACKEND_URL}/api/repo/metadata?user_id=${encodeURIComponent(user?.id)}`,
+          { cache: "no-cache" }
+        );
         if (!res.ok) throw new Error((await res.json()).detail || "Failed to load repo metadata.");
         const data = await res.json();
         setFileTree(data.file_tree);